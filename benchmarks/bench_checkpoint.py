@@ -0,0 +1,80 @@
+"""
+Measures exploring candidate continuations of a file, as in beam search, undoing each candidate with one
+delete_text_between_positions per inserted token, against restoring the file with checkpoint and rollback, with the
+fake language server in benchmarks/fake_language_server.py.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_checkpoint.py [--lines N] [--candidates N] [--tokens N]
+
+Every didChange notification sent makes a real server analyze the file again, so the number of notifications is
+reported along with the time.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from fake_language_server import FakeLanguageServer
+from multilspy.multilspy_config import Language, MultilspyConfig
+from multilspy.multilspy_logger import MultilspyLogger
+
+FILE_NAME = "main.py"
+TOKENS = ["result", "_", "value", " = ", "self", ".", "compute", "(", "items", ")", "\n"]
+
+
+async def run(args: argparse.Namespace, root: str, label: str, use_checkpoint: bool) -> None:
+    config = MultilspyConfig(code_language=Language.PYTHON)
+    lsp = FakeLanguageServer(config, MultilspyLogger(), root, "", in_process=True)
+    async with lsp.start_server():
+        notifications = 0
+        notify_change = lsp.server.notify.did_change_text_document
+
+        def count_change(params) -> None:
+            nonlocal notifications
+            notifications += 1
+            notify_change(params)
+
+        lsp.server.notify.did_change_text_document = count_change
+        with lsp.open_file(FILE_NAME):
+            line = args.lines // 2
+            start = time.perf_counter()
+            for candidate in range(args.candidates):
+                tokens = [TOKENS[(candidate + i) % len(TOKENS)] for i in range(args.tokens)]
+                if use_checkpoint:
+                    checkpoint = lsp.checkpoint(FILE_NAME)
+                positions = [{"line": line, "character": 0}]
+                for token in tokens:
+                    positions.append(
+                        lsp.insert_text_at_position(FILE_NAME, positions[-1]["line"], positions[-1]["character"], token)
+                    )
+                if use_checkpoint:
+                    lsp.rollback(checkpoint)
+                else:
+                    for token_start, token_end in reversed(list(zip(positions, positions[1:]))):
+                        lsp.delete_text_between_positions(FILE_NAME, token_start, token_end)
+            elapsed = time.perf_counter() - start
+    print(
+        f"{label:<12} {elapsed:>7.3f}s {notifications / args.candidates:>6.1f} didChange/candidate",
+        file=sys.stderr,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=5000, help="Number of lines of the file")
+    parser.add_argument("--candidates", type=int, default=1000, help="Number of candidates explored")
+    parser.add_argument("--tokens", type=int, default=8, help="Number of tokens of each candidate")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        with open(os.path.join(root, FILE_NAME), "w") as f:
+            f.write("".join(f"value_{i} = {i}\n" for i in range(args.lines)))
+        asyncio.run(run(args, root, "undo", False))
+        asyncio.run(run(args, root, "rollback", True))
+
+
+if __name__ == "__main__":
+    main()
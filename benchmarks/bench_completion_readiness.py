@@ -0,0 +1,54 @@
+"""
+Measures completion requests sent while the language server is indexing, resending incomplete results
+immediately as request_completions used to, against waiting for the server to report the end of its work,
+with the fake language server in benchmarks/fake_language_server.py.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_completion_readiness.py [--indexing MS] [--latency MS]
+
+Immediate retries give up after 30 round trips, with an incomplete result if indexing takes longer than
+they do.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+
+from fake_language_server import FakeLanguageServer
+from multilspy.multilspy_config import Language, MultilspyConfig
+from multilspy.multilspy_logger import MultilspyLogger
+
+FILE_NAME = "main.py"
+
+
+async def run(args: argparse.Namespace, root: str, label: str, **config_options) -> None:
+    config = MultilspyConfig(code_language=Language.PYTHON, **config_options)
+    server_args = f"--indexing {args.indexing} --latency {args.latency}"
+    lsp = FakeLanguageServer(config, MultilspyLogger(), root, server_args, in_process=True)
+    async with lsp.start_server():
+        completions = await lsp.request_completions(FILE_NAME, 0, 0)
+        report = lsp.get_completion_report()
+    print(
+        f"{label:<18} {report.elapsed:>7.3f}s round_trips={report.round_trips:<3} items={len(completions):<3}"
+        f" reason={report.reason or '-'}",
+        file=sys.stderr,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--indexing", type=float, default=500.0, help="Time the server spends indexing in milliseconds")
+    parser.add_argument("--latency", type=float, default=1.0, help="Latency of the server in milliseconds")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        with open(os.path.join(root, FILE_NAME), "w") as f:
+            f.write("x = 1\n")
+        asyncio.run(run(args, root, "immediate retries", completion_retry_delay=0, track_server_progress=False))
+        asyncio.run(run(args, root, "readiness"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Measures resolving the details of a completion result with completionItem/resolve one item at a time, against
+resolve_completions sending the requests concurrently, with the fake language server in
+benchmarks/fake_language_server.py.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_completion_resolve.py [--payload-size N] [--latency MS]
+        [--max-in-flight N]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from fake_language_server import FakeLanguageServer
+from multilspy.multilspy_config import Language, MultilspyConfig
+from multilspy.multilspy_logger import MultilspyLogger
+
+FILE_NAME = "main.py"
+
+
+async def run(args: argparse.Namespace, root: str) -> None:
+    config = MultilspyConfig(code_language=Language.PYTHON, completion_resolve_max_in_flight=args.max_in_flight)
+    server_args = f"--payload-size {args.payload_size} --latency {args.latency}"
+    lsp = FakeLanguageServer(config, MultilspyLogger(), root, server_args, in_process=True)
+    async with lsp.start_server():
+        start = time.perf_counter()
+        handles = await lsp.request_completion_handles(FILE_NAME, 0, 0)
+        print(f"{'labels only':<14} {time.perf_counter() - start:>7.3f}s", file=sys.stderr)
+
+        start = time.perf_counter()
+        for handle in handles:
+            await lsp.server.send.resolve_completion_item(handle.lsp_item)
+        print(f"{'one at a time':<14} {time.perf_counter() - start:>7.3f}s", file=sys.stderr)
+
+        start = time.perf_counter()
+        await lsp.resolve_completions(handles)
+        print(f"{'batched':<14} {time.perf_counter() - start:>7.3f}s", file=sys.stderr)
+
+        start = time.perf_counter()
+        await lsp.resolve_completions(handles)
+        stats = lsp.get_completion_resolve_stats()
+        print(
+            f"{'cached':<14} {time.perf_counter() - start:>7.3f}s  requests={stats.requests} cache_hits={stats.cache_hits}",
+            file=sys.stderr,
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--payload-size", type=int, default=200, help="Number of items per completion result")
+    parser.add_argument("--latency", type=float, default=2.0, help="Latency of the server in milliseconds")
+    parser.add_argument("--max-in-flight", type=int, default=16, help="Maximum number of resolve requests in flight")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        with open(os.path.join(root, FILE_NAME), "w") as f:
+            f.write("\n")
+        asyncio.run(run(args, root))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Measures the completion requests made while generating code token by token, as in monitor-guided decoding,
+with and without the filtering of completions within an identifier, against the fake language server in
+benchmarks/fake_language_server.py.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_completion_session.py [--statements N] [--payload-size N]
+        [--latency MS]
+
+Each token is inserted at the cursor with insert_text_at_position, followed by a completion request at the
+new cursor.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from fake_language_server import FakeLanguageServer
+from multilspy.multilspy_config import Language, MultilspyConfig
+from multilspy.multilspy_logger import MultilspyLogger
+
+FILE_NAME = "main.py"
+TOKENS = ["result", "_", "value", " = ", "self", ".", "comp", "ute", "_", "total", "(", "item", "s", ")", "\n"]
+
+
+async def run(args: argparse.Namespace, root: str, label: str, **config_options) -> None:
+    config = MultilspyConfig(code_language=Language.PYTHON, **config_options)
+    server_args = f"--payload-size {args.payload_size} --latency {args.latency}"
+    lsp = FakeLanguageServer(config, MultilspyLogger(), root, server_args, in_process=True)
+    tokens = TOKENS * args.statements
+    round_trips = 0
+    async with lsp.start_server():
+        with lsp.open_file(FILE_NAME):
+            start = time.perf_counter()
+            line, column = 0, 0
+            for token in tokens:
+                position = lsp.insert_text_at_position(FILE_NAME, line, column, token)
+                line, column = position["line"], position["character"]
+                await lsp.request_completions(FILE_NAME, line, column)
+                round_trips += lsp.get_completion_report().round_trips
+            elapsed = time.perf_counter() - start
+    print(
+        f"{label:<14} {len(tokens) / elapsed:>8.0f} tokens/s {round_trips / len(tokens):>6.2f} round trips/token",
+        file=sys.stderr,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--statements", type=int, default=100, help="Number of generated statements")
+    parser.add_argument("--payload-size", type=int, default=200, help="Number of items per completion result")
+    parser.add_argument("--latency", type=float, default=2.0, help="Latency of the server in milliseconds")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        with open(os.path.join(root, FILE_NAME), "w") as f:
+            f.write("\n")
+        asyncio.run(run(args, root, "server only"))
+        asyncio.run(run(args, root, "filtering", completion_filtering=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Measures the computation of the mask of the vocabulary tokens allowed after each generated token of an
+identifier, with CompletionTrie against checking every token of the vocabulary against the completion texts
+at every step.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_completion_trie.py [--vocabulary-size N] [--completions N]
+
+The vocabulary and the completions are synthetic identifiers and identifier pieces. Each step types one
+more character of a completion, as in monitor-guided decoding.
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+
+from multilspy.completion_trie import CompletionTrie, TokenVocabulary
+
+WORDS = ["get", "set", "value", "item", "count", "total", "compute", "result", "self", "data", "index", "name"]
+IDENTIFIER_CHAR_PATTERN = re.compile(r"\w")
+
+
+def mask_by_scanning(texts, tokens, prefix: str) -> bytes:
+    """
+    Checks every token against the prefixes of the completion texts, rebuilt at every step
+    """
+    remainders = {text[len(prefix) :] for text in texts if text.startswith(prefix)}
+    prefixes = {remainder[:length] for remainder in remainders for length in range(1, len(remainder) + 1)}
+    mask = bytearray(len(tokens))
+    for token_id, token in enumerate(tokens):
+        if token in prefixes or any(
+            token[:length] in remainders and IDENTIFIER_CHAR_PATTERN.match(token, length) is None
+            for length in range(len(token))
+        ):
+            mask[token_id] = 1
+    return bytes(mask)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vocabulary-size", type=int, default=50000, help="Number of tokens of the vocabulary")
+    parser.add_argument("--completions", type=int, default=500, help="Number of completion items")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    pieces = WORDS + [word.capitalize() for word in WORDS] + ["_", "(", ")", ".", " ", ", ", "0", "1"]
+    tokens = [
+        "".join(rng.choice(pieces)[: rng.randrange(1, 8)] for _ in range(rng.randrange(1, 3)))
+        for _ in range(args.vocabulary_size)
+    ]
+    texts = ["_".join(rng.choice(WORDS) for _ in range(rng.randrange(1, 4))) for _ in range(args.completions)]
+    target = max(texts, key=len)
+    prefixes = [target[:length] for length in range(len(target) + 1)]
+
+    start = time.perf_counter()
+    expected = [mask_by_scanning(texts, tokens, prefix) for prefix in prefixes]
+    elapsed = time.perf_counter() - start
+    print(f"{'scanning':<22} {elapsed / len(prefixes) * 1000:>8.3f} ms/step", file=sys.stderr)
+
+    start = time.perf_counter()
+    vocabulary = TokenVocabulary(tokens)
+    vocabulary.non_identifier_starts()
+    print(f"{'vocabulary index':<22} {(time.perf_counter() - start) * 1000:>8.3f} ms once", file=sys.stderr)
+    start = time.perf_counter()
+    trie = CompletionTrie(texts)
+    masks = [trie.allowed_tokens(vocabulary, prefix) for prefix in prefixes]
+    elapsed = time.perf_counter() - start
+    print(f"{'trie':<22} {elapsed / len(prefixes) * 1000:>8.3f} ms/step", file=sys.stderr)
+    assert masks == expected
+
+
+if __name__ == "__main__":
+    main()
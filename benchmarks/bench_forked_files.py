@@ -0,0 +1,74 @@
+"""
+Measures exploring candidate continuations of a file, as in beam search, one at a time with edit, query and undo,
+against editing and querying forked documents concurrently with fork_file, with the fake language server in
+benchmarks/fake_language_server.py.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_forked_files.py [--lines N] [--candidates N] [--steps N] [--latency MS]
+
+Each candidate inserts one token per step, followed by a completion request at the new cursor.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from fake_language_server import FakeLanguageServer
+from multilspy.multilspy_config import Language, MultilspyConfig
+from multilspy.multilspy_logger import MultilspyLogger
+
+FILE_NAME = "main.py"
+TOKENS = ["result", "_", "value", " = ", "self", ".", "compute", "(", "items", ")"]
+
+
+async def explore(lsp: FakeLanguageServer, path: str, line: int, tokens) -> None:
+    column = 0
+    for token in tokens:
+        position = lsp.insert_text_at_position(path, line, column, token)
+        column = position["character"]
+        await lsp.request_completions(path, line, column)
+
+
+async def run(args: argparse.Namespace, root: str, label: str, use_forks: bool) -> None:
+    config = MultilspyConfig(code_language=Language.PYTHON, max_forked_files=args.candidates)
+    server_args = f"--latency {args.latency}"
+    lsp = FakeLanguageServer(config, MultilspyLogger(), root, server_args, in_process=True)
+    line = args.lines // 2
+    candidates = [[TOKENS[(i + step) % len(TOKENS)] for step in range(args.steps)] for i in range(args.candidates)]
+    async with lsp.start_server():
+        with lsp.open_file(FILE_NAME):
+            start = time.perf_counter()
+            if use_forks:
+                forks = lsp.fork_file(FILE_NAME, args.candidates)
+                await asyncio.gather(*[explore(lsp, fork, line, tokens) for fork, tokens in zip(forks, candidates)])
+                for fork in forks:
+                    lsp.discard_fork(fork)
+            else:
+                for tokens in candidates:
+                    checkpoint = lsp.checkpoint(FILE_NAME)
+                    await explore(lsp, FILE_NAME, line, tokens)
+                    lsp.rollback(checkpoint)
+            elapsed = time.perf_counter() - start
+    print(f"{label:<12} {elapsed:>7.3f}s", file=sys.stderr)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=5000, help="Number of lines of the file")
+    parser.add_argument("--candidates", type=int, default=8, help="Number of candidates explored")
+    parser.add_argument("--steps", type=int, default=20, help="Number of tokens of each candidate")
+    parser.add_argument("--latency", type=float, default=5.0, help="Latency of the server in milliseconds")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        with open(os.path.join(root, FILE_NAME), "w") as f:
+            f.write("".join(f"value_{i} = {i}\n" for i in range(args.lines)))
+        asyncio.run(run(args, root, "serial", False))
+        asyncio.run(run(args, root, "forks", True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Compares the throughput of the buffered FrameReader against the line based read loop that
+LanguageServerHandler.run_forever used previously.
+
+A producer task writes a mix of small notifications (a publishDiagnostics flood) and large
+responses (long reference lists) into an asyncio.StreamReader in pipe sized chunks, while the
+reader under test parses the Content-Length frames out of it.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_frame_reader.py [--messages N]
+"""
+
+import argparse
+import asyncio
+import time
+
+from multilspy.lsp_protocol_handler.server import create_message
+from multilspy.lsp_protocol_handler.transport import FrameReader
+
+PIPE_CHUNK_SIZE = 64 * 1024
+
+
+def build_stream_data(num_messages: int) -> bytes:
+    """
+    Returns the framed bytes of num_messages messages, one in fifty being a large references response
+    """
+    small = {
+        "jsonrpc": "2.0",
+        "method": "textDocument/publishDiagnostics",
+        "params": {"uri": "file:///repo/src/module.py", "diagnostics": []},
+    }
+    location = {
+        "uri": "file:///repo/src/module.py",
+        "range": {"start": {"line": 10, "character": 4}, "end": {"line": 10, "character": 20}},
+    }
+    large = {"jsonrpc": "2.0", "id": 1, "result": [location] * 2000}
+    small_frame = b"".join(create_message(small))
+    large_frame = b"".join(create_message(large))
+    return b"".join(large_frame if i % 50 == 0 else small_frame for i in range(num_messages))
+
+
+async def produce(stream: asyncio.StreamReader, data: bytes) -> None:
+    for start in range(0, len(data), PIPE_CHUNK_SIZE):
+        stream.feed_data(data[start : start + PIPE_CHUNK_SIZE])
+        await asyncio.sleep(0)
+    stream.feed_eof()
+
+
+async def consume_line_based(stream: asyncio.StreamReader) -> int:
+    """
+    The read loop previously used by LanguageServerHandler.run_forever
+    """
+    count = 0
+    while not stream.at_eof():
+        line = await stream.readline()
+        if not line:
+            continue
+        if not line.startswith(b"Content-Length: "):
+            continue
+        num_bytes = int(line.split(b"Content-Length: ")[1].strip())
+        while line and line.strip():
+            line = await stream.readline()
+        if not line:
+            continue
+        await stream.readexactly(num_bytes)
+        count += 1
+    return count
+
+
+async def consume_frame_reader(stream: asyncio.StreamReader) -> int:
+    count = 0
+    reader = FrameReader(stream)
+    while True:
+        frames = await reader.read_frames()
+        if not frames:
+            return count
+        count += len(frames)
+
+
+async def run(consumer, data: bytes) -> float:
+    stream = asyncio.StreamReader(limit=2**24)
+    start = time.perf_counter()
+    _, count = await asyncio.gather(produce(stream, data), consumer(stream))
+    elapsed = time.perf_counter() - start
+    assert count == run.expected_count, (count, run.expected_count)
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    data = build_stream_data(args.messages)
+    run.expected_count = args.messages
+    size_mb = len(data) / 2**20
+
+    print(f"{args.messages} messages, {size_mb:.1f} MiB")
+    for name, consumer in [("readline loop", consume_line_based), ("FrameReader", consume_frame_reader)]:
+        best = min(asyncio.run(run(consumer, data)) for _ in range(args.repeat))
+        print(f"{name:>14}: {best * 1000:8.1f} ms  {args.messages / best:10.0f} msg/s  {size_mb / best:8.1f} MiB/s")
+
+
+if __name__ == "__main__":
+    main()
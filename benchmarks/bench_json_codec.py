@@ -0,0 +1,64 @@
+"""
+Compares the JSON codecs available to the JSON-RPC client on the two payload shapes that dominate
+client side CPU time: encoding a textDocument/didOpen notification carrying a large file, and
+decoding a large textDocument/references response.
+
+Codecs that are not installed (orjson, msgspec) are reported as skipped.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_json_codec.py [--lines N] [--references N]
+"""
+
+import argparse
+import timeit
+
+from multilspy.lsp_protocol_handler.json_codec import JSON_CODECS, StdlibJsonCodec, get_json_codec
+from multilspy.lsp_protocol_handler.server import make_notification, make_response
+
+
+def did_open_payload(num_lines: int) -> dict:
+    text = "".join(f"    value_{i} = compute(value_{i - 1}, 'äöü', {i})  # comment\n" for i in range(num_lines))
+    return make_notification(
+        "textDocument/didOpen",
+        {"textDocument": {"uri": "file:///repo/src/module.py", "languageId": "python", "version": 0, "text": text}},
+    )
+
+
+def references_body(num_references: int) -> bytes:
+    result = [
+        {
+            "uri": f"file:///repo/src/package_{i % 97}/module_{i % 13}.py",
+            "range": {"start": {"line": i, "character": 4}, "end": {"line": i, "character": 20}},
+        }
+        for i in range(num_references)
+    ]
+    return StdlibJsonCodec().encode(make_response(7, result))
+
+
+def best_of(fn, number: int, repeat: int = 5) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=20000)
+    parser.add_argument("--references", type=int, default=50000)
+    args = parser.parse_args()
+
+    did_open = did_open_payload(args.lines)
+    body = memoryview(references_body(args.references))
+    print(f"didOpen: {args.lines} lines; references response: {args.references} locations, {len(body) / 2**20:.1f} MiB")
+
+    for name in JSON_CODECS:
+        try:
+            codec = get_json_codec(name)
+        except ImportError:
+            print(f"{name:>8}: skipped (not installed)")
+            continue
+        encode_time = best_of(lambda: codec.encode(did_open), number=20)
+        decode_time = best_of(lambda: codec.decode(body), number=3)
+        print(f"{name:>8}: encode didOpen {encode_time * 1000:8.2f} ms   decode references {decode_time * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Measures queries spread over many files, each one made without the file being opened by the caller,
+with and without keeping the files open in the language server after their last use, against the fake
+language server in benchmarks/fake_language_server.py.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_keep_open_files.py [--queries N] [--files N]
+        [--file-size KB] [--keep-open N]
+
+Without keep-open, every query reads its file from disk and sends its whole text with didOpen, then
+closes it with didClose.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from fake_language_server import FakeLanguageServer
+from multilspy.multilspy_config import Language, MultilspyConfig
+from multilspy.multilspy_logger import MultilspyLogger
+
+
+async def run(args: argparse.Namespace, root: str, keep_open_files: int) -> None:
+    config = MultilspyConfig(code_language=Language.PYTHON, keep_open_files=keep_open_files)
+    lsp = FakeLanguageServer(config, MultilspyLogger(), root, in_process=True)
+    async with lsp.start_server():
+        start = time.perf_counter()
+        for i in range(args.queries):
+            await lsp.request_definition(f"module_{i % args.files}.py", 0, 4)
+        elapsed = time.perf_counter() - start
+    stats = lsp.get_open_file_stats()
+    label = f"keep_open_files={keep_open_files}" if keep_open_files else "no keep-open"
+    print(
+        f"{label:<22} {args.queries / elapsed:>9.0f} queries/s"
+        f"  didOpen={stats.did_open} didClose={stats.did_close} reused={stats.reused} evictions={stats.evictions}",
+        file=sys.stderr,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=2000, help="Number of queries")
+    parser.add_argument("--files", type=int, default=20, help="Number of files queried in turn")
+    parser.add_argument("--file-size", type=int, default=64, help="Size of each file in KB")
+    parser.add_argument("--keep-open", type=int, default=50, help="Number of files kept open")
+    args = parser.parse_args()
+
+    line = "def function(argument):  # padding\n"
+    contents = line * (args.file_size * 1024 // len(line))
+    with tempfile.TemporaryDirectory() as root:
+        for i in range(args.files):
+            with open(os.path.join(root, f"module_{i}.py"), "w") as f:
+                f.write(contents)
+        for keep_open_files in [0, args.keep_open]:
+            asyncio.run(run(args, root, keep_open_files))
+
+
+if __name__ == "__main__":
+    main()
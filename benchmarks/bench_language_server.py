@@ -0,0 +1,176 @@
+"""
+Measures the client side overhead of the LanguageServer and SyncLanguageServer APIs against the fake
+language server in benchmarks/fake_language_server.py.
+
+Every request method is benchmarked at each concurrency level, reporting the throughput in requests
+per second and the p50/p99 latency of a single call. The asynchronous API runs the concurrent calls as
+tasks on one event loop, the synchronous API runs them from a pool of threads.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_language_server.py [--requests N] [--concurrency 1,8,64]
+        [--api async,sync] [--methods definition,...] [--payload-size N] [--latency MS] [--in-process]
+        [--json PATH]
+
+With --json, the results are also written as JSON to the given path ("-" for stdout), one record
+per API, method and concurrency level, for regression tracking.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+from fake_language_server import FakeLanguageServer
+from multilspy.language_server import SyncLanguageServer
+from multilspy.multilspy_config import Language, MultilspyConfig
+from multilspy.multilspy_logger import MultilspyLogger
+
+FILE_NAME = "main.py"
+FILE_CONTENTS = "".join(f"def function_{i}(argument):\n    return argument + {i}\n\n" for i in range(200))
+
+# Calls benchmarked for each request method, as (method name of LanguageServer, arguments)
+METHODS = {
+    "definition": ("request_definition", (FILE_NAME, 10, 4)),
+    "references": ("request_references", (FILE_NAME, 10, 4)),
+    "completion": ("request_completions", (FILE_NAME, 10, 4)),
+    "document_symbols": ("request_document_symbols", (FILE_NAME,)),
+    "hover": ("request_hover", (FILE_NAME, 10, 4)),
+}
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    return sorted_values[min(int(len(sorted_values) * fraction), len(sorted_values) - 1)]
+
+
+def make_record(api: str, method: str, concurrency: int, latencies: List[float], elapsed: float) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "api": api,
+        "method": method,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "requests_per_second": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+
+async def bench_async(call: Callable, requests: int, concurrency: int) -> tuple:
+    latencies = []
+
+    async def worker(count: int) -> None:
+        for _ in range(count):
+            start = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker(len(range(i, requests, concurrency))) for i in range(concurrency)])
+    return latencies, time.perf_counter() - start
+
+
+def bench_sync(call: Callable, requests: int, concurrency: int) -> tuple:
+    def timed_call(_) -> float:
+        start = time.perf_counter()
+        call()
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        start = time.perf_counter()
+        latencies = list(executor.map(timed_call, range(requests)))
+        return latencies, time.perf_counter() - start
+
+
+async def run_async_api(args: argparse.Namespace, config: MultilspyConfig, logger: MultilspyLogger, root: str) -> List[dict]:
+    records = []
+    lsp = FakeLanguageServer(config, logger, root, args.server_args, args.in_process)
+    async with lsp.start_server():
+        with lsp.open_file(FILE_NAME):
+            for method in args.methods:
+                name, call_args = METHODS[method]
+                call = lambda: getattr(lsp, name)(*call_args)
+                # Warm up the code paths before measuring
+                await bench_async(call, min(args.requests, 100), 1)
+                for concurrency in args.concurrency:
+                    latencies, elapsed = await bench_async(call, args.requests, concurrency)
+                    records.append(make_record("async", method, concurrency, latencies, elapsed))
+                    report(records[-1])
+    return records
+
+
+def run_sync_api(args: argparse.Namespace, config: MultilspyConfig, logger: MultilspyLogger, root: str) -> List[dict]:
+    records = []
+    lsp = SyncLanguageServer(FakeLanguageServer(config, logger, root, args.server_args, args.in_process))
+    with lsp.start_server():
+        with lsp.open_file(FILE_NAME):
+            for method in args.methods:
+                name, call_args = METHODS[method]
+                call = lambda: getattr(lsp, name)(*call_args)
+                bench_sync(call, min(args.requests, 100), 1)
+                for concurrency in args.concurrency:
+                    latencies, elapsed = bench_sync(call, args.requests, concurrency)
+                    records.append(make_record("sync", method, concurrency, latencies, elapsed))
+                    report(records[-1])
+    return records
+
+
+def report(record: dict) -> None:
+    print(
+        f"{record['api']:<6} {record['method']:<17} concurrency={record['concurrency']:<4}"
+        f" {record['requests_per_second']:>9.0f} requests/s"
+        f"  p50={record['p50_ms']:.3f}ms  p99={record['p99_ms']:.3f}ms",
+        file=sys.stderr,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000, help="Number of requests per measurement")
+    parser.add_argument("--concurrency", default="1,8,64", help="Comma separated concurrency levels")
+    parser.add_argument("--api", default="async,sync", help="Comma separated APIs to benchmark")
+    parser.add_argument("--methods", default=",".join(METHODS), help="Comma separated request methods")
+    parser.add_argument("--payload-size", type=int, default=10, help="Number of items per result")
+    parser.add_argument("--latency", type=float, default=0.0, help="Latency of the server in milliseconds")
+    parser.add_argument("--in-process", action="store_true", help="Run the fake server in-process")
+    parser.add_argument("--json", metavar="PATH", help="Write the results as JSON to this path, - for stdout")
+    args = parser.parse_args()
+    args.concurrency = [int(level) for level in args.concurrency.split(",")]
+    args.methods = args.methods.split(",")
+    args.server_args = f"--payload-size {args.payload_size} --latency {args.latency}"
+
+    config = MultilspyConfig(code_language=Language.PYTHON)
+    logger = MultilspyLogger()
+    records = []
+    with tempfile.TemporaryDirectory() as root:
+        with open(os.path.join(root, FILE_NAME), "w") as f:
+            f.write(FILE_CONTENTS)
+        for api in args.api.split(","):
+            if api == "async":
+                records.extend(asyncio.run(run_async_api(args, config, logger, root)))
+            else:
+                records.extend(run_sync_api(args, config, logger, root))
+
+    if args.json:
+        output = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "in_process": args.in_process,
+            "payload_size": args.payload_size,
+            "latency_ms": args.latency,
+            "results": records,
+        }
+        if args.json == "-":
+            json.dump(output, sys.stdout, indent=2)
+        else:
+            with open(args.json, "w") as f:
+                json.dump(output, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Measures the cost of a flood of textDocument/publishDiagnostics notifications in the read loop of
+LanguageServerHandler, when the notifications are registered with discard_notification and dropped
+before decoding, and when they are decoded and dispatched to a handler that does nothing.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_notification_flood.py [--notifications N] [--diagnostics N]
+"""
+
+import argparse
+import asyncio
+import time
+
+from multilspy.lsp_protocol_handler.server import LanguageServerHandler, ProcessLaunchInfo
+
+
+def make_body(handler: LanguageServerHandler, num_diagnostics: int) -> memoryview:
+    diagnostic = {
+        "range": {"start": {"line": 1, "character": 0}, "end": {"line": 1, "character": 10}},
+        "severity": 2,
+        "source": "linter",
+        "message": "unused variable",
+    }
+    payload = {
+        "jsonrpc": "2.0",
+        "method": "textDocument/publishDiagnostics",
+        "params": {"uri": "file:///repo/main.py", "diagnostics": [diagnostic] * num_diagnostics},
+    }
+    return memoryview(handler.codec.encode(payload))
+
+
+async def run(discard: bool, num_notifications: int, num_diagnostics: int) -> float:
+    handler = LanguageServerHandler(ProcessLaunchInfo(cmd=""), logger=lambda source, target, payload: None)
+
+    async def do_nothing(params):
+        return
+
+    if discard:
+        handler.discard_notification("textDocument/publishDiagnostics")
+    else:
+        handler.on_notification("textDocument/publishDiagnostics", do_nothing)
+    body = make_body(handler, num_diagnostics)
+
+    start = time.perf_counter()
+    for _ in range(num_notifications):
+        handler._handle_body(body)
+    while handler.get_in_flight_task_count():
+        await asyncio.sleep(0)
+    return time.perf_counter() - start
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notifications", type=int, default=20000)
+    parser.add_argument("--diagnostics", type=int, default=20, help="Number of diagnostics per notification")
+    args = parser.parse_args()
+
+    for label, discard in [("decoded and dispatched:", False), ("discarded:", True)]:
+        elapsed = await run(discard, args.notifications, args.diagnostics)
+        print(f"{label:<24}{elapsed:.3f}s ({args.notifications / elapsed:.0f} notifications/s)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
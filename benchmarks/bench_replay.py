@@ -0,0 +1,83 @@
+"""
+Records a session of requests against the loopback server in benchmarks/fake_language_server.py and
+replays it, reporting the wall time of the live session, of a replay at the recorded speed and of a
+replay without delays. The latter isolates the client side cost of the requests from the server.
+
+A trace recorded against a real language server (see MultilspyConfig.record_trace_path) can be replayed
+instead with --trace; the requests are then read from the trace.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_replay.py [--requests N] [--concurrency N] [--trace PATH]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+from multilspy.lsp_protocol_handler.server import LanguageServerHandler, ProcessLaunchInfo
+from multilspy.lsp_protocol_handler.trace import CLIENT_TO_SERVER, read_trace
+
+FAKE_SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_language_server.py")
+
+
+async def run_session(launch_info: ProcessLaunchInfo, requests: list, concurrency: int) -> float:
+    """
+    Sends the given (method, params) requests, concurrency at a time, and returns the elapsed time
+    """
+    handler = LanguageServerHandler(launch_info)
+    await handler.start()
+    start = time.perf_counter()
+    for i in range(0, len(requests), concurrency):
+        await asyncio.gather(*[handler.send_request(method, params) for method, params in requests[i : i + concurrency]])
+    elapsed = time.perf_counter() - start
+    await handler.shutdown()
+    await handler.stop()
+    return elapsed
+
+
+def requests_from_trace(path: str) -> list:
+    requests = []
+    for record in read_trace(path):
+        if record.direction == CLIENT_TO_SERVER:
+            payload = json.loads(record.body)
+            if "id" in payload and "method" in payload:
+                requests.append((payload["method"], payload.get("params")))
+    return requests
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--trace", help="Replay this trace instead of recording one")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        trace_path = args.trace
+        if trace_path is None:
+            trace_path = os.path.join(tmp_dir, "session.trace")
+            requests = [("test/echo", {"n": i, "text": "x" * 200}) for i in range(args.requests)]
+            live_launch_info = ProcessLaunchInfo(
+                cmd=f'"{sys.executable}" "{FAKE_SERVER}"',
+                env={"PYTHONPATH": os.pathsep.join(sys.path)},
+                record_trace_path=trace_path,
+            )
+            elapsed = await run_session(live_launch_info, requests, args.concurrency)
+            print(f"live:           {elapsed:.3f}s")
+        else:
+            # Requests of a trace must be replayed in their recorded order
+            requests = requests_from_trace(trace_path)
+            args.concurrency = 1
+
+        for label, speed in [("replay 1x:", 1.0), ("replay no delay:", 0.0)]:
+            launch_info = ProcessLaunchInfo(cmd="", transport="replay", replay_trace_path=trace_path, replay_speed=speed)
+            elapsed = await run_session(launch_info, requests, args.concurrency)
+            print(f"{label:<16}{elapsed:.3f}s ({len(requests) / elapsed:.0f} requests/s)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,55 @@
+"""
+Compares answering many definition/references/hover queries with one awaited request after another, and
+with LanguageServer.request_batch, against the fake language server in benchmarks/fake_language_server.py.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_request_batch.py [--queries N] [--files N] [--latency MS]
+        [--max-in-flight N]
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from fake_language_server import FakeLanguageServer
+from multilspy.multilspy_config import Language, MultilspyConfig
+from multilspy.multilspy_logger import MultilspyLogger
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=3000)
+    parser.add_argument("--files", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=1.0, help="Latency of the server in milliseconds")
+    parser.add_argument("--max-in-flight", type=int, default=64)
+    args = parser.parse_args()
+
+    methods = ["definition", "references", "hover"]
+    with tempfile.TemporaryDirectory() as root:
+        files = [f"module_{i}.py" for i in range(args.files)]
+        for file in files:
+            with open(os.path.join(root, file), "w") as f:
+                f.write("value = 1\n" * 100)
+        queries = [(methods[i % len(methods)], files[i % len(files)], i % 100, 0) for i in range(args.queries)]
+
+        config = MultilspyConfig(code_language=Language.PYTHON)
+        lsp = FakeLanguageServer(config, MultilspyLogger(), root, f"--latency {args.latency}")
+        async with lsp.start_server():
+            start = time.perf_counter()
+            sequential = []
+            for method, file, line, column in queries:
+                sequential.append(await getattr(lsp, f"request_{method}")(file, line, column))
+            elapsed = time.perf_counter() - start
+            print(f"sequential:    {elapsed:.3f}s ({len(queries) / elapsed:.0f} queries/s)")
+
+            start = time.perf_counter()
+            batched = await lsp.request_batch(queries, max_in_flight=args.max_in_flight)
+            elapsed = time.perf_counter() - start
+            print(f"request_batch: {elapsed:.3f}s ({len(queries) / elapsed:.0f} queries/s)")
+            assert batched == sequential
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
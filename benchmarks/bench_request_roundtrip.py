@@ -0,0 +1,104 @@
+"""
+Measures the client side round-trip overhead of LanguageServerHandler.send_request against the
+loopback server in benchmarks/fake_language_server.py.
+
+The future based request table is compared with the previous implementation, in which every
+request waited on its own asyncio.Condition and every response was delivered by a separate task
+that had to acquire that condition to notify the waiter.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_request_roundtrip.py [--requests N] [--concurrency N]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from multilspy.lsp_protocol_handler.server import Error, ErrorCodes, LanguageServerHandler, ProcessLaunchInfo, make_request
+
+FAKE_SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_language_server.py")
+
+
+class ConditionRequest:
+    """
+    The per-request object used previously to wait for a response
+    """
+
+    def __init__(self) -> None:
+        self.cv = asyncio.Condition()
+        self.result = None
+        self.error = None
+
+    async def on_result(self, params) -> None:
+        self.result = params
+        async with self.cv:
+            self.cv.notify()
+
+    async def on_error(self, err: Error) -> None:
+        self.error = err
+        async with self.cv:
+            self.cv.notify()
+
+
+class ConditionLanguageServerHandler(LanguageServerHandler):
+    """
+    LanguageServerHandler with the previous asyncio.Condition based request correlation
+    """
+
+    async def send_request(self, method, params=None):
+        request = ConditionRequest()
+        request_id = self.request_id
+        self.request_id += 1
+        self._response_handlers[request_id] = request
+        async with request.cv:
+            await self._send_payload(make_request(method, request_id, params))
+            await request.cv.wait()
+        if isinstance(request.error, Error):
+            raise request.error
+        return request.result
+
+    def _response_handler(self, response):
+        request = self._response_handlers.pop(response["id"])
+        if "result" in response:
+            coro = request.on_result(response["result"])
+        else:
+            coro = request.on_error(Error(ErrorCodes.InvalidRequest, ""))
+        self._create_task(coro)
+
+
+async def measure(handler_cls, num_requests: int, concurrency: int) -> float:
+    env = {"PYTHONPATH": os.pathsep.join(sys.path)}
+    handler = handler_cls(ProcessLaunchInfo(cmd=f'"{sys.executable}" "{FAKE_SERVER}"', env=env))
+    await handler.start()
+    params = {"textDocument": {"uri": "file:///repo/src/module.py"}, "position": {"line": 10, "character": 4}}
+
+    async def worker(count: int) -> None:
+        for _ in range(count):
+            await handler.send_request("textDocument/definition", params)
+
+    await worker(100)  # warm up
+    start = time.perf_counter()
+    await asyncio.gather(*[worker(num_requests // concurrency) for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    await handler.shutdown()
+    await handler.stop()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16])
+    args = parser.parse_args()
+
+    for concurrency in args.concurrency:
+        for name, handler_cls in [("asyncio.Condition", ConditionLanguageServerHandler), ("future", LanguageServerHandler)]:
+            elapsed = asyncio.run(measure(handler_cls, args.requests, concurrency))
+            per_request = elapsed / args.requests * 1e6
+            print(f"concurrency {concurrency:>3} {name:>17}: {per_request:8.1f} us/request  {args.requests / elapsed:10.0f} req/s")
+
+
+if __name__ == "__main__":
+    main()
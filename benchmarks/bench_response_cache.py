@@ -0,0 +1,77 @@
+"""
+Measures repeated definition, references and hover queries at the same positions of an unchanged file,
+with and without the response caches of LanguageServer, against the fake language server in
+benchmarks/fake_language_server.py.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_response_cache.py [--queries N] [--positions N]
+        [--cache-size N] [--payload-size N] [--latency MS] [--startup-delay S]
+
+The queries cycle through --positions distinct positions, so with a cache holding at least that many
+responses only the first query at each position reaches the server.
+
+The persistent cache is measured over two runs sharing a database, the second one answered without
+starting the server. The time of each run includes the startup of the server, which the fake server
+simulates with --startup-delay.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from fake_language_server import FakeLanguageServer
+from multilspy.multilspy_config import Language, MultilspyConfig
+from multilspy.multilspy_logger import MultilspyLogger
+
+FILE_NAME = "main.py"
+FILE_CONTENTS = "".join(f"def function_{i}(argument):\n    return argument + {i}\n\n" for i in range(200))
+METHODS = ["request_definition", "request_references", "request_hover"]
+
+
+async def run(args: argparse.Namespace, root: str, label: str, **config_options) -> None:
+    config = MultilspyConfig(code_language=Language.PYTHON, **config_options)
+    lsp = FakeLanguageServer(config, MultilspyLogger(), root, args.server_args, in_process=True)
+    start = time.perf_counter()
+    async with lsp.start_server():
+        with lsp.open_file(FILE_NAME):
+            for i in range(args.queries):
+                method = METHODS[i % len(METHODS)]
+                await getattr(lsp, method)(FILE_NAME, (i // len(METHODS)) % args.positions * 3, 4)
+    elapsed = time.perf_counter() - start
+    stats = lsp.get_persistent_cache_stats() if config.persistent_cache else lsp.get_response_cache_stats()
+    print(
+        f"{label:<22} {elapsed:>7.3f}s {args.queries / elapsed:>9.0f} queries/s"
+        f"  hits={stats.hits} misses={stats.misses} evictions={stats.evictions}",
+        file=sys.stderr,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=3000, help="Number of queries")
+    parser.add_argument("--positions", type=int, default=50, help="Number of distinct positions queried")
+    parser.add_argument("--cache-size", type=int, default=1000, help="Number of responses kept in the cache")
+    parser.add_argument("--payload-size", type=int, default=100, help="Number of items per result")
+    parser.add_argument("--latency", type=float, default=1.0, help="Latency of the server in milliseconds")
+    parser.add_argument("--startup-delay", type=float, default=1.0, help="Time in seconds the server takes to start")
+    args = parser.parse_args()
+    args.server_args = (
+        f"--payload-size {args.payload_size} --latency {args.latency}"
+        f" --method-latency initialize={args.startup_delay * 1000}"
+    )
+
+    with tempfile.TemporaryDirectory() as root:
+        with open(os.path.join(root, FILE_NAME), "w") as f:
+            f.write(FILE_CONTENTS)
+        asyncio.run(run(args, root, "no cache"))
+        asyncio.run(run(args, root, f"cache_size={args.cache_size}", response_cache_size=args.cache_size))
+        persistent_cache_path = os.path.join(root, "responses.sqlite")
+        for label in ["persistent, first run", "persistent, second run"]:
+            asyncio.run(run(args, root, label, persistent_cache=True, persistent_cache_path=persistent_cache_path))
+
+
+if __name__ == "__main__":
+    main()
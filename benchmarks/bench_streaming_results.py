@@ -0,0 +1,70 @@
+"""
+Compares a large textDocument/references result received with send_request, which reads and decodes the
+whole body before returning, and with send_request_stream, which decodes the result array while the body
+is read. Reports the time to the first location and the total time, against the fake language server in
+benchmarks/fake_language_server.py. With --memory, the peak memory allocated by Python while receiving
+the result is reported instead, from a separate run since tracing allocations slows down decoding.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_streaming_results.py [--locations N] [--memory]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+
+from multilspy.lsp_protocol_handler.server import LanguageServerHandler, ProcessLaunchInfo
+
+FAKE_SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_language_server.py")
+PARAMS = {"textDocument": {"uri": "file:///repo/main.py"}, "position": {"line": 0, "character": 0}}
+
+
+async def receive_whole(handler: LanguageServerHandler) -> float:
+    result = await handler.send_request("textDocument/references", PARAMS)
+    first_item = time.perf_counter()
+    for _ in result:
+        pass
+    return first_item
+
+
+async def receive_streamed(handler: LanguageServerHandler) -> float:
+    first_item = None
+    async for _ in handler.send_request_stream("textDocument/references", PARAMS):
+        if first_item is None:
+            first_item = time.perf_counter()
+    return first_item
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--locations", type=int, default=200000)
+    parser.add_argument("--memory", action="store_true", help="Report the peak memory instead of the times")
+    args = parser.parse_args()
+
+    launch_info = ProcessLaunchInfo(
+        cmd=f'"{sys.executable}" "{FAKE_SERVER}" --payload-size {args.locations}',
+        env={"PYTHONPATH": os.pathsep.join(sys.path)},
+    )
+    handler = LanguageServerHandler(launch_info)
+    await handler.start()
+    for label, receive in [("send_request:", receive_whole), ("send_request_stream:", receive_streamed)]:
+        if args.memory:
+            tracemalloc.start()
+            await receive(handler)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{label:<22} peak memory {peak / 1024 / 1024:.1f} MiB")
+        else:
+            start = time.perf_counter()
+            first_item = await receive(handler)
+            elapsed = time.perf_counter() - start
+            print(f"{label:<22} first location after {first_item - start:.3f}s, total {elapsed:.3f}s")
+    await handler.shutdown()
+    await handler.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
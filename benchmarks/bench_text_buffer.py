@@ -0,0 +1,98 @@
+"""
+Measures token by token editing of a large file, as done by insert_text_at_position, with the line
+indexed TextBuffer of LSPFileBuffer against rebuilding the contents string on every edit, and the
+conversion of UTF-16 columns of positions in a non-ASCII file against encoding the line every time,
+and the bulk conversion of positions to offsets with get_offsets against converting them one by one.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_text_buffer.py [--lines N] [--edits N] [--positions N]
+        [--padding N]
+
+Each edit inserts a short token after the previous one, starting in the middle of the file, and
+converts the position of the cursor back to an offset.
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from multilspy.multilspy_utils import TextUtils
+from multilspy.text_buffer import UTF16, TextBuffer
+
+TOKENS = ["value", " = ", "compute", "(", "argument", ")", "\n    "]
+
+
+def edit_string(text: str, line: int, edits: int) -> str:
+    column = 0
+    for i in range(edits):
+        token = TOKENS[i % len(TOKENS)]
+        index = TextUtils.get_index_from_line_col(text, line, column)
+        text = text[:index] + token + text[index:]
+        line, column = TextUtils.get_updated_position_from_line_and_column_and_edit(line, column, token)
+    return text
+
+
+def edit_buffer(text: str, line: int, edits: int) -> str:
+    buffer = TextBuffer(text)
+    column = 0
+    for i in range(edits):
+        token = TOKENS[i % len(TOKENS)]
+        buffer.get_offset(line, column)
+        buffer.replace(line, column, line, column, token)
+        line, column = TextUtils.get_updated_position_from_line_and_column_and_edit(line, column, token)
+    return buffer.text
+
+
+def convert_by_encoding(lines, positions) -> list:
+    return [len(lines[line][:column].encode("utf-16-le")) // 2 for line, column in positions]
+
+
+def convert_with_buffer(buffer: TextBuffer, positions) -> list:
+    return [buffer.get_units(line, column, UTF16) for line, column in positions]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=10000, help="Number of lines of the file")
+    parser.add_argument("--edits", type=int, default=5000, help="Number of tokens inserted")
+    parser.add_argument("--positions", type=int, default=100000, help="Number of positions converted")
+    parser.add_argument("--padding", type=int, default=0, help="Characters added to each line of the non-ASCII file")
+    args = parser.parse_args()
+
+    text = "".join(f"def function_{i}(argument):  # line {i}\n" for i in range(args.lines))
+    results = []
+    for name, edit in [("string", edit_string), ("text buffer", edit_buffer)]:
+        start = time.perf_counter()
+        results.append(edit(text, args.lines // 2, args.edits))
+        elapsed = time.perf_counter() - start
+        print(f"{name:<12} {args.edits / elapsed:>9.0f} edits/s", file=sys.stderr)
+    assert results[0] == results[1]
+
+    padding = "x" * args.padding
+    text = "".join(f"label_{i} = '\u00e9t\u00e9 \U0001f600 {i}' {padding} # line {i}\n" for i in range(args.lines))
+    lines = text.split("\n")
+    rng = random.Random(0)
+    # Queries come back to the same lines, as for the locations of a references result
+    hot_lines = [rng.randrange(args.lines) for _ in range(500)]
+    positions = [(line, rng.randrange(len(lines[line]))) for line in (rng.choice(hot_lines) for _ in range(args.positions))]
+    buffer = TextBuffer(text)
+    results = []
+    for name, convert in [("encode", lambda: convert_by_encoding(lines, positions)), ("unit tables", lambda: convert_with_buffer(buffer, positions))]:
+        start = time.perf_counter()
+        results.append(convert())
+        elapsed = time.perf_counter() - start
+        print(f"{name:<12} {args.positions / elapsed:>9.0f} UTF-16 conversions/s", file=sys.stderr)
+    assert results[0] == results[1]
+
+    results = []
+    for name, convert in [("one by one", lambda: [buffer.get_offset(*position) for position in positions]), ("bulk", lambda: buffer.get_offsets(positions))]:
+        start = time.perf_counter()
+        results.append(convert())
+        elapsed = time.perf_counter() - start
+        print(f"{name:<12} {args.positions / elapsed:>9.0f} offset conversions/s", file=sys.stderr)
+    assert results[0] == results[1]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,381 @@
+"""
+A fake language server used to measure the overhead of the multilspy client apart from the cost of
+a real language server.
+
+The server answers initialize, shutdown, workspace/symbol, completionItem/resolve and the textDocument/definition,
+references, completion, documentSymbol and hover requests with synthetic results of a configurable size, after a
+configurable latency. Any other request is answered with its params as the result. With the default options every
+request is answered immediately, so the time measured by a client is almost entirely spent in the
+client and in the pipe. The server uses the first position encoding offered by the client in initialize
+among the ones given with --position-encodings.
+
+Two params keys change the behaviour for tests:
+    "error": the request is answered with this error object instead of a result.
+    "hang": the request is not answered until the client sends $/cancelRequest for it, in which
+        case it is answered with the RequestCancelled error.
+
+$/cancelRequest likewise cancels a request that is waiting for its latency to elapse.
+
+The test/stats request is answered with the maximum number of requests that waited for their latency at the same
+time, as maxInFlight, so that tests check that requests were sent concurrently without timing them.
+
+With --indexing, the server reports indexing as work done progress with $/progress for the given time after the
+client sends initialized, and answers completion requests with incomplete results until indexing ends.
+
+Usage:
+    python benchmarks/fake_language_server.py [--tcp PORT | --unix PATH] [--payload-size N]
+        [--latency MS] [--method-latency METHOD=MS ...] [--stderr-lines N] [--position-encodings ENCODINGS]
+        [--indexing MS]
+
+By default the server communicates over stdio. With --tcp or --unix it listens on the given socket
+and serves a single connection.
+
+The server can also run in-process, in a thread communicating with the client over pipes: pass
+transport=IN_PROCESS_TRANSPORT in the ProcessLaunchInfo, with the command line options above as cmd,
+within in_process_transport(). FakeLanguageServer wraps the server in the LanguageServer API, and
+registers the in-process transport itself if needed.
+"""
+
+import argparse
+import asyncio
+import os
+import pathlib
+import shlex
+import sys
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+
+from multilspy.language_server import LanguageServer
+from multilspy.lsp_protocol_handler.json_codec import get_json_codec
+from multilspy.lsp_protocol_handler.lsp_types import LSPErrorCodes
+from multilspy.lsp_protocol_handler.server import (
+    Error,
+    ProcessLaunchInfo,
+    create_message,
+    make_error_response,
+    make_notification,
+    make_response,
+)
+from multilspy.lsp_protocol_handler.transport import DEFAULT_CHUNK_SIZE, TRANSPORTS, FrameReader, Transport
+from multilspy.multilspy_config import MultilspyConfig
+from multilspy.multilspy_logger import MultilspyLogger
+
+# Name of the transport running the fake server in-process
+IN_PROCESS_TRANSPORT = "fake-in-process"
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--tcp", type=int, metavar="PORT")
+    group.add_argument("--unix", metavar="PATH")
+    parser.add_argument(
+        "--payload-size",
+        type=int,
+        default=10,
+        metavar="N",
+        help="Number of locations, completion items and symbols per result, and of lines per hover",
+    )
+    parser.add_argument("--latency", type=float, default=0.0, metavar="MS", help="Latency of every request")
+    parser.add_argument(
+        "--method-latency",
+        action="append",
+        default=[],
+        metavar="METHOD=MS",
+        help="Latency of the requests of the given method, overriding --latency",
+    )
+    parser.add_argument(
+        "--stderr-lines", type=int, default=0, metavar="N", help="Number of log lines written to stderr on startup"
+    )
+    parser.add_argument(
+        "--position-encodings",
+        default="utf-8,utf-16,utf-32",
+        metavar="ENCODINGS",
+        help="Comma separated position encodings supported, the first one offered by the client is used",
+    )
+    parser.add_argument(
+        "--indexing", type=float, default=0.0, metavar="MS", help="Time spent indexing after initialized"
+    )
+    args = parser.parse_args(argv)
+    args.position_encodings = args.position_encodings.split(",")
+    args.method_latencies = {}
+    for item in args.method_latency:
+        method, _, latency = item.rpartition("=")
+        args.method_latencies[method] = float(latency)
+    return args
+
+
+def make_range(line: int) -> dict:
+    return {"start": {"line": line, "character": 0}, "end": {"line": line, "character": 8}}
+
+
+def make_result(method: str, params: dict, size: int, position_encodings: List[str] = ("utf-16",)):
+    """
+    Returns the synthetic result of a request with the given method
+    """
+    if method == "initialize":
+        offered = params.get("capabilities", {}).get("general", {}).get("positionEncodings", [])
+        position_encoding = next((encoding for encoding in offered if encoding in position_encodings), "utf-16")
+        return {
+            "capabilities": {
+                "positionEncoding": position_encoding,
+                "textDocumentSync": {"openClose": True, "change": 2},
+                "definitionProvider": True,
+                "referencesProvider": True,
+                "completionProvider": {"triggerCharacters": ["."], "resolveProvider": True},
+                "documentSymbolProvider": True,
+                "hoverProvider": True,
+            },
+            "serverInfo": {"name": "fake-language-server"},
+        }
+    if method in ("textDocument/definition", "textDocument/references"):
+        uri = params["textDocument"]["uri"]
+        return [{"uri": uri, "range": make_range(i)} for i in range(size)]
+    if method == "textDocument/completion":
+        items = [
+            {"label": f"item_{i}", "kind": 6, "insertText": f"item_{i}", "detail": f"int item_{i}"} for i in range(size)
+        ]
+        return {"isIncomplete": False, "items": items}
+    if method == "completionItem/resolve":
+        return dict(params, documentation={"kind": "markdown", "value": f"Documentation of {params['label']}"})
+    if method == "textDocument/documentSymbol":
+        return [{"name": f"symbol_{i}", "kind": 12, "range": make_range(i), "selectionRange": make_range(i)} for i in range(size)]
+    if method == "workspace/symbol":
+        return [
+            {
+                "name": f"symbol_{i}",
+                "kind": 12,
+                "location": {"uri": f"file:///repo/module_{i % 100}.py", "range": make_range(i)},
+            }
+            for i in range(size)
+        ]
+    if method == "textDocument/hover":
+        value = "\n".join(f"line {i} of the hover documentation" for i in range(size))
+        return {"contents": {"kind": "markdown", "value": value}}
+    return params
+
+
+async def serve(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, args: argparse.Namespace) -> None:
+    """
+    Serves the client connected to the given streams until it sends exit or closes the connection
+    """
+    codec = get_json_codec()
+    frame_reader = FrameReader(reader)
+    # Requests waiting for their latency to elapse, or hanging until they are cancelled
+    pending: Dict[object, asyncio.Task] = {}
+    max_in_flight = 0
+    indexing: Optional[asyncio.Task] = None
+
+    def respond(response) -> None:
+        writer.writelines(create_message(response, codec))
+
+    async def respond_later(request_id, result, delay: Optional[float]) -> None:
+        try:
+            if delay is None:
+                await asyncio.get_running_loop().create_future()
+            await asyncio.sleep(delay)
+            respond(make_response(request_id, result))
+        finally:
+            pending.pop(request_id, None)
+
+    async def index() -> None:
+        respond(make_notification("$/progress", {"token": "indexing", "value": {"kind": "begin", "title": "Indexing"}}))
+        await asyncio.sleep(args.indexing / 1000)
+        respond(make_notification("$/progress", {"token": "indexing", "value": {"kind": "end"}}))
+        await writer.drain()
+
+    def handle(message: dict) -> bool:
+        nonlocal indexing, max_in_flight
+        method = message.get("method")
+        if method == "exit":
+            return False
+        params = message.get("params") or {}
+        if method == "initialized" and args.indexing > 0:
+            indexing = asyncio.create_task(index())
+        if method == "$/cancelRequest" and params["id"] in pending:
+            pending[params["id"]].cancel()
+            respond(make_error_response(params["id"], Error(LSPErrorCodes.RequestCancelled, "Request cancelled")))
+        if "id" not in message:
+            return True
+        if method == "shutdown":
+            respond(make_response(message["id"], None))
+        elif isinstance(params, dict) and "error" in params:
+            respond({"jsonrpc": "2.0", "id": message["id"], "error": params["error"]})
+        elif method == "test/stats":
+            respond(make_response(message["id"], {"maxInFlight": max_in_flight}))
+        elif isinstance(params, dict) and params.get("hang"):
+            pending[message["id"]] = asyncio.create_task(respond_later(message["id"], None, None))
+        else:
+            result = make_result(method, params, args.payload_size, args.position_encodings)
+            if method == "textDocument/completion" and indexing is not None and not indexing.done():
+                result["isIncomplete"] = True
+            latency = args.method_latencies.get(method, args.latency)
+            if latency > 0:
+                pending[message["id"]] = asyncio.create_task(respond_later(message["id"], result, latency / 1000))
+                max_in_flight = max(max_in_flight, len(pending))
+            else:
+                respond(make_response(message["id"], result))
+        return True
+
+    try:
+        while True:
+            bodies = await frame_reader.read_frames()
+            if not bodies:
+                return
+            for body in bodies:
+                if not handle(codec.decode(body)):
+                    return
+            await writer.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        pass
+    finally:
+        for task in list(pending.values()):
+            task.cancel()
+        if indexing is not None:
+            indexing.cancel()
+        writer.close()
+
+
+async def open_pipe_streams(read_pipe, write_pipe):
+    """
+    Returns an asyncio StreamReader and StreamWriter over the given pipe file objects
+    """
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader(limit=DEFAULT_CHUNK_SIZE)
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), read_pipe)
+    transport, protocol = await loop.connect_write_pipe(asyncio.streams.FlowControlMixin, write_pipe)
+    writer = asyncio.StreamWriter(transport, protocol, reader, loop)
+    return reader, writer
+
+
+async def serve_pipes(read_pipe, write_pipe, args: argparse.Namespace) -> None:
+    reader, writer = await open_pipe_streams(read_pipe, write_pipe)
+    await serve(reader, writer, args)
+
+
+async def serve_socket(args: argparse.Namespace) -> None:
+    """
+    Listens on the socket given on the command line and serves the first connection accepted
+    """
+    done = asyncio.Event()
+
+    async def on_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        if done.is_set():
+            writer.close()
+            return
+        done.set()
+        server.close()
+        await serve(reader, writer, args)
+        finished.set()
+
+    finished = asyncio.Event()
+    if args.tcp is not None:
+        server = await asyncio.start_server(on_connection, "127.0.0.1", args.tcp, reuse_address=True, limit=DEFAULT_CHUNK_SIZE)
+    else:
+        server = await asyncio.start_unix_server(on_connection, args.unix, limit=DEFAULT_CHUNK_SIZE)
+    await finished.wait()
+
+
+class InProcessTransport(Transport):
+    """
+    Runs the fake language server in a thread of the current process, with its own event loop, and
+    communicates with it over a pair of pipes. launch_info.cmd holds the server's command line options.
+    """
+
+    def __init__(self, launch_info: ProcessLaunchInfo) -> None:
+        super().__init__(launch_info)
+        self._thread: Optional[threading.Thread] = None
+
+    async def open(self) -> None:
+        args = parse_args(shlex.split(self.launch_info.cmd))
+        client_read, server_write = os.pipe()
+        server_read, client_write = os.pipe()
+        server_pipes = (os.fdopen(server_read, "rb", buffering=0), os.fdopen(server_write, "wb", buffering=0))
+        self._thread = threading.Thread(target=asyncio.run, args=(serve_pipes(*server_pipes, args),), daemon=True)
+        self._thread.start()
+        self.reader, self.writer = await open_pipe_streams(
+            os.fdopen(client_read, "rb", buffering=0), os.fdopen(client_write, "wb", buffering=0)
+        )
+
+    async def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+        if self._thread is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self._thread.join)
+            self._thread = None
+
+
+@contextmanager
+def in_process_transport() -> Iterator[None]:
+    """
+    Registers the transport running the fake server in-process for the duration of the block
+    """
+    TRANSPORTS[IN_PROCESS_TRANSPORT] = InProcessTransport
+    try:
+        yield
+    finally:
+        TRANSPORTS.pop(IN_PROCESS_TRANSPORT, None)
+
+
+class FakeLanguageServer(LanguageServer):
+    """
+    Provides the LanguageServer API over the fake language server, launched as a subprocess or run
+    in-process.
+    """
+
+    def __init__(
+        self,
+        config: MultilspyConfig,
+        logger: MultilspyLogger,
+        repository_root_path: str,
+        server_args: str = "",
+        in_process: bool = False,
+    ):
+        if in_process:
+            TRANSPORTS.setdefault(IN_PROCESS_TRANSPORT, InProcessTransport)
+            process_launch_info = ProcessLaunchInfo(cmd=server_args, transport=IN_PROCESS_TRANSPORT)
+        else:
+            process_launch_info = ProcessLaunchInfo(
+                cmd=f'"{sys.executable}" "{os.path.abspath(__file__)}" {server_args}',
+                cwd=repository_root_path,
+                env={"PYTHONPATH": os.pathsep.join(sys.path)},
+            )
+        super().__init__(config, logger, repository_root_path, process_launch_info, config.code_language.value)
+
+    @asynccontextmanager
+    async def start_server(self) -> AsyncIterator["FakeLanguageServer"]:
+        """
+        Starts the fake language server and yields the LanguageServer instance, ready to serve requests
+        """
+        async with super().start_server():
+            await self.server.start()
+            await self._priv_send_initialize(
+                {
+                    "processId": os.getpid(),
+                    "rootUri": pathlib.Path(self.repository_root_path).as_uri(),
+                    "capabilities": {},
+                }
+            )
+            self.server.notify.initialized({})
+            self.completions_available.set()
+
+            yield self
+
+            await self.server.shutdown()
+            await self.server.stop()
+
+
+def main() -> None:
+    args = parse_args()
+    for i in range(args.stderr_lines):
+        print(f"log line {i}", file=sys.stderr)
+    sys.stderr.flush()
+    if args.tcp is None and args.unix is None:
+        asyncio.run(serve_pipes(sys.stdin.buffer, sys.stdout.buffer, args))
+    else:
+        asyncio.run(serve_socket(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+This file contains the tracking of the readiness of the Language Server, used by LanguageServer.request_completions
+to wait for the server to finish its work before resending a completion request that returned an incomplete result,
+instead of resending it immediately.
+"""
+
+import asyncio
+import dataclasses
+import re
+from typing import Any, Dict, List, Optional, Set
+
+# Reasons for which request_completions stopped retrying with an incomplete result, see CompletionReport.reason
+REASON_DEADLINE = "deadline"
+REASON_MAX_ROUND_TRIPS = "max_round_trips"
+
+# Matches the bodies of the $/progress notifications beginning or ending work, the only ones decoded to track the
+# readiness of servers whose progress notifications are otherwise discarded
+PROGRESS_BOUNDARY_PATTERN = re.compile(rb'"kind"\s*:\s*"(?:begin|end)"')
+
+
+@dataclasses.dataclass
+class CompletionReport:
+    """
+    Describes how the result of the last call to request_completions was obtained.
+    """
+
+    # Number of textDocument/completion requests sent to the Language Server
+    round_trips: int = 0
+
+    # Whether the result was filtered from a previous result of the same identifier, without a request
+    filtered: bool = False
+
+    # Whether the last response of the Language Server was incomplete
+    incomplete: bool = False
+
+    # Why retrying stopped with an incomplete result: REASON_DEADLINE or REASON_MAX_ROUND_TRIPS, "" if complete
+    reason: str = ""
+
+    # The work the Language Server reported in progress when retrying stopped, e.g. "Indexing"
+    pending_work: List[str] = dataclasses.field(default_factory=list)
+
+    # Time in seconds spent waiting for the Language Server to be ready between requests
+    wait_time: float = 0.0
+
+    # Time in seconds of the whole call
+    elapsed: float = 0.0
+
+
+class ServerReadiness:
+    """
+    Tracks the signals by which a Language Server reports whether it is busy: work done progress ($/progress), the
+    quiescent flag of experimental/serverStatus, and the registration of capabilities with client/registerCapability.
+    """
+
+    def __init__(self) -> None:
+        # Titles of the work done progress that has begun and not yet ended, by token
+        self.work: Dict[Any, str] = {}
+        # Whether the last experimental/serverStatus notification reported the server as quiescent
+        self.quiescent = True
+        self.status_message = ""
+        # Methods of the capabilities registered by the server
+        self.registrations: Set[str] = set()
+        self._changed = asyncio.Event()
+
+    def reset(self) -> None:
+        """
+        Forgets the signals of a previous run of the Language Server
+        """
+        self.work.clear()
+        self.quiescent = True
+        self.status_message = ""
+        self.registrations.clear()
+
+    @property
+    def busy(self) -> bool:
+        return bool(self.work) or not self.quiescent
+
+    def pending_work(self) -> List[str]:
+        """
+        Returns descriptions of the work the Language Server reported in progress
+        """
+        pending = list(self.work.values())
+        if not self.quiescent:
+            pending.append(self.status_message or "not quiescent")
+        return pending
+
+    def on_progress(self, params: dict) -> None:
+        value = params.get("value")
+        if not isinstance(value, dict):
+            return
+        if value.get("kind") == "begin":
+            self.work[params["token"]] = value.get("title", "")
+        elif value.get("kind") == "end":
+            self.work.pop(params["token"], None)
+        else:
+            return
+        self._notify()
+
+    def on_server_status(self, params: dict) -> None:
+        self.quiescent = params.get("quiescent", True)
+        self.status_message = params.get("message") or params.get("health", "")
+        self._notify()
+
+    def on_register_capability(self, params: dict) -> None:
+        for registration in params.get("registrations", []):
+            self.registrations.add(registration["method"])
+        self._notify()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait_until_ready(
+        self, delay: float, timeout: Optional[float], max_busy_wait: Optional[float] = None
+    ) -> float:
+        """
+        Waits until the Language Server is ready for a request to be resent, and returns the time waited. While the
+        server is idle, this is delay seconds. While it is busy, this is until it reports the end of its work, which
+        makes it ready at once, or until max_busy_wait seconds passed, in case the end is never reported.
+
+        :param delay: Time in seconds to wait while the server is idle
+        :param timeout: Maximum time in seconds to wait, None for no limit other than max_busy_wait
+        :param max_busy_wait: Maximum time in seconds to wait while the server is busy, None to wait for as long as
+            the server is busy
+        """
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        deadline = None if timeout is None else start + timeout
+        busy_deadline = deadline
+        if max_busy_wait is not None:
+            busy_deadline = min(start + max_busy_wait, deadline if deadline is not None else float("inf"))
+        while True:
+            now = loop.time()
+            if self.busy:
+                if busy_deadline is not None and now >= busy_deadline:
+                    break
+                await self._wait_for_change(None if busy_deadline is None else busy_deadline - now)
+                if not self.busy:
+                    break
+            else:
+                end = start + delay if deadline is None else min(start + delay, deadline)
+                if now >= end:
+                    break
+                await self._wait_for_change(end - now)
+        return loop.time() - start
+
+    async def _wait_for_change(self, timeout: Optional[float]) -> None:
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
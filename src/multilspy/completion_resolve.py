@@ -0,0 +1,172 @@
+"""
+This file contains the completion handles returned by LanguageServer.request_completion_handles, whose details are
+resolved with completionItem/resolve only when asked for, and the resolver sending these requests concurrently under
+a limit and caching their results.
+"""
+
+import asyncio
+import dataclasses
+import json
+from typing import Awaitable, Callable, Dict, List
+
+from . import multilspy_types
+from .lsp_protocol_handler import lsp_types as LSPTypes
+from .response_cache import MISSING, ResponseCache
+
+
+@dataclasses.dataclass
+class ResolveStats:
+    """
+    Counters of the completion items resolved by a CompletionResolver.
+    """
+
+    # completionItem/resolve requests sent to the Language Server
+    requests: int = 0
+
+    # Items resolved from the cache of previous results
+    cache_hits: int = 0
+
+    # Items resolved by a request already in flight for the same item
+    joined: int = 0
+
+
+class CompletionHandle:
+    """
+    A completion item whose label fields are available at once, and whose details, such as the signature in detail
+    and the documentation, are resolved by the Language Server on demand.
+    """
+
+    __slots__ = ("item", "lsp_item", "_resolver")
+
+    def __init__(
+        self, item: multilspy_types.CompletionItem, lsp_item: LSPTypes.CompletionItem, resolver: "CompletionResolver"
+    ) -> None:
+        """
+        :param item: The completion item as returned by request_completions
+        :param lsp_item: The completion item returned by the Language Server
+        :param resolver: The resolver of the details of the item
+        """
+        self.item = item
+        self.lsp_item = lsp_item
+        self._resolver = resolver
+
+    @property
+    def completion_text(self) -> str:
+        return self.item["completionText"]
+
+    @property
+    def filter_text(self) -> str:
+        """
+        The text the identifier being typed is matched against, the filterText of the item if it has one
+        """
+        return self.lsp_item.get("filterText") or self.item["completionText"]
+
+    @property
+    def kind(self) -> multilspy_types.CompletionItemKind:
+        return self.item["kind"]
+
+    async def resolve(self) -> multilspy_types.CompletionItem:
+        """
+        Returns the completion item with the details resolved by the Language Server
+        """
+        return await self._resolver.resolve(self)
+
+    def __repr__(self) -> str:
+        return f"CompletionHandle({self.item!r})"
+
+
+class CompletionResolver:
+    """
+    Resolves the details of completion items with completionItem/resolve, with at most max_in_flight requests waiting
+    for a response at any time. Concurrent resolutions of the same item share one request, and the results are cached
+    by the contents of the item.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[LSPTypes.CompletionItem], Awaitable[LSPTypes.CompletionItem]],
+        max_in_flight: int,
+        cache_size: int,
+    ) -> None:
+        """
+        :param send: Sends a completionItem/resolve request and returns its result
+        :param max_in_flight: The maximum number of requests waiting for a response at the same time
+        :param cache_size: The maximum number of resolved items kept in the cache
+        """
+        self.send = send
+        self.max_in_flight = max_in_flight
+        # Whether the Language Server supports completionItem/resolve, the items are returned unchanged otherwise
+        self.supported = False
+        self.stats = ResolveStats()
+        self._cache = ResponseCache(max(cache_size, 1))
+        # Tasks sending the requests in flight, by item, and the number of resolutions waiting for each. The tasks
+        # are owned by the resolver, so that a waiting resolution being cancelled does not cancel the others.
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[asyncio.Task, int] = {}
+        self._semaphore = None
+
+    async def resolve(self, handle: CompletionHandle) -> multilspy_types.CompletionItem:
+        """
+        Returns the completion item of the given handle with its resolved details
+        """
+        if not self.supported:
+            return dict(handle.item)
+        key = json.dumps(handle.lsp_item, sort_keys=True)
+        resolved = self._cache.get(key)
+        if resolved is not MISSING:
+            self.stats.cache_hits += 1
+            return self._merge(handle.item, resolved)
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.stats.joined += 1
+        else:
+            task = asyncio.ensure_future(self._send(key, handle.lsp_item))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda task: self._forget(key, task))
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            resolved = await asyncio.shield(task)
+        finally:
+            self._waiters[task] -= 1
+            if self._waiters[task] == 0:
+                del self._waiters[task]
+                if not task.done():
+                    # The request is only cancelled once no resolution waits for it anymore
+                    self._forget(key, task)
+                    task.cancel()
+        return self._merge(handle.item, resolved)
+
+    async def _send(self, key: str, lsp_item: LSPTypes.CompletionItem) -> LSPTypes.CompletionItem:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        async with self._semaphore:
+            self.stats.requests += 1
+            resolved = await self.send(lsp_item)
+        self._cache.put(key, resolved)
+        return resolved
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+
+    async def resolve_all(self, handles: List[CompletionHandle]) -> List[multilspy_types.CompletionItem]:
+        """
+        Returns the completion items of the given handles with their resolved details, in the same order
+        """
+        return list(await asyncio.gather(*[self.resolve(handle) for handle in handles]))
+
+    @staticmethod
+    def _merge(
+        item: multilspy_types.CompletionItem, resolved: LSPTypes.CompletionItem
+    ) -> multilspy_types.CompletionItem:
+        item = dict(item)
+        if not resolved:
+            return item
+        if resolved.get("detail"):
+            item["detail"] = resolved["detail"]
+        documentation = resolved.get("documentation")
+        if isinstance(documentation, dict):
+            documentation = documentation.get("value")
+        if documentation:
+            item["documentation"] = documentation
+        return multilspy_types.CompletionItem(**item)
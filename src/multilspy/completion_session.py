@@ -0,0 +1,79 @@
+"""
+This file contains the completion sessions used by LanguageServer.request_completions to answer the completion
+requests that follow the typing of an identifier by filtering the previous result of the Language Server, instead of
+a round trip to the server for every keystroke.
+"""
+
+import re
+from typing import Iterable, List, Optional
+
+from .completion_resolve import CompletionHandle
+
+# Matches the identifier ending at the end of a string
+IDENTIFIER_SUFFIX_PATTERN = re.compile(r"\w*\Z")
+IDENTIFIER_PATTERN = re.compile(r"\w*")
+
+
+class CompletionSession:
+    """
+    The last complete result of the Language Server for the completions of an identifier in an open file: the items
+    completing the identifier starting at the anchor position, at the given version of the file.
+
+    The session stays valid while the file is only edited within that identifier, see covers_edit, and answers the
+    requests at a position further in the identifier with the items whose filter text starts with the text typed since
+    the anchor, ignoring case as Language Servers match the typed text loosely.
+    """
+
+    def __init__(
+        self,
+        anchor_line: int,
+        anchor_column: int,
+        version: int,
+        items: List[CompletionHandle],
+        trigger_characters: Iterable[str] = (),
+    ) -> None:
+        """
+        :param anchor_line: The line of the start of the identifier
+        :param anchor_column: The column of the start of the identifier, in characters
+        :param version: The version of the file the items were returned for
+        :param items: The items returned by the Language Server
+        :param trigger_characters: The characters after which completions must be requested from the server again
+        """
+        self.anchor_line = anchor_line
+        self.anchor_column = anchor_column
+        self.version = version
+        self.items = items
+        self.trigger_characters = frozenset(trigger_characters)
+
+    @staticmethod
+    def find_anchor(line_text: str, column: int) -> int:
+        """
+        Returns the column of the start of the identifier ending at the given column of a line, in characters
+        """
+        return IDENTIFIER_SUFFIX_PATTERN.search(line_text, 0, column).start()
+
+    def covers_edit(self, start_line: int, start_column: int, end_line: int, end_column: int, new_text: str) -> bool:
+        """
+        Returns whether the session stays valid after the given edit, with columns in characters: the edit replaces
+        text of the anchor line after the anchor with text that does not start a new line
+        """
+        return (
+            start_line == end_line == self.anchor_line
+            and start_column >= self.anchor_column
+            and "\n" not in new_text
+        )
+
+    def filter(self, line_text: str, line: int, column: int, version: int) -> Optional[List[CompletionHandle]]:
+        """
+        Returns the items completing the identifier at the given position, with its column in characters, or None if
+        the session cannot answer for this position and the completions must be requested from the server
+
+        :param line_text: The text of the line of the position at the given version of the file
+        """
+        if version != self.version or line != self.anchor_line or column < self.anchor_column:
+            return None
+        typed = line_text[self.anchor_column : column]
+        if IDENTIFIER_PATTERN.fullmatch(typed) is None or not self.trigger_characters.isdisjoint(typed):
+            return None
+        typed = typed.casefold()
+        return [item for item in self.items if item.filter_text.casefold().startswith(typed)]
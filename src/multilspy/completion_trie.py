@@ -0,0 +1,145 @@
+"""
+This file contains the completion tries used to turn a completion result into the mask of the tokens of a language
+model vocabulary that can continue the identifier being completed, as done by constrained decoding at every
+generated token.
+"""
+
+import re
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from . import multilspy_types
+
+# Matches a character that can be part of an identifier
+IDENTIFIER_CHAR_PATTERN = re.compile(r"\w")
+
+# Greater than every character, to find the end of the range of the sorted strings starting with a prefix
+MAX_CHAR = chr(0x10FFFF)
+
+# Number of masks kept by each CompletionTrie, for the most recent vocabularies and prefixes
+MASK_CACHE_SIZE = 64
+
+
+class TokenVocabulary:
+    """
+    The tokens of a language model vocabulary, indexed by their text. The id of a token is its index in the sequence
+    of tokens the vocabulary is created with.
+
+    Tokens should be given as the text they decode to, e.g. with a space rather than the marker of byte level
+    tokenizers. Empty tokens are never allowed.
+    """
+
+    def __init__(self, tokens: Sequence[str]) -> None:
+        self.size = len(tokens)
+        order = sorted((token, token_id) for token_id, token in enumerate(tokens) if token)
+        self.sorted_tokens: List[str] = [token for token, _ in order]
+        self.sorted_ids: List[int] = [token_id for _, token_id in order]
+        self.ids: Dict[str, List[int]] = {}
+        for token, token_id in order:
+            self.ids.setdefault(token, []).append(token_id)
+        self._non_identifier_starts = None
+
+    def prefix_range(self, prefix: str) -> Tuple[int, int]:
+        """
+        Returns the range of the indexes in sorted_tokens of the tokens starting with the given prefix
+        """
+        return bisect_left(self.sorted_tokens, prefix), bisect_left(self.sorted_tokens, prefix + MAX_CHAR)
+
+    def non_identifier_starts(self) -> bytes:
+        """
+        Returns the mask of the tokens starting with a character that cannot be part of an identifier
+        """
+        if self._non_identifier_starts is None:
+            mask = bytearray(self.size)
+            for token, token_id in zip(self.sorted_tokens, self.sorted_ids):
+                if IDENTIFIER_CHAR_PATTERN.match(token) is None:
+                    mask[token_id] = 1
+            self._non_identifier_starts = bytes(mask)
+        return self._non_identifier_starts
+
+
+class CompletionTrie:
+    """
+    The texts of the items of a completion result, stored as a trie compacted into the sorted array of the texts and
+    the length of the prefix each text shares with the previous one.
+
+    The mask of the tokens allowed after the text typed since the start of the identifier are computed by walking the
+    distinct prefixes of the texts once, looking each one up among the tokens of the vocabulary. A token is allowed
+    if, appended to the typed text, it is a prefix of a completion, or it continues a whole completion with a
+    character that ends the identifier.
+    """
+
+    def __init__(self, texts: Iterable[str]) -> None:
+        self.texts: List[str] = sorted(set(texts))
+        # Length of the common prefix of each text with the previous one
+        self.common_prefix_lengths: List[int] = [0] * len(self.texts)
+        for i in range(1, len(self.texts)):
+            previous, text = self.texts[i - 1], self.texts[i]
+            length = 0
+            limit = min(len(previous), len(text))
+            while length < limit and previous[length] == text[length]:
+                length += 1
+            self.common_prefix_lengths[i] = length
+        self._masks: "OrderedDict[Tuple[int, str], Tuple[TokenVocabulary, bytes]]" = OrderedDict()
+
+    @classmethod
+    def from_completions(cls, completions: Iterable[multilspy_types.CompletionItem]) -> "CompletionTrie":
+        return cls(item["completionText"] for item in completions)
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def completions(self, prefix: str = "") -> List[str]:
+        """
+        Returns the texts starting with the given prefix, in sorted order
+        """
+        start = bisect_left(self.texts, prefix)
+        return self.texts[start : bisect_left(self.texts, prefix + MAX_CHAR, start)]
+
+    def allowed_tokens(self, vocabulary: TokenVocabulary, prefix: str = "") -> bytes:
+        """
+        Returns the mask of the tokens of the vocabulary allowed after the given prefix of an identifier: one byte per
+        token id, 1 if the token is allowed and 0 otherwise. Masks are cached for the most recent vocabularies and
+        prefixes.
+
+        :param vocabulary: The vocabulary of the language model
+        :param prefix: The text typed since the start of the identifier
+        """
+        key = (id(vocabulary), prefix)
+        cached = self._masks.get(key)
+        if cached is not None and cached[0] is vocabulary:
+            self._masks.move_to_end(key)
+            return cached[1]
+        mask = self._compute_mask(vocabulary, prefix)
+        self._masks[key] = (vocabulary, mask)
+        if len(self._masks) > MASK_CACHE_SIZE:
+            self._masks.popitem(last=False)
+        return mask
+
+    def _compute_mask(self, vocabulary: TokenVocabulary, prefix: str) -> bytes:
+        start = bisect_left(self.texts, prefix)
+        end = bisect_left(self.texts, prefix + MAX_CHAR, start)
+        if start < end and self.texts[start] == prefix:
+            # The identifier may end right after the prefix
+            mask = bytearray(vocabulary.non_identifier_starts())
+        else:
+            mask = bytearray(vocabulary.size)
+        ids = vocabulary.ids
+        sorted_tokens, sorted_ids = vocabulary.sorted_tokens, vocabulary.sorted_ids
+        offset = len(prefix)
+        for i in range(start, end):
+            text = self.texts[i]
+            # The prefixes shorter than the common prefix with the previous text were looked up with that text
+            for length in range(max(self.common_prefix_lengths[i], offset) + 1, len(text) + 1):
+                for token_id in ids.get(text[offset:length], ()):
+                    mask[token_id] = 1
+            # Tokens continuing the whole text with a character that ends the identifier
+            remainder = text[offset:]
+            if remainder:
+                token_start, token_end = vocabulary.prefix_range(remainder)
+                for j in range(token_start, token_end):
+                    token = sorted_tokens[j]
+                    if len(token) > len(remainder) and IDENTIFIER_CHAR_PATTERN.match(token, len(remainder)) is None:
+                        mask[sorted_ids[j]] = 1
+        return bytes(mask)
@@ -6,13 +6,17 @@ The details of Language Specific configuration are not exposed to the user.
 """
 
 import asyncio
+import copy
 import dataclasses
+import functools
 import json
 import time
 import logging
 import os
 import pathlib
+import queue
 import threading
+from collections import OrderedDict
 from contextlib import asynccontextmanager, contextmanager
 from .lsp_protocol_handler.lsp_constants import LSPConstants
 from  .lsp_protocol_handler import lsp_types as LSPTypes
@@ -20,37 +24,242 @@ from  .lsp_protocol_handler import lsp_types as LSPTypes
 from . import multilspy_types
 from .multilspy_logger import MultilspyLogger
 from .lsp_protocol_handler.server import (
+    DEFAULT_TIMEOUT,
     LanguageServerHandler,
     ProcessLaunchInfo,
+    RequestStats,
 )
 from .multilspy_config import MultilspyConfig, Language
 from .multilspy_exceptions import MultilspyException
-from .multilspy_utils import PathUtils, FileUtils, TextUtils
+from .multilspy_utils import PathUtils, FileUtils
+from .multilspy_settings import MultilspySettings
+from .text_buffer import UTF16, UTF32, TextBuffer, TextSnapshot, count_units
+from .completion_resolve import CompletionHandle, CompletionResolver, ResolveStats
+from .completion_session import CompletionSession
+from .completion_trie import CompletionTrie, TokenVocabulary
+from .completion_readiness import (
+    PROGRESS_BOUNDARY_PATTERN,
+    REASON_DEADLINE,
+    REASON_MAX_ROUND_TRIPS,
+    CompletionReport,
+    ServerReadiness,
+)
+from .response_cache import MISSING, CacheStats, FileDigests, PersistentResponseCache, ResponseCache, hash_text
 from pathlib import PurePath
-from typing import AsyncIterator, Iterator, List, Dict, Union, Tuple
+from typing import Any, AsyncIterator, Iterator, List, Dict, Optional, Sequence, Union, Tuple
 from .type_helpers import ensure_all_methods_implemented
 
+# Default maximum number of requests of a request_batch call waiting for a response at the same time
+DEFAULT_BATCH_MAX_IN_FLIGHT = 64
+
+# Number of files that are not open whose TextBuffer is kept for get_offsets and get_positions
+TEXT_BUFFER_CACHE_SIZE = 32
+
+# Fraction of the length of a file above which rollback sends its whole text instead of the changed range
+ROLLBACK_FULL_TEXT_RATIO = 0.5
+
+# Number of completion results whose CompletionTrie is kept by get_completion_trie
+COMPLETION_TRIE_CACHE_SIZE = 16
+
+# Methods accepted in the queries of request_batch, mapped to the LanguageServer method answering them
+BATCH_METHODS = {
+    "definition": "request_definition",
+    "implementation": "request_implementation",
+    "references": "request_references",
+    "hover": "request_hover",
+    "completions": "request_completions",
+}
+
 
-@dataclasses.dataclass
 class LSPFileBuffer:
     """
     This class is used to store the contents of an open LSP file in memory.
     """
 
-    # uri of the file
-    uri: str
+    def __init__(
+        self,
+        uri: str,
+        contents: str,
+        version: int,
+        language_id: str,
+        ref_count: int,
+        content_hash: Optional[str] = None,
+        file_stat: Optional[Tuple[int, int]] = None,
+    ) -> None:
+        # uri of the file
+        self.uri = uri
+
+        # The contents of the file, indexed by line, see the contents property for the contents as a string
+        self.text = TextBuffer(contents)
+
+        # The version of the file
+        self.version = version
+
+        # The language id of the file
+        self.language_id = language_id
+
+        # reference count of the file
+        self.ref_count = ref_count
+
+        # Digest of the contents used in response cache keys, computed on first use after each change
+        self.content_hash = content_hash
+
+        # Modification time and size of the file on disk when it was opened, to detect changes while it is kept open
+        self.file_stat = file_stat
+
+        # The last completion result of the Language Server, kept while the file is only edited within the completed
+        # identifier, see MultilspyConfig.completion_filtering
+        self.completion_session: Optional[CompletionSession] = None
+
+    @property
+    def contents(self) -> str:
+        """
+        The contents of the file, built from the line index on first access after each edit.
+        """
+        return self.text.text
+
+    def get_content_hash(self) -> str:
+        """
+        Returns the digest of the contents, computed on first use after each change
+        """
+        if self.content_hash is None:
+            self.content_hash = hash_text(self.contents)
+        return self.content_hash
+
+    @contents.setter
+    def contents(self, contents: str) -> None:
+        self.text = TextBuffer(contents)
+        self.content_hash = None
+        self.completion_session = None
+
+    def edit(
+        self, start: multilspy_types.Position, end: multilspy_types.Position, new_text: str, position_encoding: str = UTF32
+    ) -> str:
+        """
+        Replace the text between the given positions with new_text and return the replaced text.
+
+        :param position_encoding: The encoding of the columns of the positions, see text_buffer
+        """
+        self.content_hash = None
+        start_column = self.text.get_column(start["line"], start["character"], position_encoding)
+        end_column = self.text.get_column(end["line"], end["character"], position_encoding)
+        if self.completion_session is not None:
+            if self.completion_session.covers_edit(start["line"], start_column, end["line"], end_column, new_text):
+                self.completion_session.version = self.version
+            else:
+                self.completion_session = None
+        return self.text.replace(start["line"], start_column, end["line"], end_column, new_text)
+
+    def fork(self, uri: str) -> "LSPFileBuffer":
+        """
+        Returns a buffer with the given uri and the same contents at version 0, sharing the lines of this buffer in
+        memory until either buffer edits them.
+        """
+        forked_buffer = LSPFileBuffer(uri, "", 0, self.language_id, 1, self.content_hash)
+        forked_buffer.text.restore(self.text.snapshot())
+        if self.completion_session is not None and self.completion_session.version == self.version:
+            forked_buffer.completion_session = copy.copy(self.completion_session)
+            forked_buffer.completion_session.version = 0
+        return forked_buffer
+
+
+@dataclasses.dataclass
+class OpenFileStats:
+    """
+    Counters of the files opened and closed in the Language Server, see MultilspyConfig.keep_open_files.
+    """
+
+    # didOpen notifications sent
+    did_open: int = 0
+
+    # didClose notifications sent
+    did_close: int = 0
+
+    # Files opened again while they were kept open after their last use, saving a didOpen
+    reused: int = 0
+
+    # Files closed to stay within the bounds of the files kept open
+    evictions: int = 0
 
-    # The contents of the file
-    contents: str
 
-    # The version of the file
+@dataclasses.dataclass
+class Checkpoint:
+    """
+    The state of an open file saved by LanguageServer.checkpoint, to be restored by LanguageServer.rollback.
+    """
+
+    # The buffer of the file, the checkpoint is only valid while this buffer is open
+    file_buffer: LSPFileBuffer
+
+    # The version of the file at the checkpoint
     version: int
 
-    # The language id of the file
-    language_id: str
+    # The text of the file at the checkpoint, sharing its unedited lines with the buffer
+    snapshot: TextSnapshot
+
+    # The digest of the text at the checkpoint, if it was computed
+    content_hash: Optional[str]
 
-    # reference count of the file
-    ref_count: int
+    # The completion session of the file at the checkpoint, valid again once its text is restored
+    completion_session: Optional[CompletionSession]
+
+
+def cached_response(method: str):
+    """
+    Decorator of the LanguageServer methods requesting information about a position in a file, answering them from
+    the response caches when they are enabled and hold the response for the current contents of the file.
+    """
+
+    def decorator(request_fn):
+        @functools.wraps(request_fn)
+        async def wrapper(self: "LanguageServer", relative_file_path: str, line: int, column: int, timeout: Optional[float] = DEFAULT_TIMEOUT):
+            if self.response_cache is None and self.persistent_cache is None:
+                return await request_fn(self, relative_file_path, line, column, timeout)
+            self._priv_check_server_started(request_fn.__name__)
+            try:
+                document_key = self._priv_document_key(relative_file_path)
+            except OSError:
+                # The request reports the files that cannot be read
+                return await request_fn(self, relative_file_path, line, column, timeout)
+            # Edits only change the keys of the responses that can depend on them, so that the responses for other
+            # contents of the edited files stay cached, e.g. until a rollback restores them
+            unsaved_edits_key = self._priv_unsaved_edits_key(relative_file_path)
+            key = (method, relative_file_path, document_key, unsaved_edits_key, line, column)
+            response = MISSING
+            if self.response_cache is not None:
+                response = self.response_cache.get(key)
+                if response is not MISSING:
+                    return response
+
+            # Responses computed with unsaved edits depend on more than the contents of the queried file,
+            # so they are kept out of the persistent cache
+            persistent_key = None
+            if (
+                self.persistent_cache is not None
+                and not self.forked_files
+                and not any(file_buffer.version > 0 for file_buffer in self.open_file_buffers.values())
+            ):
+                persistent_key = self.persistent_cache.make_key(
+                    self.language_id,
+                    self.server_version,
+                    self.position_encoding,
+                    self.repository_root_path,
+                    self.persistent_cache_namespace,
+                    *key,
+                )
+                response = self.persistent_cache.get(persistent_key)
+
+            if response is MISSING:
+                response = await request_fn(self, relative_file_path, line, column, timeout)
+                if persistent_key is not None:
+                    self.persistent_cache.put(persistent_key, response)
+            if self.response_cache is not None:
+                self.response_cache.put(key, response)
+            return response
+
+        return wrapper
+
+    return decorator
 
 
 class LanguageServer:
@@ -59,6 +268,10 @@ class LanguageServer:
     It is used to communicate with Language Servers of different programming languages.
     """
 
+    # Whether the command of the Language Server makes it listen on the socket configured with
+    # MultilspyConfig.transport, so that it can be launched with MultilspyConfig.launch_server
+    socket_listen_supported: bool = False
+
     @classmethod
     def create(cls, config: MultilspyConfig, logger: MultilspyLogger, repository_root_path: str) -> "LanguageServer":
         """
@@ -138,6 +351,29 @@ class LanguageServer:
         self.repository_root_path: str = repository_root_path
         self.completions_available = asyncio.Event()
 
+        # Whether the Language Server reports work in progress, waited on by request_completions before resending a
+        # request that returned an incomplete result, and how the last call obtained its result
+        self.server_readiness = ServerReadiness()
+        self.track_server_progress = config.track_server_progress
+        self.completion_max_round_trips = config.completion_max_round_trips
+        self.completion_deadline = config.completion_deadline
+        self.completion_retry_delay = config.completion_retry_delay
+        self.completion_retry_backoff = config.completion_retry_backoff
+        self.completion_retry_max_delay = config.completion_retry_max_delay
+        self.completion_max_busy_wait = config.completion_max_busy_wait
+        self.completion_report = CompletionReport()
+        self.completion_filtering = config.completion_filtering
+        # Characters after which the Language Server computes new completions, from its capabilities
+        self.completion_trigger_characters: List[str] = []
+        # Resolves the details of the completion items returned by request_completion_handles
+        self.completion_resolver = CompletionResolver(
+            self._priv_send_resolve_completion_item,
+            config.completion_resolve_max_in_flight,
+            config.completion_resolve_cache_size,
+        )
+        # Tries of the most recent completion results, by the set of their texts
+        self._priv_completion_tries: "OrderedDict[frozenset, CompletionTrie]" = OrderedDict()
+
         if config.trace_lsp_communication:
 
             def logging_fn(source, target, msg):
@@ -148,13 +384,94 @@ class LanguageServer:
             def logging_fn(source, target, msg):
                 pass
 
+        # Identifies the Language Server in the keys of the persistent cache. The command line includes the versioned
+        # installation directory of most servers, subclasses may set a more precise version.
+        self.server_version: str = process_launch_info.cmd
+
+        if config.transport not in ("stdio", "tcp", "unix"):
+            raise MultilspyException(f"Unknown transport: {config.transport}")
+        if config.transport == "tcp" and not config.port:
+            raise MultilspyException("The tcp transport requires the port of the language server")
+        if config.transport == "unix" and not config.socket_path:
+            raise MultilspyException("The unix transport requires the socket_path of the language server")
+        if config.transport != "stdio":
+            if config.launch_server and not self.socket_listen_supported:
+                raise MultilspyException(
+                    f"The {config.code_language} language server cannot be launched listening on a socket"
+                )
+            process_launch_info.transport = config.transport
+            process_launch_info.host = config.host
+            process_launch_info.port = config.port
+            process_launch_info.socket_path = config.socket_path or ""
+            if not config.launch_server:
+                # Connect to the already running language server
+                process_launch_info.cmd = ""
+        shutdown_server = config.shutdown_server
+        if shutdown_server is None:
+            shutdown_server = config.transport == "stdio" or config.launch_server
+        process_launch_info.shutdown_server = shutdown_server
+        if config.record_trace_path:
+            process_launch_info.record_trace_path = config.record_trace_path
+        if config.replay_trace_path:
+            process_launch_info.transport = "replay"
+            process_launch_info.replay_trace_path = config.replay_trace_path
+            process_launch_info.replay_speed = config.replay_speed
+
         # cmd is obtained from the child classes, which provide the language specific command to start the language server
         # LanguageServerHandler provides the functionality to start the language server and communicate with it
-        self.server: LanguageServerHandler = LanguageServerHandler(process_launch_info, logger=logging_fn)
+        self.server: LanguageServerHandler = LanguageServerHandler(
+            process_launch_info,
+            logger=logging_fn,
+            request_timeout=config.request_timeout,
+            stderr_buffer_lines=config.stderr_buffer_lines,
+            forward_stderr=config.forward_stderr,
+        )
 
         self.language_id = language_id
         self.open_file_buffers: Dict[str, LSPFileBuffer] = {}
 
+        # Position encodings offered to the Language Server in order of preference, and the one it chose. The columns
+        # of the positions passed to and returned by the request methods are in this encoding.
+        self.position_encodings: List[str] = list(config.position_encodings)
+        self.position_encoding: str = UTF16
+
+        # Files kept open in the Language Server after their last use, from the least to the most recently used,
+        # mapped to their size on disk
+        self.keep_open_files = config.keep_open_files
+        self.keep_open_max_bytes = config.keep_open_max_bytes
+        self.idle_files: "OrderedDict[str, int]" = OrderedDict()
+        self.open_file_stats = OpenFileStats()
+        # Documents forked by fork_file, mapped from their relative path to the relative path of the file they were
+        # forked from
+        self.max_forked_files = config.max_forked_files
+        self.forked_files: Dict[str, str] = {}
+        # TextBuffers of files read from disk by get_offsets and get_positions, with the modification time and size
+        # of the file they were read at, from the least to the most recently used
+        self._priv_text_buffers: "OrderedDict[str, Tuple[Tuple[int, int], TextBuffer]]" = OrderedDict()
+
+        # Cache of the responses to definition, implementation, references and hover requests, None if disabled
+        self.response_cache: Optional[ResponseCache] = None
+        if config.response_cache_size > 0:
+            self.response_cache = ResponseCache(config.response_cache_size, config.response_cache_max_bytes)
+        self.file_digests = FileDigests()
+
+        # Cache of the same responses shared across runs, None if disabled
+        self.persistent_cache: Optional[PersistentResponseCache] = None
+        self.persistent_cache_namespace = config.persistent_cache_namespace
+        self._priv_server_start: Optional[asyncio.Future] = None
+        self._priv_server_context = None
+        if config.persistent_cache:
+            persistent_cache_path = config.persistent_cache_path or os.path.join(
+                MultilspySettings.get_global_cache_directory(), "responses.sqlite"
+            )
+            self.persistent_cache = PersistentResponseCache(persistent_cache_path, config.persistent_cache_max_bytes)
+            # The Language Server is only launched once a request misses the cache, see _priv_ensure_server_running
+            self._priv_start_language_server = self.start_server
+            # The columns answered from the cache before the Language Server is started are in the first offered
+            # position encoding, which the server must choose, see _priv_start_deferred_server
+            self.position_encoding = next(iter(self.position_encodings), UTF16)
+            self.start_server = self._priv_start_server_deferred
+
     @asynccontextmanager
     async def start_server(self) -> AsyncIterator["LanguageServer"]:
         """
@@ -171,7 +488,10 @@ class LanguageServer:
         ```
         """
         self.server_started = True
+        self._priv_track_server_readiness()
         yield self
+        self._priv_forget_idle_files()
+        self._priv_forget_forked_files()
         self.server_started = False
 
     # TODO: Add support for more LSP features
@@ -193,18 +513,25 @@ class LanguageServer:
         absolute_file_path = str(PurePath(self.repository_root_path, relative_file_path))
         uri = pathlib.Path(absolute_file_path).as_uri()
 
+        if uri in self.idle_files and not self._priv_is_unchanged_on_disk(self.open_file_buffers[uri]):
+            self._priv_close_file(uri)
+
         if uri in self.open_file_buffers:
             assert self.open_file_buffers[uri].uri == uri
-            assert self.open_file_buffers[uri].ref_count >= 1
 
+            if self.open_file_buffers[uri].ref_count == 0:
+                del self.idle_files[uri]
+                self.open_file_stats.reused += 1
             self.open_file_buffers[uri].ref_count += 1
-            yield
-            self.open_file_buffers[uri].ref_count -= 1
         else:
+            file_stat = None
+            if self.keep_open_files > 0:
+                stat_result = os.stat(absolute_file_path)
+                file_stat = (stat_result.st_mtime_ns, stat_result.st_size)
             contents = FileUtils.read_file(self.logger, absolute_file_path)
 
             version = 0
-            self.open_file_buffers[uri] = LSPFileBuffer(uri, contents, version, self.language_id, 1)
+            self.open_file_buffers[uri] = LSPFileBuffer(uri, contents, version, self.language_id, 1, file_stat=file_stat)
 
             self.server.notify.did_open_text_document(
                 {
@@ -216,18 +543,21 @@ class LanguageServer:
                     }
                 }
             )
-            yield
-            self.open_file_buffers[uri].ref_count -= 1
+            self.open_file_stats.did_open += 1
 
-        if self.open_file_buffers[uri].ref_count == 0:
-            self.server.notify.did_close_text_document(
-                {
-                    LSPConstants.TEXT_DOCUMENT: {
-                        LSPConstants.URI: uri,
-                    }
-                }
-            )
-            del self.open_file_buffers[uri]
+        file_buffer = self.open_file_buffers[uri]
+        try:
+            yield
+        finally:
+            # Release the file even if the block raised or was cancelled, e.g. by a failing request in request_batch
+            file_buffer.ref_count -= 1
+            if file_buffer.ref_count == 0 and self.open_file_buffers.get(uri) is file_buffer:
+                # Edits are discarded on close, so edited files are not kept open
+                if self.keep_open_files > 0 and file_buffer.version == 0:
+                    self.idle_files[uri] = file_buffer.file_stat[1]
+                    self._priv_evict_idle_files()
+                else:
+                    self._priv_close_file(uri)
 
     def save_file(self, relative_file_path: str) -> None:
         """
@@ -241,7 +571,7 @@ class LanguageServer:
         uri = pathlib.Path(absolute_file_path).as_uri()
 
         # Ensure the file is open
-        assert uri in self.open_file_buffers
+        assert uri in self.open_file_buffers and self.open_file_buffers[uri].ref_count > 0
 
         file_buffer = self.open_file_buffers[uri]
 
@@ -272,14 +602,12 @@ class LanguageServer:
         uri = pathlib.Path(absolute_file_path).as_uri()
 
         # Ensure the file is open
-        assert uri in self.open_file_buffers
+        assert uri in self.open_file_buffers and self.open_file_buffers[uri].ref_count > 0
 
         file_buffer = self.open_file_buffers[uri]
         file_buffer.version += 1
-        change_index = TextUtils.get_index_from_line_col(file_buffer.contents, line, column)
-        file_buffer.contents = (
-            file_buffer.contents[:change_index] + text_to_be_inserted + file_buffer.contents[change_index:]
-        )
+        position = multilspy_types.Position(line=line, character=column)
+        file_buffer.edit(position, position, text_to_be_inserted, self.position_encoding)
         self.server.notify.did_change_text_document(
             {
                 LSPConstants.TEXT_DOCUMENT: {
@@ -297,8 +625,11 @@ class LanguageServer:
                 ],
             }
         )
-        new_l, new_c = TextUtils.get_updated_position_from_line_and_column_and_edit(line, column, text_to_be_inserted)
-        return multilspy_types.Position(line=new_l, character=new_c)
+        num_newlines = text_to_be_inserted.count("\n")
+        new_c = count_units(text_to_be_inserted.rsplit("\n", 1)[-1], self.position_encoding)
+        if num_newlines == 0:
+            new_c += column
+        return multilspy_types.Position(line=line + num_newlines, character=new_c)
 
     def delete_text_between_positions(
         self,
@@ -315,14 +646,11 @@ class LanguageServer:
         uri = pathlib.Path(absolute_file_path).as_uri()
 
         # Ensure the file is open
-        assert uri in self.open_file_buffers
+        assert uri in self.open_file_buffers and self.open_file_buffers[uri].ref_count > 0
 
         file_buffer = self.open_file_buffers[uri]
         file_buffer.version += 1
-        del_start_idx = TextUtils.get_index_from_line_col(file_buffer.contents, start["line"], start["character"])
-        del_end_idx = TextUtils.get_index_from_line_col(file_buffer.contents, end["line"], end["character"])
-        deleted_text = file_buffer.contents[del_start_idx:del_end_idx]
-        file_buffer.contents = file_buffer.contents[:del_start_idx] + file_buffer.contents[del_end_idx:]
+        deleted_text = file_buffer.edit(start, end, "", self.position_encoding)
         self.server.notify.did_change_text_document(
             {
                 LSPConstants.TEXT_DOCUMENT: {
@@ -334,6 +662,157 @@ class LanguageServer:
         )
         return deleted_text
 
+    def checkpoint(self, relative_file_path: str) -> Checkpoint:
+        """
+        Save the current state of the given open file, to restore it later with rollback, e.g. before inserting
+        candidate text to explore. A checkpoint shares the unedited lines of the file in memory, so taking many of them
+        is cheap.
+
+        :param relative_file_path: The relative path of the open file
+
+        :return Checkpoint: The checkpoint to pass to rollback
+        """
+        self._priv_check_server_started("checkpoint")
+
+        absolute_file_path = str(PurePath(self.repository_root_path, relative_file_path))
+        uri = pathlib.Path(absolute_file_path).as_uri()
+
+        # Ensure the file is open
+        assert uri in self.open_file_buffers and self.open_file_buffers[uri].ref_count > 0
+
+        file_buffer = self.open_file_buffers[uri]
+        completion_session = file_buffer.completion_session
+        if completion_session is not None and completion_session.version != file_buffer.version:
+            completion_session = None
+        return Checkpoint(
+            file_buffer, file_buffer.version, file_buffer.text.snapshot(), file_buffer.content_hash, completion_session
+        )
+
+    def rollback(self, checkpoint: Checkpoint) -> None:
+        """
+        Restore the open file of the given checkpoint to its text at the checkpoint, with a single didChange
+        notification replacing the text changed since, or the whole text if more than ROLLBACK_FULL_TEXT_RATIO of it
+        changed. Nothing is sent if the text is unchanged. The checkpoint stays valid, to roll back to it again.
+
+        :param checkpoint: A checkpoint returned by the checkpoint method, for a file still open
+        """
+        self._priv_check_server_started("rollback")
+
+        file_buffer = checkpoint.file_buffer
+        if self.open_file_buffers.get(file_buffer.uri) is not file_buffer or file_buffer.ref_count == 0:
+            raise MultilspyException(f"Rollback to a checkpoint of a file that was closed since: {file_buffer.uri}")
+
+        start_line, start_column, end_line, end_column, new_text = file_buffer.text.diff(checkpoint.snapshot)
+        if (start_line, start_column) == (end_line, end_column) and not new_text:
+            return
+        full_text = len(new_text) > ROLLBACK_FULL_TEXT_RATIO * len(checkpoint.snapshot)
+        if not full_text:
+            # The range of the change is in the current text, before it is restored
+            start_character = file_buffer.text.get_units(start_line, start_column, self.position_encoding)
+            end_character = file_buffer.text.get_units(end_line, end_column, self.position_encoding)
+
+        file_buffer.version += 1
+        file_buffer.text.restore(checkpoint.snapshot)
+        file_buffer.content_hash = checkpoint.content_hash
+        file_buffer.completion_session = checkpoint.completion_session
+        if file_buffer.completion_session is not None:
+            file_buffer.completion_session.version = file_buffer.version
+        if full_text:
+            change = {"text": file_buffer.contents}
+        else:
+            change = {
+                LSPConstants.RANGE: {
+                    "start": {"line": start_line, "character": start_character},
+                    "end": {"line": end_line, "character": end_character},
+                },
+                "text": new_text,
+            }
+        self.server.notify.did_change_text_document(
+            {
+                LSPConstants.TEXT_DOCUMENT: {
+                    LSPConstants.VERSION: file_buffer.version,
+                    LSPConstants.URI: file_buffer.uri,
+                },
+                LSPConstants.CONTENT_CHANGES: [change],
+            }
+        )
+
+    def fork_file(self, relative_file_path: str, count: int = 1) -> List[str]:
+        """
+        Fork the given open file into count new documents open in the Language Server, with the text of the file but
+        edited and queried independently of it and of each other, e.g. to explore several candidate continuations of
+        the file concurrently. The documents are not written to disk: their paths are next to the file, so that the
+        Language Server analyzes them in the same context. The text of a document shares the unedited lines of the file
+        in memory. At most MultilspyConfig.max_forked_files documents can be forked at the same time, each one until
+        it is discarded with discard_fork.
+
+        :param relative_file_path: The relative path of the open file, or of a forked document
+        :param count: The number of documents to fork
+
+        :return List[str]: The relative paths of the forked documents, to pass to the other methods
+        """
+        self._priv_check_server_started("fork_file")
+
+        absolute_file_path = str(PurePath(self.repository_root_path, relative_file_path))
+        uri = pathlib.Path(absolute_file_path).as_uri()
+
+        # Ensure the file is open
+        assert uri in self.open_file_buffers and self.open_file_buffers[uri].ref_count > 0
+
+        if len(self.forked_files) + count > self.max_forked_files:
+            raise MultilspyException(
+                f"Cannot fork {count} documents of {relative_file_path} with {len(self.forked_files)} documents already "
+                f"forked, more than max_forked_files={self.max_forked_files}"
+            )
+
+        file_buffer = self.open_file_buffers[uri]
+        source_path = PurePath(self.forked_files.get(relative_file_path, relative_file_path))
+        fork_paths = []
+        fork_number = 0
+        while len(fork_paths) < count:
+            fork_number += 1
+            fork_path = str(source_path.with_name(f"{source_path.stem}.fork{fork_number}{source_path.suffix}"))
+            absolute_fork_path = str(PurePath(self.repository_root_path, fork_path))
+            fork_uri = pathlib.Path(absolute_fork_path).as_uri()
+            if fork_uri in self.open_file_buffers or os.path.exists(absolute_fork_path):
+                continue
+
+            forked_buffer = file_buffer.fork(fork_uri)
+            self.open_file_buffers[fork_uri] = forked_buffer
+            self.forked_files[fork_path] = str(source_path)
+            self.server.notify.did_open_text_document(
+                {
+                    LSPConstants.TEXT_DOCUMENT: {
+                        LSPConstants.URI: fork_uri,
+                        LSPConstants.LANGUAGE_ID: forked_buffer.language_id,
+                        LSPConstants.VERSION: forked_buffer.version,
+                        LSPConstants.TEXT: forked_buffer.contents,
+                    }
+                }
+            )
+            self.open_file_stats.did_open += 1
+            fork_paths.append(fork_path)
+        return fork_paths
+
+    def discard_fork(self, fork_path: str) -> None:
+        """
+        Close the given forked document in the Language Server, discarding its edits.
+
+        :param fork_path: The relative path of a document returned by fork_file, not open with open_file
+        """
+        self._priv_check_server_started("discard_fork")
+
+        if fork_path not in self.forked_files:
+            raise MultilspyException(f"Not a forked document: {fork_path}")
+        absolute_file_path = str(PurePath(self.repository_root_path, fork_path))
+        uri = pathlib.Path(absolute_file_path).as_uri()
+        if self.open_file_buffers[uri].ref_count > 1:
+            raise MultilspyException(f"Cannot discard the forked document {fork_path} while it is open")
+
+        del self.forked_files[fork_path]
+        self.open_file_buffers[uri].ref_count = 0
+        self._priv_close_file(uri)
+
     def get_open_file_text(self, relative_file_path: str) -> str:
         """
         Get the contents of the given opened file as per the Language Server.
@@ -346,13 +825,38 @@ class LanguageServer:
         uri = pathlib.Path(absolute_file_path).as_uri()
 
         # Ensure the file is open
-        assert uri in self.open_file_buffers
+        assert uri in self.open_file_buffers and self.open_file_buffers[uri].ref_count > 0
 
         file_buffer = self.open_file_buffers[uri]
         return file_buffer.contents
 
+    def get_offsets(self, relative_file_path: str, positions: Sequence[Tuple[int, int]]) -> List[int]:
+        """
+        Convert many positions in the given file to offsets in its text at once, e.g. the ranges of the locations
+        returned by request_references. The contents of the file are those of its buffer if it is open, or else
+        its contents on disk.
+
+        :param relative_file_path: The relative path of the file
+        :param positions: (line, column) pairs, with columns in the negotiated position encoding
+
+        :return List[int]: The offsets of the positions, in characters from the start of the text
+        """
+        return self._priv_get_text_buffer(relative_file_path).get_offsets(positions, self.position_encoding)
+
+    def get_positions(self, relative_file_path: str, offsets: Sequence[int]) -> List[Tuple[int, int]]:
+        """
+        Convert many offsets in the text of the given file to positions at once, the inverse of get_offsets.
+
+        :param relative_file_path: The relative path of the file
+        :param offsets: Offsets in characters from the start of the text
+
+        :return List[Tuple[int, int]]: (line, column) pairs, with columns in the negotiated position encoding
+        """
+        return self._priv_get_text_buffer(relative_file_path).get_positions(offsets, self.position_encoding)
+
+    @cached_response("textDocument/implementation")
     async def request_implementation(
-        self, relative_file_path: str, line: int, column: int
+        self, relative_file_path: str, line: int, column: int, timeout: Optional[float] = DEFAULT_TIMEOUT
     ) -> List[multilspy_types.Location]:
         """
         Raise a [textDocument/implementation](https://microsoft.github.io/language-server-protocol/specifications/lsp/3.17/specification/#textDocument_implementation) request to the Language Server
@@ -361,14 +865,17 @@ class LanguageServer:
         :param relative_file_path: The relative path of the file that has the symbol for which implementation should be looked up
         :param line: The line number of the symbol
         :param column: The column number of the symbol
+        :param timeout: Timeout in seconds for the request, overriding the configured request_timeout,
+            None to wait forever
 
         :return List[multilspy_types.Location]: A list of locations where the symbol is implemented
         """
         self._priv_check_server_started("request_implementation")
+        await self._priv_ensure_server_running()
 
         with self.open_file(relative_file_path):
             # sending request to the language server and waiting for response
-            response = await self.server.send.implementation(
+            response = await self.server.send_with_timeout(timeout).implementation(
                 {
                     LSPConstants.TEXT_DOCUMENT: {
                         LSPConstants.URI: pathlib.Path(
@@ -390,8 +897,9 @@ class LanguageServer:
 
             return [multilspy_types.Location(**location) for location in response]
 
+    @cached_response("textDocument/definition")
     async def request_definition(
-        self, relative_file_path: str, line: int, column: int
+        self, relative_file_path: str, line: int, column: int, timeout: Optional[float] = DEFAULT_TIMEOUT
     ) -> List[multilspy_types.Location]:
         """
         Raise a [textDocument/definition](https://microsoft.github.io/language-server-protocol/specifications/lsp/3.17/specification/#textDocument_definition) request to the Language Server
@@ -400,15 +908,18 @@ class LanguageServer:
         :param relative_file_path: The relative path of the file that has the symbol for which definition should be looked up
         :param line: The line number of the symbol
         :param column: The column number of the symbol
+        :param timeout: Timeout in seconds for the request, overriding the configured request_timeout,
+            None to wait forever
 
         :return List[multilspy_types.Location]: A list of locations where the symbol is defined
         """
 
         self._priv_check_server_started("request_definition")
+        await self._priv_ensure_server_running()
 
         with self.open_file(relative_file_path):
             # sending request to the language server and waiting for response
-            response = await self.server.send.definition(
+            response = await self.server.send_with_timeout(timeout).definition(
                 {
                     LSPConstants.TEXT_DOCUMENT: {
                         LSPConstants.URI: pathlib.Path(
@@ -468,8 +979,9 @@ class LanguageServer:
 
         return ret
 
+    @cached_response("textDocument/references")
     async def request_references(
-        self, relative_file_path: str, line: int, column: int
+        self, relative_file_path: str, line: int, column: int, timeout: Optional[float] = DEFAULT_TIMEOUT
     ) -> List[multilspy_types.Location]:
         """
         Raise a [textDocument/references](https://microsoft.github.io/language-server-protocol/specifications/lsp/3.17/specification/#textDocument_references) request to the Language Server
@@ -478,15 +990,18 @@ class LanguageServer:
         :param relative_file_path: The relative path of the file that has the symbol for which references should be looked up
         :param line: The line number of the symbol
         :param column: The column number of the symbol
+        :param timeout: Timeout in seconds for the request, overriding the configured request_timeout,
+            None to wait forever
 
         :return List[multilspy_types.Location]: A list of locations where the symbol is referenced
         """
 
         self._priv_check_server_started("request_references")
+        await self._priv_ensure_server_running()
 
         with self.open_file(relative_file_path):
             # sending request to the language server and waiting for response
-            response = await self.server.send.references(
+            response = await self.server.send_with_timeout(timeout).references(
                 {
                     "context": {"includeDeclaration": False},
                     "textDocument": {
@@ -513,8 +1028,81 @@ class LanguageServer:
 
         return ret
 
+    async def request_references_stream(
+        self, relative_file_path: str, line: int, column: int, timeout: Optional[float] = DEFAULT_TIMEOUT
+    ) -> AsyncIterator[multilspy_types.Location]:
+        """
+        Raise a [textDocument/references](https://microsoft.github.io/language-server-protocol/specifications/lsp/3.17/specification/#textDocument_references) request to the Language Server
+        to find references to the symbol at the given line and column in the given file, and yield the locations as they are received.
+
+        Unlike request_references, a large response is decoded incrementally while it is read, so the first
+        locations are yielded before the whole response is received, and the response is never held in memory whole.
+
+        :param relative_file_path: The relative path of the file that has the symbol for which references should be looked up
+        :param line: The line number of the symbol
+        :param column: The column number of the symbol
+        :param timeout: Timeout in seconds for the whole response, overriding the configured request_timeout,
+            None to wait forever
+
+        :return AsyncIterator[multilspy_types.Location]: The locations where the symbol is referenced
+        """
+
+        self._priv_check_server_started("request_references_stream")
+        await self._priv_ensure_server_running()
+
+        with self.open_file(relative_file_path):
+            items = self.server.send_request_stream(
+                "textDocument/references",
+                {
+                    "context": {"includeDeclaration": False},
+                    "textDocument": {
+                        "uri": pathlib.Path(os.path.join(self.repository_root_path, relative_file_path)).as_uri()
+                    },
+                    "position": {"line": line, "character": column},
+                },
+                timeout=timeout,
+            )
+            async for item in items:
+                assert isinstance(item, dict)
+                assert LSPConstants.URI in item
+                assert LSPConstants.RANGE in item
+
+                item["absolutePath"] = PathUtils.uri_to_path(item["uri"])
+                item["relativePath"] = str(PurePath(os.path.relpath(item["absolutePath"], self.repository_root_path)))
+                yield multilspy_types.Location(**item)
+
+    async def request_workspace_symbol_stream(
+        self, query: str, timeout: Optional[float] = DEFAULT_TIMEOUT
+    ) -> AsyncIterator[multilspy_types.UnifiedSymbolInformation]:
+        """
+        Raise a [workspace/symbol](https://microsoft.github.io/language-server-protocol/specifications/lsp/3.17/specification/#workspace_symbol) request to the Language Server
+        to find the symbols matching the given query in the workspace, and yield the symbols as they are received.
+
+        A large response is decoded incrementally while it is read, so the first symbols are yielded before the
+        whole response is received, and the response is never held in memory whole.
+
+        :param query: The query string to filter the symbols by
+        :param timeout: Timeout in seconds for the whole response, overriding the configured request_timeout,
+            None to wait forever
+
+        :return AsyncIterator[multilspy_types.UnifiedSymbolInformation]: The symbols matching the query
+        """
+        self._priv_check_server_started("request_workspace_symbol_stream")
+        await self._priv_ensure_server_running()
+
+        async for item in self.server.send_request_stream("workspace/symbol", {"query": query}, timeout=timeout):
+            assert isinstance(item, dict)
+            assert LSPConstants.NAME in item
+            assert LSPConstants.KIND in item
+            yield multilspy_types.UnifiedSymbolInformation(**item)
+
     async def request_completions(
-        self, relative_file_path: str, line: int, column: int, allow_incomplete: bool = False
+        self,
+        relative_file_path: str,
+        line: int,
+        column: int,
+        allow_incomplete: bool = False,
+        timeout: Optional[float] = DEFAULT_TIMEOUT,
     ) -> List[multilspy_types.CompletionItem]:
         """
         Raise a [textDocument/completion](https://microsoft.github.io/language-server-protocol/specifications/lsp/3.17/specification/#textDocument_completion) request to the Language Server
@@ -523,15 +1111,103 @@ class LanguageServer:
         :param relative_file_path: The relative path of the file that has the symbol for which completions should be looked up
         :param line: The line number of the symbol
         :param column: The column number of the symbol
+        :param allow_incomplete: Return the items of an incomplete result instead of an empty list
+        :param timeout: Timeout in seconds for the whole call including retries, overriding the configured request_timeout,
+            None to wait forever
+
+        While the Language Server returns incomplete results, the request is resent once the server reports the end
+        of its work in progress, at most completion_max_busy_wait later, or after a delay growing with every retry
+        while it is idle, until the configured completion_deadline or completion_max_round_trips. See
+        get_completion_report for how the result was obtained.
+
+        With completion_filtering, the complete result at a position in an open file is kept, and the requests at a
+        further position in the same identifier return its items starting with the text typed since the start of the
+        identifier, without a request to the server.
 
         :return List[multilspy_types.CompletionItem]: A list of completions
         """
         self._priv_check_server_started("request_completions")
+        await self._priv_ensure_server_running()
+
+        handles = await self._priv_request_completion_handles(relative_file_path, line, column, allow_incomplete, timeout)
+        return [dict(handle.item) for handle in handles]
+
+    async def request_completion_handles(
+        self,
+        relative_file_path: str,
+        line: int,
+        column: int,
+        allow_incomplete: bool = False,
+        timeout: Optional[float] = DEFAULT_TIMEOUT,
+    ) -> List[CompletionHandle]:
+        """
+        Find completions at the given line and column in the given file like request_completions, and return them as
+        handles whose details are resolved with completionItem/resolve only when asked for, see resolve_completions.
+
+        :param relative_file_path: The relative path of the file that has the symbol for which completions should be looked up
+        :param line: The line number of the symbol
+        :param column: The column number of the symbol
+        :param allow_incomplete: Return the items of an incomplete result instead of an empty list
+        :param timeout: Timeout in seconds for the whole call including retries, overriding the configured request_timeout,
+            None to wait forever
+
+        :return List[CompletionHandle]: A list of completion handles, whose item is the item of request_completions
+        """
+        self._priv_check_server_started("request_completion_handles")
+        await self._priv_ensure_server_running()
+
+        return await self._priv_request_completion_handles(relative_file_path, line, column, allow_incomplete, timeout)
+
+    async def resolve_completions(self, handles: List[CompletionHandle]) -> List[multilspy_types.CompletionItem]:
+        """
+        Resolve the details of the given completion items, such as the signature in detail and the documentation,
+        with [completionItem/resolve](https://microsoft.github.io/language-server-protocol/specifications/lsp/3.17/specification/#completionItem_resolve)
+        requests sent concurrently, with at most completion_resolve_max_in_flight of them waiting for a response at
+        any time. Resolved items are cached, and items the server cannot resolve are returned unchanged.
+
+        :param handles: Completion handles returned by request_completion_handles
+
+        :return List[multilspy_types.CompletionItem]: The resolved items, in the order of the handles
+        """
+        self._priv_check_server_started("resolve_completions")
+        await self._priv_ensure_server_running()
+
+        return await self.completion_resolver.resolve_all(handles)
+
+    async def _priv_request_completion_handles(
+        self, relative_file_path: str, line: int, column: int, allow_incomplete: bool, timeout: Optional[float]
+    ) -> List[CompletionHandle]:
+        """
+        Find the completions of request_completions and request_completion_handles.
+        """
+        loop = asyncio.get_running_loop()
+        report = CompletionReport()
+        self.completion_report = report
+        started = loop.time()
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.server.request_timeout
+        deadline = None if timeout is None else started + timeout
+        # Retrying stops at the completion deadline, while only the timeout fails the call
+        retry_deadline = deadline
+        if self.completion_deadline is not None:
+            retry_deadline = min(started + self.completion_deadline, deadline or float("inf"))
+        delay = self.completion_retry_delay
+
+        uri = pathlib.Path(os.path.join(self.repository_root_path, relative_file_path)).as_uri()
+        # Only the files open before the call are kept open long enough for a session to answer further requests
+        session_buffer = self.open_file_buffers.get(uri) if self.completion_filtering else None
+        if session_buffer is not None:
+            line_text = session_buffer.text.get_line(line)
+            char_column = session_buffer.text.get_column(line, column, self.position_encoding)
+            if session_buffer.completion_session is not None:
+                handles = session_buffer.completion_session.filter(line_text, line, char_column, session_buffer.version)
+                if handles is not None:
+                    report.filtered = True
+                    report.elapsed = loop.time() - started
+                    return handles
 
         with self.open_file(relative_file_path):
-            open_file_buffer = self.open_file_buffers[
-                pathlib.Path(os.path.join(self.repository_root_path, relative_file_path)).as_uri()
-            ]
+            open_file_buffer = self.open_file_buffers[uri]
             completion_params: LSPTypes.CompletionParams = {
                 "position": {"line": line, "character": column},
                 "textDocument": {"uri": open_file_buffer.uri},
@@ -539,17 +1215,35 @@ class LanguageServer:
             }
             response: Union[List[LSPTypes.CompletionItem], LSPTypes.CompletionList, None] = None
 
-            num_retries = 0
-            while response is None or (response["isIncomplete"] and num_retries < 30):
-                await self.completions_available.wait()
+            remaining = None if deadline is None else deadline - loop.time()
+            if remaining is not None and remaining <= 0:
+                raise asyncio.TimeoutError()
+            await asyncio.wait_for(self.completions_available.wait(), remaining)
+            while True:
+                remaining = None if deadline is None else max(deadline - loop.time(), 0)
                 response: Union[
                     List[LSPTypes.CompletionItem], LSPTypes.CompletionList, None
-                ] = await self.server.send.completion(completion_params)
+                ] = await self.server.send_with_timeout(remaining).completion(completion_params)
                 if isinstance(response, list):
                     response = {"items": response, "isIncomplete": False}
-                num_retries += 1
+                report.round_trips += 1
+                report.incomplete = response is None or response["isIncomplete"]
+                if not report.incomplete:
+                    break
+                if report.round_trips >= self.completion_max_round_trips:
+                    report.reason = REASON_MAX_ROUND_TRIPS
+                    break
+                remaining = None if retry_deadline is None else retry_deadline - loop.time()
+                if remaining is not None and remaining <= 0:
+                    report.reason = REASON_DEADLINE
+                    break
+                report.wait_time += await self.server_readiness.wait_until_ready(
+                    delay, remaining, self.completion_max_busy_wait
+                )
+                delay = min(delay * self.completion_retry_backoff, self.completion_retry_max_delay)
+            report.pending_work = self.server_readiness.pending_work() if report.incomplete else []
+            report.elapsed = loop.time() - started
 
-            # TODO: Understand how to appropriately handle `isIncomplete`
             if response is None or (response["isIncomplete"] and not(allow_incomplete)):
                 return []
 
@@ -561,7 +1255,8 @@ class LanguageServer:
             # TODO: Handle the case when the completion is a keyword
             items = [item for item in response if item["kind"] != LSPTypes.CompletionItemKind.Keyword]
 
-            completions_list: List[multilspy_types.CompletionItem] = []
+            # Handles of the distinct converted items, with the first item of the server converted to each
+            handles: Dict[str, CompletionHandle] = {}
 
             for item in items:
                 assert "insertText" in item or "textEdit" in item
@@ -602,26 +1297,88 @@ class LanguageServer:
                     assert False
 
                 completion_item = multilspy_types.CompletionItem(**completion_item)
-                completions_list.append(completion_item)
+                json_repr = json.dumps(completion_item, sort_keys=True)
+                if json_repr not in handles:
+                    handles[json_repr] = CompletionHandle(completion_item, item, self.completion_resolver)
+
+            completions = list(handles.values())
+            if session_buffer is not None and not report.incomplete:
+                session_buffer.completion_session = CompletionSession(
+                    line,
+                    CompletionSession.find_anchor(line_text, char_column),
+                    session_buffer.version,
+                    completions,
+                    self.completion_trigger_characters,
+                )
+            return completions
+
+    def get_completion_trie(self, completions: List[multilspy_types.CompletionItem]) -> CompletionTrie:
+        """
+        Get the CompletionTrie of the given completion result, to compute the tokens of a language model vocabulary
+        that can continue the completed identifier. The tries of the most recent results are cached.
 
-            return [
-                json.loads(json_repr)
-                for json_repr in set([json.dumps(item, sort_keys=True) for item in completions_list])
-            ]
+        :param completions: A result of request_completions
 
-    async def request_document_symbols(self, relative_file_path: str) -> Tuple[List[multilspy_types.UnifiedSymbolInformation], Union[List[multilspy_types.TreeRepr], None]]:
+        :return CompletionTrie: The trie of the texts of the completions
+        """
+        key = frozenset(item["completionText"] for item in completions)
+        trie = self._priv_completion_tries.get(key)
+        if trie is not None:
+            self._priv_completion_tries.move_to_end(key)
+            return trie
+        trie = CompletionTrie(key)
+        self._priv_completion_tries[key] = trie
+        if len(self._priv_completion_tries) > COMPLETION_TRIE_CACHE_SIZE:
+            self._priv_completion_tries.popitem(last=False)
+        return trie
+
+    async def request_allowed_tokens(
+        self,
+        relative_file_path: str,
+        line: int,
+        column: int,
+        vocabulary: TokenVocabulary,
+        timeout: Optional[float] = DEFAULT_TIMEOUT,
+    ) -> bytes:
+        """
+        Request the completions at the given line and column in the given file, and return the mask of the tokens of
+        the given vocabulary that can continue the identifier ending at the position: one byte per token id, 1 if
+        the token is allowed. See CompletionTrie.allowed_tokens.
+
+        :param relative_file_path: The relative path of the file that has the identifier being completed
+        :param line: The line number of the end of the identifier
+        :param column: The column number of the end of the identifier
+        :param vocabulary: The vocabulary of the language model
+        :param timeout: Timeout in seconds for the whole call including retries, overriding the configured request_timeout,
+            None to wait forever
+
+        :return bytes: The mask of the allowed tokens
+        """
+        completions = await self.request_completions(relative_file_path, line, column, timeout=timeout)
+        text_buffer = self._priv_get_text_buffer(relative_file_path)
+        line_text = text_buffer.get_line(line)
+        char_column = text_buffer.get_column(line, column, self.position_encoding)
+        prefix = line_text[CompletionSession.find_anchor(line_text, char_column) : char_column]
+        return self.get_completion_trie(completions).allowed_tokens(vocabulary, prefix)
+
+    async def request_document_symbols(
+        self, relative_file_path: str, timeout: Optional[float] = DEFAULT_TIMEOUT
+    ) -> Tuple[List[multilspy_types.UnifiedSymbolInformation], Union[List[multilspy_types.TreeRepr], None]]:
         """
         Raise a [textDocument/documentSymbol](https://microsoft.github.io/language-server-protocol/specifications/lsp/3.17/specification/#textDocument_documentSymbol) request to the Language Server
         to find symbols in the given file. Wait for the response and return the result.
 
         :param relative_file_path: The relative path of the file that has the symbols
+        :param timeout: Timeout in seconds for the request, overriding the configured request_timeout,
+            None to wait forever
 
         :return Tuple[List[multilspy_types.UnifiedSymbolInformation], Union[List[multilspy_types.TreeRepr], None]]: A list of symbols in the file, and the tree representation of the symbols
         """
         self._priv_check_server_started("request_document_symbols")
+        await self._priv_ensure_server_running()
 
         with self.open_file(relative_file_path):
-            response = await self.server.send.document_symbol(
+            response = await self.server.send_with_timeout(timeout).document_symbol(
                 {
                     "textDocument": {
                         "uri": pathlib.Path(os.path.join(self.repository_root_path, relative_file_path)).as_uri()
@@ -656,7 +1413,10 @@ class LanguageServer:
 
         return ret, l_tree
     
-    async def request_hover(self, relative_file_path: str, line: int, column: int) -> Union[multilspy_types.Hover, None]:
+    @cached_response("textDocument/hover")
+    async def request_hover(
+        self, relative_file_path: str, line: int, column: int, timeout: Optional[float] = DEFAULT_TIMEOUT
+    ) -> Union[multilspy_types.Hover, None]:
         """
         Raise a [textDocument/hover](https://microsoft.github.io/language-server-protocol/specifications/lsp/3.17/specification/#textDocument_hover) request to the Language Server
         to find the hover information at the given line and column in the given file. Wait for the response and return the result.
@@ -664,12 +1424,15 @@ class LanguageServer:
         :param relative_file_path: The relative path of the file that has the hover information
         :param line: The line number of the symbol
         :param column: The column number of the symbol
+        :param timeout: Timeout in seconds for the request, overriding the configured request_timeout,
+            None to wait forever
 
         :return None
         """
         self._priv_check_server_started("request_hover")
+        await self._priv_ensure_server_running()
         with self.open_file(relative_file_path):
-            response = await self.server.send.hover(
+            response = await self.server.send_with_timeout(timeout).hover(
                 {
                     "textDocument": {
                         "uri": pathlib.Path(os.path.join(self.repository_root_path, relative_file_path)).as_uri()
@@ -688,6 +1451,373 @@ class LanguageServer:
 
         return multilspy_types.Hover(**response)
 
+    async def request_batch(
+        self,
+        queries: List[Tuple[str, str, int, int]],
+        max_in_flight: int = DEFAULT_BATCH_MAX_IN_FLIGHT,
+        timeout: Optional[float] = DEFAULT_TIMEOUT,
+        return_exceptions: bool = False,
+    ) -> List[Any]:
+        """
+        Raise many requests to the Language Server at once and return their results in the order of the queries.
+
+        The queries are grouped by file, so that each file is opened once for the whole batch, and the requests
+        are sent concurrently, with at most max_in_flight of them waiting for a response at any time.
+
+        :param queries: A list of (method, relative_file_path, line, column) tuples, where method is one of
+                        "definition", "implementation", "references", "hover" and "completions".
+                        The result of each query is the value returned by the corresponding request_* method.
+        :param max_in_flight: The maximum number of requests waiting for a response at the same time
+        :param timeout: Timeout in seconds for each request, overriding the configured request_timeout,
+            None to wait forever
+        :param return_exceptions: If True, the exception raised by a failing query is returned as its result.
+                                  Otherwise the first exception is raised and the other queries are cancelled.
+
+        :return List[Any]: The results of the queries, in the order of the queries
+        """
+        self._priv_check_server_started("request_batch")
+
+        for method, _, _, _ in queries:
+            if method not in BATCH_METHODS:
+                raise MultilspyException(f"Unsupported method in request_batch: {method}")
+
+        queries_by_file: Dict[str, List[int]] = {}
+        for index, (_, relative_file_path, _, _) in enumerate(queries):
+            queries_by_file.setdefault(relative_file_path, []).append(index)
+
+        results: List[Any] = [None] * len(queries)
+        in_flight = asyncio.Semaphore(max_in_flight)
+
+        async def run_query(index: int) -> None:
+            method, relative_file_path, line, column = queries[index]
+            async with in_flight:
+                try:
+                    results[index] = await getattr(self, BATCH_METHODS[method])(
+                        relative_file_path, line, column, timeout=timeout
+                    )
+                except Exception as ex:
+                    if not return_exceptions:
+                        raise
+                    results[index] = ex
+
+        async def run_file_queries(relative_file_path: str, indices: List[int]) -> None:
+            with self.open_file(relative_file_path):
+                await asyncio.gather(*[run_query(index) for index in indices])
+
+        tasks = [
+            asyncio.ensure_future(run_file_queries(relative_file_path, indices))
+            for relative_file_path, indices in queries_by_file.items()
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return results
+
+    def get_request_stats(self) -> RequestStats:
+        """
+        Get the counters of requests that timed out, were cancelled by the client, or were cancelled
+        or rejected with ContentModified by the Language Server.
+        """
+        return self.server.request_stats
+
+    def get_stderr_tail(self, num_lines: Optional[int] = None) -> List[str]:
+        """
+        Get the most recent lines written by the Language Server to stderr, e.g. to report them after an error.
+
+        :param num_lines: The maximum number of lines to return, all the buffered lines if None
+        """
+        return self.server.get_stderr_tail(num_lines)
+
+    def get_response_cache_stats(self) -> CacheStats:
+        """
+        Get the hit, miss and eviction counters of the response cache, and its current size.
+        All the counters are 0 if the cache is disabled, see MultilspyConfig.response_cache_size.
+        """
+        if self.response_cache is None:
+            return CacheStats()
+        return self.response_cache.stats
+
+    def get_persistent_cache_stats(self) -> CacheStats:
+        """
+        Get the hit, miss and eviction counters of the persistent response cache, and its current size.
+        All the counters are 0 if the cache is disabled, see MultilspyConfig.persistent_cache.
+        """
+        if self.persistent_cache is None:
+            return CacheStats()
+        return self.persistent_cache.stats
+
+    @asynccontextmanager
+    async def _priv_start_server_deferred(self) -> AsyncIterator["LanguageServer"]:
+        """
+        Replaces start_server when the persistent cache is enabled: the requests answered from the cache do not need
+        the Language Server, which is started by the first request missing the cache and stopped on exit.
+        """
+        self.server_started = True
+        try:
+            yield self
+        finally:
+            server_start, self._priv_server_start = self._priv_server_start, None
+            if server_start is not None and not server_start.done():
+                server_start.cancel()
+            if self._priv_server_context is not None:
+                server_context, self._priv_server_context = self._priv_server_context, None
+                await server_context.__aexit__(None, None, None)
+            self.persistent_cache.close()
+            self._priv_forget_idle_files()
+            self._priv_forget_forked_files()
+            self.server_started = False
+
+    async def _priv_ensure_server_running(self) -> None:
+        """
+        Start the Language Server if its start was deferred and it is not started yet, and wait until it is ready.
+        """
+        if self.persistent_cache is None:
+            return
+        if self._priv_server_start is None:
+            self._priv_server_start = asyncio.ensure_future(self._priv_start_deferred_server())
+        await asyncio.shield(self._priv_server_start)
+
+    async def _priv_start_deferred_server(self) -> None:
+        """
+        Start the Language Server and open in it the files opened before it was started.
+        """
+        self.logger.log("Starting the Language Server on the first request missing the persistent cache", logging.INFO)
+        position_encoding = self.position_encoding
+        server_context = self._priv_start_language_server()
+        await server_context.__aenter__()
+        self._priv_server_context = server_context
+        if self.position_encoding != position_encoding:
+            server_encoding, self.position_encoding = self.position_encoding, position_encoding
+            raise MultilspyException(
+                f"Language Server chose the position encoding {server_encoding} instead of {position_encoding}, "
+                "the first one offered, which the columns answered from the persistent cache are in"
+            )
+        for file_buffer in self.open_file_buffers.values():
+            self.server.notify.did_open_text_document(
+                {
+                    LSPConstants.TEXT_DOCUMENT: {
+                        LSPConstants.URI: file_buffer.uri,
+                        LSPConstants.LANGUAGE_ID: file_buffer.language_id,
+                        LSPConstants.VERSION: file_buffer.version,
+                        LSPConstants.TEXT: file_buffer.contents,
+                    }
+                }
+            )
+
+    def get_open_file_stats(self) -> OpenFileStats:
+        """
+        Get the counters of the didOpen and didClose notifications sent to the Language Server, and of the didOpen
+        notifications saved by keeping files open after their last use.
+        """
+        return self.open_file_stats
+
+    def get_completion_report(self) -> CompletionReport:
+        """
+        Get how the result of the last call to request_completions was obtained: the number of requests sent, and
+        why retrying stopped if the result is incomplete.
+        """
+        return self.completion_report
+
+    def get_completion_resolve_stats(self) -> ResolveStats:
+        """
+        Get the counters of the completionItem/resolve requests sent by resolve_completions, and of the items resolved
+        without a request.
+        """
+        return self.completion_resolver.stats
+
+    async def _priv_send_resolve_completion_item(self, item: LSPTypes.CompletionItem) -> LSPTypes.CompletionItem:
+        """
+        Send a completionItem/resolve request for the given item to the Language Server.
+        """
+        return await self.server.send.resolve_completion_item(item)
+
+    def _priv_track_server_readiness(self) -> None:
+        """
+        Feed the readiness signals of the Language Server to server_readiness, in addition to the handlers registered
+        by the language specific start_server for the same methods.
+        """
+        self.server_readiness.reset()
+        self.completion_resolver.supported = False
+        notification_handlers = self.server.on_notification_handlers
+        handler = notification_handlers.get("experimental/serverStatus")
+        if not getattr(handler, "tracks_readiness", False):
+            self.server.on_notification(
+                "experimental/serverStatus", self._priv_chain_handler(handler, self.server_readiness.on_server_status)
+            )
+        if self.track_server_progress:
+            # Most language specific start_server discard $/progress, the most frequent notification of many servers:
+            # watching it only decodes the notifications beginning or ending work, the others are still dropped
+            self.server.watch_notification("$/progress", self.server_readiness.on_progress, PROGRESS_BOUNDARY_PATTERN)
+        request_handlers = self.server.on_request_handlers
+        if not getattr(request_handlers.get("client/registerCapability"), "tracks_readiness", False):
+            self.server.on_request(
+                "client/registerCapability",
+                self._priv_chain_handler(
+                    request_handlers.get("client/registerCapability"), self._priv_on_register_capability
+                ),
+            )
+
+    def _priv_on_register_capability(self, params: dict) -> None:
+        """
+        Record the capabilities registered dynamically by the Language Server, as done by some servers for completion.
+        """
+        self.server_readiness.on_register_capability(params)
+        for registration in params.get("registrations", []):
+            if registration["method"] == "textDocument/completion":
+                register_options = registration.get("registerOptions") or {}
+                self.completion_trigger_characters = register_options.get("triggerCharacters") or []
+                self.completion_resolver.supported = bool(register_options.get("resolveProvider"))
+
+    @staticmethod
+    def _priv_chain_handler(handler, track):
+        """
+        Wrap the given handler of messages from the Language Server, possibly None, to pass their params to track first.
+        """
+
+        async def chained(params):
+            track(params)
+            if handler is not None:
+                return await handler(params)
+
+        chained.tracks_readiness = True
+        return chained
+
+    def _priv_is_unchanged_on_disk(self, file_buffer: LSPFileBuffer) -> bool:
+        """
+        Check if the file of the given buffer is unchanged on disk since it was opened.
+        """
+        try:
+            stat_result = os.stat(PathUtils.uri_to_path(file_buffer.uri))
+        except OSError:
+            return False
+        return (stat_result.st_mtime_ns, stat_result.st_size) == file_buffer.file_stat
+
+    def _priv_evict_idle_files(self) -> None:
+        """
+        Close the least recently used files kept open beyond the keep_open_files and keep_open_max_bytes bounds.
+        """
+        idle_bytes = sum(self.idle_files.values()) if self.keep_open_max_bytes is not None else 0
+        while len(self.idle_files) > self.keep_open_files or (
+            self.keep_open_max_bytes is not None and idle_bytes > self.keep_open_max_bytes
+        ):
+            uri = next(iter(self.idle_files))
+            idle_bytes -= self.idle_files[uri]
+            self._priv_close_file(uri)
+            self.open_file_stats.evictions += 1
+
+    def _priv_close_file(self, uri: str) -> None:
+        """
+        Close the file with the given uri in the Language Server, it must not be in use.
+        """
+        assert self.open_file_buffers[uri].ref_count == 0
+        self.server.notify.did_close_text_document(
+            {
+                LSPConstants.TEXT_DOCUMENT: {
+                    LSPConstants.URI: uri,
+                }
+            }
+        )
+        self.open_file_stats.did_close += 1
+        del self.open_file_buffers[uri]
+        self.idle_files.pop(uri, None)
+
+    async def _priv_send_initialize(self, initialize_params: dict) -> dict:
+        """
+        Send the initialize request to the Language Server, offering the configured position encodings, and record
+        the position encoding chosen by the server. Called by the start_server method of the subclasses.
+
+        :param initialize_params: The params of the initialize request
+        :return dict: The result of the initialize request
+        """
+        initialize_params["capabilities"].setdefault("general", {})["positionEncodings"] = self.position_encodings
+        init_response = await self.server.send.initialize(initialize_params)
+        self.position_encoding = init_response["capabilities"].get("positionEncoding", UTF16)
+        completion_provider = init_response["capabilities"].get("completionProvider") or {}
+        self.completion_trigger_characters = completion_provider.get("triggerCharacters") or []
+        self.completion_resolver.supported = bool(completion_provider.get("resolveProvider"))
+        if self.position_encoding not in self.position_encodings + [UTF16]:
+            raise MultilspyException(f"Language Server chose an unsupported position encoding: {self.position_encoding}")
+        return init_response
+
+    def _priv_forget_idle_files(self) -> None:
+        """
+        Drop the buffers of the files kept open after their last use, once the Language Server is stopped.
+        """
+        for uri in self.idle_files:
+            del self.open_file_buffers[uri]
+        self.idle_files.clear()
+
+    def _priv_forget_forked_files(self) -> None:
+        """
+        Drop the buffers of the forked documents, once the Language Server is stopped.
+        """
+        for fork_path in self.forked_files:
+            absolute_file_path = str(PurePath(self.repository_root_path, fork_path))
+            del self.open_file_buffers[pathlib.Path(absolute_file_path).as_uri()]
+        self.forked_files.clear()
+
+    def _priv_get_text_buffer(self, relative_file_path: str) -> TextBuffer:
+        """
+        Get the TextBuffer of the given file: the one of its buffer if it is open, or else one read from disk and
+        cached until the file changes.
+
+        :param relative_file_path: The relative path of the file
+        """
+        absolute_file_path = str(PurePath(self.repository_root_path, relative_file_path))
+        file_buffer = self.open_file_buffers.get(pathlib.Path(absolute_file_path).as_uri())
+        if file_buffer is not None:
+            return file_buffer.text
+
+        stat_result = os.stat(absolute_file_path)
+        file_stat = (stat_result.st_mtime_ns, stat_result.st_size)
+        cached = self._priv_text_buffers.get(absolute_file_path)
+        if cached is not None and cached[0] == file_stat:
+            self._priv_text_buffers.move_to_end(absolute_file_path)
+            return cached[1]
+        text_buffer = TextBuffer(FileUtils.read_file(self.logger, absolute_file_path))
+        self._priv_text_buffers[absolute_file_path] = (file_stat, text_buffer)
+        if len(self._priv_text_buffers) > TEXT_BUFFER_CACHE_SIZE:
+            self._priv_text_buffers.popitem(last=False)
+        return text_buffer
+
+    def _priv_document_key(self, relative_file_path: str) -> str:
+        """
+        Get the digest identifying the contents of the given file as seen by the Language Server: the contents of
+        its buffer if it is open, or else its contents on disk.
+
+        :param relative_file_path: The relative path of the file
+        """
+        absolute_file_path = str(PurePath(self.repository_root_path, relative_file_path))
+        file_buffer = self.open_file_buffers.get(pathlib.Path(absolute_file_path).as_uri())
+        if file_buffer is None:
+            return self.file_digests.get(absolute_file_path)
+        return file_buffer.get_content_hash()
+
+    def _priv_unsaved_edits_key(self, relative_file_path: str) -> Tuple[Tuple[str, str], ...]:
+        """
+        Get the digests of the open files other than the given one whose contents differ from the files on disk, on
+        which the responses to queries of the given file can depend, e.g. the locations of references into them.
+
+        :param relative_file_path: The relative path of the queried file
+        """
+        uri = pathlib.Path(str(PurePath(self.repository_root_path, relative_file_path))).as_uri()
+        edited = []
+        for file_uri, file_buffer in self.open_file_buffers.items():
+            if file_buffer.version == 0 or file_uri == uri:
+                continue
+            content_hash = file_buffer.get_content_hash()
+            try:
+                if content_hash == self.file_digests.get(PathUtils.uri_to_path(file_uri)):
+                    # Edits undone, e.g. by a rollback
+                    continue
+            except OSError:
+                pass
+            edited.append((file_uri, content_hash))
+        return tuple(sorted(edited))
+
     def _priv_check_server_started(self, function_name: str) -> None:
         """
         Check if the language server has started, raise an exception if not.
@@ -766,6 +1896,52 @@ class SyncLanguageServer:
         """
         return self.language_server.delete_text_between_positions(relative_file_path, start, end)
 
+    def checkpoint(self, relative_file_path: str) -> Checkpoint:
+        """
+        Save the current state of the given open file, to restore it later with rollback, e.g. before inserting
+        candidate text to explore. A checkpoint shares the unedited lines of the file in memory, so taking many of them
+        is cheap.
+
+        :param relative_file_path: The relative path of the open file
+
+        :return Checkpoint: The checkpoint to pass to rollback
+        """
+        return self.language_server.checkpoint(relative_file_path)
+
+    def rollback(self, checkpoint: Checkpoint) -> None:
+        """
+        Restore the open file of the given checkpoint to its text at the checkpoint, with a single didChange
+        notification replacing the text changed since, or the whole text if more than ROLLBACK_FULL_TEXT_RATIO of it
+        changed. Nothing is sent if the text is unchanged. The checkpoint stays valid, to roll back to it again.
+
+        :param checkpoint: A checkpoint returned by the checkpoint method, for a file still open
+        """
+        return self.language_server.rollback(checkpoint)
+
+    def fork_file(self, relative_file_path: str, count: int = 1) -> List[str]:
+        """
+        Fork the given open file into count new documents open in the Language Server, with the text of the file but
+        edited and queried independently of it and of each other, e.g. to explore several candidate continuations of
+        the file concurrently. The documents are not written to disk: their paths are next to the file, so that the
+        Language Server analyzes them in the same context. The text of a document shares the unedited lines of the file
+        in memory. At most MultilspyConfig.max_forked_files documents can be forked at the same time, each one until
+        it is discarded with discard_fork.
+
+        :param relative_file_path: The relative path of the open file, or of a forked document
+        :param count: The number of documents to fork
+
+        :return List[str]: The relative paths of the forked documents, to pass to the other methods
+        """
+        return self.language_server.fork_file(relative_file_path, count)
+
+    def discard_fork(self, fork_path: str) -> None:
+        """
+        Close the given forked document in the Language Server, discarding its edits.
+
+        :param fork_path: The relative path of a document returned by fork_file, not open with open_file
+        """
+        return self.language_server.discard_fork(fork_path)
+
     def get_open_file_text(self, relative_file_path: str) -> str:
         """
         Get the contents of the given opened file as per the Language Server.
@@ -791,7 +1967,33 @@ class SyncLanguageServer:
         self.loop.call_soon_threadsafe(self.loop.stop)
         loop_thread.join()
 
-    def request_implementation(self, file_path: str, line: int, column: int) -> List[multilspy_types.Location]:
+    def get_offsets(self, relative_file_path: str, positions: Sequence[Tuple[int, int]]) -> List[int]:
+        """
+        Convert many positions in the given file to offsets in its text at once, e.g. the ranges of the locations
+        returned by request_references. The contents of the file are those of its buffer if it is open, or else
+        its contents on disk.
+
+        :param relative_file_path: The relative path of the file
+        :param positions: (line, column) pairs, with columns in the negotiated position encoding
+
+        :return List[int]: The offsets of the positions, in characters from the start of the text
+        """
+        return self.language_server.get_offsets(relative_file_path, positions)
+
+    def get_positions(self, relative_file_path: str, offsets: Sequence[int]) -> List[Tuple[int, int]]:
+        """
+        Convert many offsets in the text of the given file to positions at once, the inverse of get_offsets.
+
+        :param relative_file_path: The relative path of the file
+        :param offsets: Offsets in characters from the start of the text
+
+        :return List[Tuple[int, int]]: (line, column) pairs, with columns in the negotiated position encoding
+        """
+        return self.language_server.get_positions(relative_file_path, offsets)
+
+    def request_implementation(
+        self, file_path: str, line: int, column: int, timeout: Optional[float] = DEFAULT_TIMEOUT
+    ) -> List[multilspy_types.Location]:
         """
         Raise a [textDocument/implementation](https://microsoft.github.io/language-server-protocol/specifications/lsp/3.17/specification/#textDocument_implementation) request to the Language Server
         for the symbol at the given line and column in the given file. Wait for the response and return the result.
@@ -799,15 +2001,19 @@ class SyncLanguageServer:
         :param relative_file_path: The relative path of the file that has the symbol for which implementation should be looked up
         :param line: The line number of the symbol
         :param column: The column number of the symbol
+        :param timeout: Timeout in seconds for the request, overriding the configured request_timeout,
+            None to wait forever
 
         :return List[multilspy_types.Location]: A list of locations where the symbol is implemented
         """
         result = asyncio.run_coroutine_threadsafe(
-            self.language_server.request_implementation(file_path, line, column), self.loop
+            self.language_server.request_implementation(file_path, line, column, timeout), self.loop
         ).result()
         return result
     
-    def request_definition(self, file_path: str, line: int, column: int) -> List[multilspy_types.Location]:
+    def request_definition(
+        self, file_path: str, line: int, column: int, timeout: Optional[float] = DEFAULT_TIMEOUT
+    ) -> List[multilspy_types.Location]:
         """
         Raise a [textDocument/definition](https://microsoft.github.io/language-server-protocol/specifications/lsp/3.17/specification/#textDocument_definition) request to the Language Server
         for the symbol at the given line and column in the given file. Wait for the response and return the result.
@@ -815,15 +2021,19 @@ class SyncLanguageServer:
         :param relative_file_path: The relative path of the file that has the symbol for which definition should be looked up
         :param line: The line number of the symbol
         :param column: The column number of the symbol
+        :param timeout: Timeout in seconds for the request, overriding the configured request_timeout,
+            None to wait forever
 
         :return List[multilspy_types.Location]: A list of locations where the symbol is defined
         """
         result = asyncio.run_coroutine_threadsafe(
-            self.language_server.request_definition(file_path, line, column), self.loop
+            self.language_server.request_definition(file_path, line, column, timeout), self.loop
         ).result()
         return result
 
-    def request_references(self, file_path: str, line: int, column: int) -> List[multilspy_types.Location]:
+    def request_references(
+        self, file_path: str, line: int, column: int, timeout: Optional[float] = DEFAULT_TIMEOUT
+    ) -> List[multilspy_types.Location]:
         """
         Raise a [textDocument/references](https://microsoft.github.io/language-server-protocol/specifications/lsp/3.17/specification/#textDocument_references) request to the Language Server
         to find references to the symbol at the given line and column in the given file. Wait for the response and return the result.
@@ -831,16 +2041,86 @@ class SyncLanguageServer:
         :param relative_file_path: The relative path of the file that has the symbol for which references should be looked up
         :param line: The line number of the symbol
         :param column: The column number of the symbol
+        :param timeout: Timeout in seconds for the request, overriding the configured request_timeout,
+            None to wait forever
 
         :return List[multilspy_types.Location]: A list of locations where the symbol is referenced
         """
         result = asyncio.run_coroutine_threadsafe(
-            self.language_server.request_references(file_path, line, column), self.loop
+            self.language_server.request_references(file_path, line, column, timeout), self.loop
         ).result()
         return result
 
+    def request_references_stream(
+        self, file_path: str, line: int, column: int, timeout: Optional[float] = DEFAULT_TIMEOUT
+    ) -> Iterator[multilspy_types.Location]:
+        """
+        Raise a [textDocument/references](https://microsoft.github.io/language-server-protocol/specifications/lsp/3.17/specification/#textDocument_references) request to the Language Server
+        to find references to the symbol at the given line and column in the given file, and yield the locations as they are received.
+
+        :param relative_file_path: The relative path of the file that has the symbol for which references should be looked up
+        :param line: The line number of the symbol
+        :param column: The column number of the symbol
+        :param timeout: Timeout in seconds for the whole response, overriding the configured request_timeout,
+            None to wait forever
+
+        :return Iterator[multilspy_types.Location]: The locations where the symbol is referenced
+        """
+        return self._priv_iterate_stream(
+            self.language_server.request_references_stream(file_path, line, column, timeout)
+        )
+
+    def request_workspace_symbol_stream(
+        self, query: str, timeout: Optional[float] = DEFAULT_TIMEOUT
+    ) -> Iterator[multilspy_types.UnifiedSymbolInformation]:
+        """
+        Raise a [workspace/symbol](https://microsoft.github.io/language-server-protocol/specifications/lsp/3.17/specification/#workspace_symbol) request to the Language Server
+        to find the symbols matching the given query in the workspace, and yield the symbols as they are received.
+
+        :param query: The query string to filter the symbols by
+        :param timeout: Timeout in seconds for the whole response, overriding the configured request_timeout,
+            None to wait forever
+
+        :return Iterator[multilspy_types.UnifiedSymbolInformation]: The symbols matching the query
+        """
+        return self._priv_iterate_stream(self.language_server.request_workspace_symbol_stream(query, timeout))
+
+    def _priv_iterate_stream(self, items: AsyncIterator) -> Iterator:
+        """
+        Iterate over the given async iterator on the event loop thread, yielding its items to the calling thread.
+        Stopping the iteration early stops the async iterator.
+        """
+        received: queue.Queue = queue.Queue()
+        end = object()
+
+        async def pump() -> None:
+            try:
+                async for item in items:
+                    received.put((item, None))
+                received.put((end, None))
+            except BaseException as ex:
+                received.put((end, ex))
+                raise
+
+        future = asyncio.run_coroutine_threadsafe(pump(), self.loop)
+        try:
+            while True:
+                item, ex = received.get()
+                if ex is not None:
+                    raise ex
+                if item is end:
+                    return
+                yield item
+        finally:
+            future.cancel()
+
     def request_completions(
-        self, relative_file_path: str, line: int, column: int, allow_incomplete: bool = False
+        self,
+        relative_file_path: str,
+        line: int,
+        column: int,
+        allow_incomplete: bool = False,
+        timeout: Optional[float] = DEFAULT_TIMEOUT,
     ) -> List[multilspy_types.CompletionItem]:
         """
         Raise a [textDocument/completion](https://microsoft.github.io/language-server-protocol/specifications/lsp/3.17/specification/#textDocument_completion) request to the Language Server
@@ -849,30 +2129,120 @@ class SyncLanguageServer:
         :param relative_file_path: The relative path of the file that has the symbol for which completions should be looked up
         :param line: The line number of the symbol
         :param column: The column number of the symbol
+        :param timeout: Timeout in seconds for the whole call including retries, overriding the configured request_timeout,
+            None to wait forever
 
         :return List[multilspy_types.CompletionItem]: A list of completions
         """
         result = asyncio.run_coroutine_threadsafe(
-            self.language_server.request_completions(relative_file_path, line, column, allow_incomplete),
+            self.language_server.request_completions(relative_file_path, line, column, allow_incomplete, timeout),
             self.loop,
         ).result()
         return result
 
-    def request_document_symbols(self, relative_file_path: str) -> Tuple[List[multilspy_types.UnifiedSymbolInformation], Union[List[multilspy_types.TreeRepr], None]]:
+    def request_completion_handles(
+        self,
+        relative_file_path: str,
+        line: int,
+        column: int,
+        allow_incomplete: bool = False,
+        timeout: Optional[float] = DEFAULT_TIMEOUT,
+    ) -> List[CompletionHandle]:
+        """
+        Find completions at the given line and column in the given file like request_completions, and return them as
+        handles whose details are resolved with completionItem/resolve only when asked for, see resolve_completions.
+
+        :param relative_file_path: The relative path of the file that has the symbol for which completions should be looked up
+        :param line: The line number of the symbol
+        :param column: The column number of the symbol
+        :param allow_incomplete: Return the items of an incomplete result instead of an empty list
+        :param timeout: Timeout in seconds for the whole call including retries, overriding the configured request_timeout,
+            None to wait forever
+
+        :return List[CompletionHandle]: A list of completion handles, whose item is the item of request_completions
+        """
+        result = asyncio.run_coroutine_threadsafe(
+            self.language_server.request_completion_handles(relative_file_path, line, column, allow_incomplete, timeout),
+            self.loop,
+        ).result()
+        return result
+
+    def resolve_completions(self, handles: List[CompletionHandle]) -> List[multilspy_types.CompletionItem]:
+        """
+        Resolve the details of the given completion items, such as the signature in detail and the documentation,
+        with [completionItem/resolve](https://microsoft.github.io/language-server-protocol/specifications/lsp/3.17/specification/#completionItem_resolve)
+        requests sent concurrently, with at most completion_resolve_max_in_flight of them waiting for a response at
+        any time. Resolved items are cached, and items the server cannot resolve are returned unchanged.
+
+        :param handles: Completion handles returned by request_completion_handles
+
+        :return List[multilspy_types.CompletionItem]: The resolved items, in the order of the handles
+        """
+        result = asyncio.run_coroutine_threadsafe(
+            self.language_server.resolve_completions(handles), self.loop
+        ).result()
+        return result
+
+    def get_completion_trie(self, completions: List[multilspy_types.CompletionItem]) -> CompletionTrie:
+        """
+        Get the CompletionTrie of the given completion result, to compute the tokens of a language model vocabulary
+        that can continue the completed identifier. The tries of the most recent results are cached.
+
+        :param completions: A result of request_completions
+
+        :return CompletionTrie: The trie of the texts of the completions
+        """
+        return self.language_server.get_completion_trie(completions)
+
+    def request_allowed_tokens(
+        self,
+        relative_file_path: str,
+        line: int,
+        column: int,
+        vocabulary: TokenVocabulary,
+        timeout: Optional[float] = DEFAULT_TIMEOUT,
+    ) -> bytes:
+        """
+        Request the completions at the given line and column in the given file, and return the mask of the tokens of
+        the given vocabulary that can continue the identifier ending at the position: one byte per token id, 1 if
+        the token is allowed. See CompletionTrie.allowed_tokens.
+
+        :param relative_file_path: The relative path of the file that has the identifier being completed
+        :param line: The line number of the end of the identifier
+        :param column: The column number of the end of the identifier
+        :param vocabulary: The vocabulary of the language model
+        :param timeout: Timeout in seconds for the whole call including retries, overriding the configured request_timeout,
+            None to wait forever
+
+        :return bytes: The mask of the allowed tokens
+        """
+        result = asyncio.run_coroutine_threadsafe(
+            self.language_server.request_allowed_tokens(relative_file_path, line, column, vocabulary, timeout),
+            self.loop,
+        ).result()
+        return result
+
+    def request_document_symbols(
+        self, relative_file_path: str, timeout: Optional[float] = DEFAULT_TIMEOUT
+    ) -> Tuple[List[multilspy_types.UnifiedSymbolInformation], Union[List[multilspy_types.TreeRepr], None]]:
         """
         Raise a [textDocument/documentSymbol](https://microsoft.github.io/language-server-protocol/specifications/lsp/3.17/specification/#textDocument_documentSymbol) request to the Language Server
         to find symbols in the given file. Wait for the response and return the result.
 
         :param relative_file_path: The relative path of the file that has the symbols
+        :param timeout: Timeout in seconds for the request, overriding the configured request_timeout,
+            None to wait forever
 
         :return Tuple[List[multilspy_types.UnifiedSymbolInformation], Union[List[multilspy_types.TreeRepr], None]]: A list of symbols in the file, and the tree representation of the symbols
         """
         result = asyncio.run_coroutine_threadsafe(
-            self.language_server.request_document_symbols(relative_file_path), self.loop
+            self.language_server.request_document_symbols(relative_file_path, timeout), self.loop
         ).result()
         return result
 
-    def request_hover(self, relative_file_path: str, line: int, column: int) -> Union[multilspy_types.Hover, None]:
+    def request_hover(
+        self, relative_file_path: str, line: int, column: int, timeout: Optional[float] = DEFAULT_TIMEOUT
+    ) -> Union[multilspy_types.Hover, None]:
         """
         Raise a [textDocument/hover](https://microsoft.github.io/language-server-protocol/specifications/lsp/3.17/specification/#textDocument_hover) request to the Language Server
         to find the hover information at the given line and column in the given file. Wait for the response and return the result.
@@ -880,11 +2250,13 @@ class SyncLanguageServer:
         :param relative_file_path: The relative path of the file that has the hover information
         :param line: The line number of the symbol
         :param column: The column number of the symbol
+        :param timeout: Timeout in seconds for the request, overriding the configured request_timeout,
+            None to wait forever
 
         :return None
         """
         result = asyncio.run_coroutine_threadsafe(
-            self.language_server.request_hover(relative_file_path, line, column), self.loop
+            self.language_server.request_hover(relative_file_path, line, column, timeout), self.loop
         ).result()
         return result
 
@@ -894,4 +2266,81 @@ class SyncLanguageServer:
 
         :param relative_file_path: The relative path of the file to save.
         """
-        self.language_server.save_file(relative_file_path)
\ No newline at end of file
+        self.language_server.save_file(relative_file_path)
+
+    def request_batch(
+        self,
+        queries: List[Tuple[str, str, int, int]],
+        max_in_flight: int = DEFAULT_BATCH_MAX_IN_FLIGHT,
+        timeout: Optional[float] = DEFAULT_TIMEOUT,
+        return_exceptions: bool = False,
+    ) -> List[Any]:
+        """
+        Raise many requests to the Language Server at once and return their results in the order of the queries.
+
+        The queries are grouped by file, so that each file is opened once for the whole batch, and the requests
+        are sent concurrently, with at most max_in_flight of them waiting for a response at any time.
+
+        :param queries: A list of (method, relative_file_path, line, column) tuples, where method is one of
+                        "definition", "implementation", "references", "hover" and "completions".
+        :param max_in_flight: The maximum number of requests waiting for a response at the same time
+        :param timeout: Timeout in seconds for each request, overriding the configured request_timeout,
+            None to wait forever
+        :param return_exceptions: If True, the exception raised by a failing query is returned as its result
+
+        :return List[Any]: The results of the queries, in the order of the queries
+        """
+        result = asyncio.run_coroutine_threadsafe(
+            self.language_server.request_batch(queries, max_in_flight, timeout, return_exceptions), self.loop
+        ).result()
+        return result
+
+    def get_request_stats(self) -> RequestStats:
+        """
+        Get the counters of requests that timed out, were cancelled by the client, or were cancelled
+        or rejected with ContentModified by the Language Server.
+        """
+        return self.language_server.get_request_stats()
+
+    def get_stderr_tail(self, num_lines: Optional[int] = None) -> List[str]:
+        """
+        Get the most recent lines written by the Language Server to stderr, e.g. to report them after an error.
+
+        :param num_lines: The maximum number of lines to return, all the buffered lines if None
+        """
+        return self.language_server.get_stderr_tail(num_lines)
+
+    def get_response_cache_stats(self) -> CacheStats:
+        """
+        Get the hit, miss and eviction counters of the response cache, and its current size.
+        All the counters are 0 if the cache is disabled, see MultilspyConfig.response_cache_size.
+        """
+        return self.language_server.get_response_cache_stats()
+
+    def get_persistent_cache_stats(self) -> CacheStats:
+        """
+        Get the hit, miss and eviction counters of the persistent response cache, and its current size.
+        All the counters are 0 if the cache is disabled, see MultilspyConfig.persistent_cache.
+        """
+        return self.language_server.get_persistent_cache_stats()
+
+    def get_open_file_stats(self) -> OpenFileStats:
+        """
+        Get the counters of the didOpen and didClose notifications sent to the Language Server, and of the didOpen
+        notifications saved by keeping files open after their last use.
+        """
+        return self.language_server.get_open_file_stats()
+
+    def get_completion_report(self) -> CompletionReport:
+        """
+        Get how the result of the last call to request_completions was obtained: the number of requests sent, and
+        why retrying stopped if the result is incomplete.
+        """
+        return self.language_server.get_completion_report()
+
+    def get_completion_resolve_stats(self) -> ResolveStats:
+        """
+        Get the counters of the completionItem/resolve requests sent by resolve_completions, and of the items resolved
+        without a request.
+        """
+        return self.language_server.get_completion_resolve_stats()
@@ -18,12 +18,21 @@ from multilspy.multilspy_logger import MultilspyLogger
 from multilspy.language_server import LanguageServer
 from multilspy.lsp_protocol_handler.server import ProcessLaunchInfo
 from multilspy.lsp_protocol_handler.lsp_types import InitializeParams
-from multilspy.multilspy_config import MultilspyConfig
+from multilspy.multilspy_config import MultilspyConfig, ServerLogLevel
 from multilspy.multilspy_settings import MultilspySettings
 from multilspy.multilspy_utils import FileUtils
 from multilspy.multilspy_utils import PlatformUtils
 from pathlib import PurePath
 
+# Values of the JDTLS log.level property (java.util.logging levels) for each ServerLogLevel
+JDTLS_LOG_LEVELS = {
+    ServerLogLevel.TRACE: "ALL",
+    ServerLogLevel.DEBUG: "FINE",
+    ServerLogLevel.INFO: "INFO",
+    ServerLogLevel.WARNING: "WARNING",
+    ServerLogLevel.ERROR: "SEVERE",
+}
+
 
 @dataclasses.dataclass
 class RuntimeDependencyPaths:
@@ -120,7 +129,7 @@ class EclipseJDTLS(LanguageServer):
                 "-Xmx3G",
                 "-Xms100m",
                 "-Xlog:disable",
-                "-Dlog.level=ALL",
+                f"-Dlog.level={JDTLS_LOG_LEVELS[ServerLogLevel(config.server_log_level)]}",
                 f"-javaagent:{lombok_jar_path}",
                 f"-Djdt.core.sharedIndexLocation={shared_cache_location}",
                 "-jar",
@@ -359,8 +368,8 @@ class EclipseJDTLS(LanguageServer):
         self.server.on_notification("language/status", lang_status_handler)
         self.server.on_notification("window/logMessage", window_log_message)
         self.server.on_request("workspace/executeClientCommand", execute_client_command_handler)
-        self.server.on_notification("$/progress", do_nothing)
-        self.server.on_notification("textDocument/publishDiagnostics", do_nothing)
+        self.server.discard_notification("$/progress")
+        self.server.discard_notification("textDocument/publishDiagnostics")
         self.server.on_notification("language/actionableNotification", do_nothing)
 
         async with super().start_server():
@@ -372,7 +381,7 @@ class EclipseJDTLS(LanguageServer):
                 "Sending initialize request from LSP client to LSP server and awaiting response",
                 logging.INFO,
             )
-            init_response = await self.server.send.initialize(initialize_params)
+            init_response = await self._priv_send_initialize(initialize_params)
             assert init_response["capabilities"]["textDocumentSync"]["change"] == 2
             assert "completionProvider" not in init_response["capabilities"]
             assert "executeCommandProvider" not in init_response["capabilities"]
@@ -9,6 +9,7 @@ import logging
 import os
 import pathlib
 import pwd
+import shlex
 import shutil
 import subprocess
 from typing import AsyncIterator, Dict, Any
@@ -26,15 +27,20 @@ class GoplsServer(LanguageServer):
     Implementation of the Language Server Protocol for Go using gopls.
     """
 
+    socket_listen_supported = True
+
     def __init__(self, config: MultilspyConfig, logger: MultilspyLogger, repository_root_path: str):
         """
         Creates a GoplsServer instance. This class is not meant to be instantiated directly. Use LanguageServer.create() instead.
         """
         gopls_executable_path = self.setup_runtime_dependencies(logger, config)
         # Construct full command with args
-        #cmd = f"{gopls_executable_path} serve --stdio"
-        #cmd = f"{gopls_executable_path} serve -listen=127.0.0.1:37375"
-        cmd = f"{gopls_executable_path} serve"
+        if config.transport == "tcp":
+            cmd = f"{gopls_executable_path} serve -listen={config.host}:{config.port}"
+        elif config.transport == "unix":
+            cmd = f"{gopls_executable_path} serve -listen={shlex.quote('unix;' + (config.socket_path or ''))}"
+        else:
+            cmd = f"{gopls_executable_path} serve"
         super().__init__(
             config,
             logger,
@@ -163,7 +169,6 @@ class GoplsServer(LanguageServer):
             return []
 
         async def do_nothing(params):
-            print(f"Received message: {params}")
             return
 
         async def window_log_message(msg):
@@ -176,8 +181,8 @@ class GoplsServer(LanguageServer):
         self.server.on_notification("language/status", do_nothing)
         self.server.on_notification("window/logMessage", window_log_message)
         self.server.on_request("workspace/executeClientCommand", execute_client_command_handler)
-        self.server.on_notification("$/progress", do_nothing)
-        self.server.on_notification("textDocument/publishDiagnostics", do_nothing)
+        self.server.discard_notification("$/progress")
+        self.server.discard_notification("textDocument/publishDiagnostics")
         self.server.on_notification("language/actionableNotification", do_nothing)
         self.server.on_notification("textDocument/completion", do_nothing)
         self.server.on_notification("textDocument/implementation", do_nothing)
@@ -193,7 +198,7 @@ class GoplsServer(LanguageServer):
                 logging.INFO,
             )
             try:
-                init_response = await self.server.send.initialize(initialize_params)
+                init_response = await self._priv_send_initialize(initialize_params)
             except TimeoutError as e:
                 self.logger.log(f"Timeout during initialization: {str(e)}", logging.ERROR)
                 raise
@@ -90,8 +90,8 @@ class JediServer(LanguageServer):
         self.server.on_notification("language/status", do_nothing)
         self.server.on_notification("window/logMessage", window_log_message)
         self.server.on_request("workspace/executeClientCommand", execute_client_command_handler)
-        self.server.on_notification("$/progress", do_nothing)
-        self.server.on_notification("textDocument/publishDiagnostics", do_nothing)
+        self.server.discard_notification("$/progress")
+        self.server.discard_notification("textDocument/publishDiagnostics")
         self.server.on_notification("language/actionableNotification", do_nothing)
         self.server.on_notification("experimental/serverStatus", check_experimental_status)
 
@@ -104,7 +104,7 @@ class JediServer(LanguageServer):
                 "Sending initialize request from LSP client to LSP server and awaiting response",
                 logging.INFO,
             )
-            init_response = await self.server.send.initialize(initialize_params)
+            init_response = await self._priv_send_initialize(initialize_params)
             assert init_response["capabilities"]["textDocumentSync"]["change"] == 2
             assert "completionProvider" in init_response["capabilities"]
             assert init_response["capabilities"]["completionProvider"] == {
@@ -15,11 +15,21 @@ from multilspy.multilspy_logger import MultilspyLogger
 from multilspy.language_server import LanguageServer
 from multilspy.lsp_protocol_handler.server import ProcessLaunchInfo
 from multilspy.lsp_protocol_handler.lsp_types import InitializeParams
-from multilspy.multilspy_config import MultilspyConfig
+from multilspy.multilspy_config import MultilspyConfig, ServerLogLevel
 from multilspy.multilspy_exceptions import MultilspyException
 from multilspy.multilspy_utils import FileUtils, PlatformUtils, PlatformId, DotnetVersion
 
 
+# Values of the OmniSharp --loglevel option for each ServerLogLevel
+OMNISHARP_LOG_LEVELS = {
+    ServerLogLevel.TRACE: "trace",
+    ServerLogLevel.DEBUG: "debug",
+    ServerLogLevel.INFO: "information",
+    ServerLogLevel.WARNING: "warning",
+    ServerLogLevel.ERROR: "error",
+}
+
+
 def breadth_first_file_scan(root) -> Iterable[str]:
     """
     This function was obtained from https://stackoverflow.com/questions/49654234/is-there-a-breadth-first-search-option-available-in-os-walk-or-equivalent-py
@@ -82,7 +92,7 @@ class OmniSharp(LanguageServer):
                 str(os.getpid()),
                 "DotNet:enablePackageRestore=false",
                 "--loglevel",
-                "trace",
+                OMNISHARP_LOG_LEVELS[ServerLogLevel(config.server_log_level)],
                 "--plugin",
                 dll_path,
                 "FileOptions:SystemExcludeSearchPatterns:0=**/.git",
@@ -361,8 +371,8 @@ class OmniSharp(LanguageServer):
         self.server.on_notification("language/status", lang_status_handler)
         self.server.on_notification("window/logMessage", window_log_message)
         self.server.on_request("workspace/executeClientCommand", execute_client_command_handler)
-        self.server.on_notification("$/progress", do_nothing)
-        self.server.on_notification("textDocument/publishDiagnostics", do_nothing)
+        self.server.discard_notification("$/progress")
+        self.server.discard_notification("textDocument/publishDiagnostics")
         self.server.on_notification("language/actionableNotification", do_nothing)
         self.server.on_notification("experimental/serverStatus", check_experimental_status)
         self.server.on_request("workspace/configuration", workspace_configuration_handler)
@@ -376,7 +386,7 @@ class OmniSharp(LanguageServer):
                 "Sending initialize request from LSP client to LSP server and awaiting response",
                 logging.INFO,
             )
-            init_response = await self.server.send.initialize(initialize_params)
+            init_response = await self._priv_send_initialize(initialize_params)
             self.server.notify.initialized({})
             with open(os.path.join(os.path.dirname(__file__), "workspace_did_change_configuration.json"), "r") as f:
                 self.server.notify.workspace_did_change_configuration({
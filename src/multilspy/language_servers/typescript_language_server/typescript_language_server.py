@@ -151,8 +151,8 @@ class TypeScriptLanguageServer(LanguageServer):
         self.server.on_request("client/registerCapability", register_capability_handler)
         self.server.on_notification("window/logMessage", window_log_message)
         self.server.on_request("workspace/executeClientCommand", execute_client_command_handler)
-        self.server.on_notification("$/progress", do_nothing)
-        self.server.on_notification("textDocument/publishDiagnostics", do_nothing)
+        self.server.discard_notification("$/progress")
+        self.server.discard_notification("textDocument/publishDiagnostics")
 
         async with super().start_server():
             self.logger.log("Starting TypeScript server process", logging.INFO)
@@ -163,7 +163,7 @@ class TypeScriptLanguageServer(LanguageServer):
                 "Sending initialize request from LSP client to LSP server and awaiting response",
                 logging.INFO,
             )
-            init_response = await self.server.send.initialize(initialize_params)
+            init_response = await self._priv_send_initialize(initialize_params)
             
             # TypeScript-specific capability checks
             assert init_response["capabilities"]["textDocumentSync"] == 2
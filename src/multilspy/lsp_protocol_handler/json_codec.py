@@ -0,0 +1,169 @@
+"""
+This file provides the JSON codecs used by the JSON-RPC client to serialize outbound messages and
+parse inbound message bodies.
+
+The fastest available implementation is picked at runtime: orjson or msgspec are used if they are
+installed, and the standard library json module is used otherwise.
+"""
+
+import codecs
+import json
+import re
+from typing import Any, List, Optional, Tuple, Type
+
+ENCODING = "utf-8"
+
+# Whitespace and separators between the elements of an array
+ARRAY_SEPARATOR_PATTERN = re.compile(r"[\s,]*")
+ARRAY_ELEMENT_TERMINATORS = frozenset(" \t\r\n,]")
+
+
+class JsonCodec:
+    """
+    Base class for the JSON codecs. A codec encodes payloads to UTF-8 bytes, and decodes UTF-8
+    encoded bytes-like objects (bytes, bytearray or memoryview) to payloads.
+
+    Attributes:
+        name: The name used to select the codec in get_json_codec.
+        decode_errors: The exception types raised by decode on malformed input.
+    """
+
+    name = ""
+    decode_errors: Tuple[Type[BaseException], ...] = (ValueError,)
+
+    def encode(self, payload: Any) -> bytes:
+        raise NotImplementedError()
+
+    def decode(self, data: Any) -> Any:
+        raise NotImplementedError()
+
+
+class StdlibJsonCodec(JsonCodec):
+    """
+    JSON codec backed by the standard library json module.
+    """
+
+    name = "json"
+    decode_errors = (json.JSONDecodeError, UnicodeDecodeError)
+
+    def encode(self, payload: Any) -> bytes:
+        return json.dumps(payload, check_circular=False, ensure_ascii=False, separators=(",", ":")).encode(ENCODING)
+
+    def decode(self, data: Any) -> Any:
+        # json.loads does not accept memoryview, decode to str directly instead of copying to bytes first
+        return json.loads(str(data, ENCODING))
+
+
+class OrjsonCodec(JsonCodec):
+    """
+    JSON codec backed by orjson (https://github.com/ijl/orjson).
+    """
+
+    name = "orjson"
+
+    def __init__(self) -> None:
+        import orjson
+
+        self._orjson = orjson
+        self._fallback = StdlibJsonCodec()
+        self.decode_errors = (orjson.JSONDecodeError,)
+
+    def encode(self, payload: Any) -> bytes:
+        try:
+            return self._orjson.dumps(payload)
+        except self._orjson.JSONEncodeError:
+            # orjson is stricter than json (e.g. integers wider than 64 bits), defer to json in such cases
+            return self._fallback.encode(payload)
+
+    def decode(self, data: Any) -> Any:
+        return self._orjson.loads(data)
+
+
+class MsgspecJsonCodec(JsonCodec):
+    """
+    JSON codec backed by msgspec (https://github.com/jcrist/msgspec).
+    """
+
+    name = "msgspec"
+
+    def __init__(self) -> None:
+        import msgspec
+
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = msgspec.json.Decoder()
+        self._fallback = StdlibJsonCodec()
+        self.decode_errors = (msgspec.DecodeError,)
+        self._encode_errors = (msgspec.EncodeError, TypeError, OverflowError)
+
+    def encode(self, payload: Any) -> bytes:
+        try:
+            return self._encoder.encode(payload)
+        except self._encode_errors:
+            return self._fallback.encode(payload)
+
+    def decode(self, data: Any) -> Any:
+        return self._decoder.decode(data)
+
+
+# Codecs in order of preference when no codec is explicitly requested
+JSON_CODECS = {codec.name: codec for codec in [OrjsonCodec, MsgspecJsonCodec, StdlibJsonCodec]}
+
+
+def get_json_codec(name: Optional[str] = None) -> JsonCodec:
+    """
+    Returns an instance of the JSON codec with the given name ("orjson", "msgspec" or "json").
+    If no name is given, the fastest installed codec is returned.
+    """
+    if name is not None:
+        if name not in JSON_CODECS:
+            raise ValueError(f"Unknown JSON codec: {name}")
+        return JSON_CODECS[name]()
+
+    for codec_cls in JSON_CODECS.values():
+        try:
+            return codec_cls()
+        except ImportError:
+            continue
+    return StdlibJsonCodec()
+
+
+class JsonArrayStreamDecoder:
+    """
+    Decodes the elements of a JSON array incrementally, from chunks of UTF-8 encoded bytes that start right
+    after the opening bracket of the array. Only the text of the elements that are not complete yet is kept.
+    """
+
+    def __init__(self) -> None:
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder(ENCODING)()
+        self._text = ""
+        # Whether the closing bracket of the array was read
+        self.done = False
+
+    def feed(self, data: Any) -> List[Any]:
+        """
+        Appends the given bytes-like object to the array text and returns the elements completed by it
+        """
+        if self.done:
+            return []
+        text = self._text + self._text_decoder.decode(data)
+        items = []
+        pos = 0
+        while True:
+            pos = ARRAY_SEPARATOR_PATTERN.match(text, pos).end()
+            if pos == len(text):
+                break
+            if text[pos] == "]":
+                self.done = True
+                break
+            try:
+                item, end = self._decoder.raw_decode(text, pos)
+            except json.JSONDecodeError:
+                break
+            if end == len(text) or text[end] not in ARRAY_ELEMENT_TERMINATORS:
+                # A number at the end of the text may continue in the next chunk
+                break
+            items.append(item)
+            pos = end
+        self._text = "" if self.done else text[pos:]
+        return items
@@ -30,17 +30,66 @@ SOFTWARE.
 
 import asyncio
 import dataclasses
-import json
+import functools
 import os
-from typing import Any, Dict, List, Optional, Union
+import re
+from collections import Counter, deque
+from typing import Any, AsyncIterator, Callable, Coroutine, Deque, Dict, List, Optional, Pattern, Set, Tuple, Union
 
 from .lsp_requests import LspNotification, LspRequest
-from .lsp_types import ErrorCodes
+from .json_codec import JsonArrayStreamDecoder, JsonCodec, get_json_codec
+from .lsp_types import ErrorCodes, LSPErrorCodes
+from .trace import CLIENT_TO_SERVER, SERVER_TO_CLIENT, TraceRecorder
+from .transport import (
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_WRITE_HIGH_WATER_MARK,
+    BodySink,
+    FrameReader,
+    MessageWriter,
+    Transport,
+    create_transport,
+)
 
 StringDict = Dict[str, Any]
 PayloadLike = Union[List[StringDict], StringDict, None]
 CONTENT_LENGTH = "Content-Length: "
 ENCODING = "utf-8"
+DEFAULT_JSON_CODEC = get_json_codec()
+
+# Number of recent stderr lines of the language server kept in memory
+DEFAULT_STDERR_BUFFER_LINES = 1000
+
+# Default of the timeout parameters, standing for the request_timeout of the handler, so that an explicit None
+# can turn the timeout off for one request
+DEFAULT_TIMEOUT: Any = object()
+
+# Methods that the specification only defines as notifications from the server to the client, so a
+# message with one of these methods never needs a response
+SERVER_NOTIFICATION_METHODS = frozenset(
+    [
+        "$/cancelRequest",
+        "$/logTrace",
+        "$/progress",
+        "telemetry/event",
+        "textDocument/publishDiagnostics",
+        "window/logMessage",
+        "window/showMessage",
+    ]
+)
+
+# Matches the "method" member of a message body when it is the first member, or follows "jsonrpc". This is a
+# best-effort fast path: many language servers serialize "method" first, but nothing guarantees it, e.g. servers
+# built on pygls/lsprotocol such as jedi-language-server can serialize "params" first. Such bodies are decoded
+# before the notification is discarded.
+METHOD_PREFIX_PATTERN = re.compile(rb'\s*\{\s*(?:"jsonrpc"\s*:\s*"[^"]*"\s*,\s*)?"method"\s*:\s*"([^"\\]*)"')
+ID_KEY_PATTERN = re.compile(rb'"id"\s*:')
+
+# Matches the start of a response body up to the opening bracket of an array result
+RESULT_ARRAY_PREFIX_PATTERN = re.compile(
+    rb'\s*\{\s*(?:"jsonrpc"\s*:\s*"[^"]*"\s*,\s*)?"id"\s*:\s*"?(\d+)"?\s*,'
+    rb'\s*(?:"jsonrpc"\s*:\s*"[^"]*"\s*,\s*)?"result"\s*:\s*\['
+)
 
 
 @dataclasses.dataclass
@@ -58,6 +107,35 @@ class ProcessLaunchInfo:
     # The working directory for the process
     cwd: str = os.getcwd()
 
+    # The transport used to communicate with the language server: "stdio", "tcp", "unix" or "replay".
+    # For "tcp" and "unix", cmd should make the server listen on the configured socket, or be empty
+    # to connect to an already running server. "replay" plays back the trace at replay_trace_path
+    # instead of launching the server.
+    transport: str = "stdio"
+
+    # The address of the language server for the "tcp" transport
+    host: str = "127.0.0.1"
+    port: int = 0
+
+    # The path of the socket of the language server for the "unix" transport
+    socket_path: str = ""
+
+    # Time in seconds to wait for the language server to accept the connection on a socket transport
+    connect_timeout: float = DEFAULT_CONNECT_TIMEOUT
+
+    # Whether shutdown sends the shutdown request and the exit notification to the language server. A server
+    # shared with other clients over a socket is left running, only the connection to it is closed.
+    shutdown_server: bool = True
+
+    # If set, every message exchanged with the language server is recorded to a trace at this path
+    record_trace_path: str = ""
+
+    # The trace played back by the "replay" transport
+    replay_trace_path: str = ""
+
+    # Speed factor of the "replay" transport relative to the recording, 0 to replay without delays
+    replay_speed: float = 1.0
+
 
 class Error(Exception):
     def __init__(self, code: ErrorCodes, message: str) -> None:
@@ -75,6 +153,17 @@ class Error(Exception):
         return f"{super().__str__()} ({self.code})"
 
 
+def peek_method(body: memoryview) -> Optional[str]:
+    """
+    Returns the method of the message with the given body if it can be read from the start of the body,
+    without parsing the whole body. Returns None otherwise, in which case the body must be parsed.
+    """
+    match = METHOD_PREFIX_PATTERN.match(body)
+    if match is None:
+        return None
+    return match.group(1).decode(ENCODING)
+
+
 def make_response(request_id: Any, params: PayloadLike) -> StringDict:
     return {"jsonrpc": "2.0", "id": request_id, "result": params}
 
@@ -95,8 +184,8 @@ class StopLoopException(Exception):
     pass
 
 
-def create_message(payload: PayloadLike):
-    body = json.dumps(payload, check_circular=False, ensure_ascii=False, separators=(",", ":")).encode(ENCODING)
+def create_message(payload: PayloadLike, codec: Optional[JsonCodec] = None):
+    body = (codec or DEFAULT_JSON_CODEC).encode(payload)
     return (
         f"Content-Length: {len(body)}\r\n".encode(ENCODING),
         "Content-Type: application/vscode-jsonrpc; charset=utf-8\r\n\r\n".encode(ENCODING),
@@ -104,39 +193,81 @@ def create_message(payload: PayloadLike):
     )
 
 
-class MessageType:
-    error = 1
-    warning = 2
-    info = 3
-    log = 4
+@dataclasses.dataclass
+class RequestStats:
+    """
+    Counters of the requests sent to the server that did not complete with a result.
+    """
+
+    # Requests abandoned by the client because their timeout expired
+    timed_out: int = 0
+
+    # Requests abandoned because the awaiting task was cancelled
+    cancelled: int = 0
 
+    # Requests answered by the server with the RequestCancelled or ServerCancelled error codes
+    server_cancelled: int = 0
+
+    # Requests answered by the server with the ContentModified error code
+    content_modified: int = 0
+
+
+class ResponseStream(BodySink):
+    """
+    Receives the result of a request sent with send_request_stream, as batches of the elements of the result
+    array put on a queue, followed by None once the result is complete, or by an Error.
+
+    A large response body is fed to the stream by the FrameReader as it is read, and its elements are
+    decoded incrementally. A response read whole is delivered with set_response.
+    """
 
-class Request:
     def __init__(self) -> None:
-        self.cv = asyncio.Condition()
-        self.result: Optional[PayloadLike] = None
-        self.error: Optional[Error] = None
+        self.queue: "asyncio.Queue[Union[List[Any], Error, None]]" = asyncio.Queue()
+        self._decoder: Optional[JsonArrayStreamDecoder] = None
+        # Number of bytes of the body before the first element of the result array
+        self._skip = 0
 
-    async def on_result(self, params: PayloadLike) -> None:
-        self.result = params
-        async with self.cv:
-            self.cv.notify()
+    def start(self, skip: int) -> None:
+        """
+        Prepares the stream to be fed a response body whose result array starts after skip bytes
+        """
+        self._decoder = JsonArrayStreamDecoder()
+        self._skip = skip
 
-    async def on_error(self, err: Error) -> None:
-        self.error = err
-        async with self.cv:
-            self.cv.notify()
+    def feed(self, data: bytes) -> None:
+        if self._skip:
+            skipped = min(self._skip, len(data))
+            data = data[skipped:]
+            self._skip -= skipped
+        items = self._decoder.feed(data)
+        if items:
+            self.queue.put_nowait(items)
 
+    def close(self) -> None:
+        if not self._decoder.done:
+            self.queue.put_nowait(Error(ErrorCodes.ParseError, "malformed result array"))
+        self.queue.put_nowait(None)
 
-def content_length(line: bytes) -> Optional[int]:
-    if line.startswith(b"Content-Length: "):
-        _, value = line.split(b"Content-Length: ")
-        value = value.strip()
-        try:
-            return int(value)
-        except ValueError:
-            raise ValueError("Invalid Content-Length header: {}".format(value))
-    return None
+    def set_response(self, response: StringDict) -> None:
+        """
+        Delivers a response that was read and decoded whole
+        """
+        if "error" in response:
+            self.queue.put_nowait(Error.from_lsp(response["error"]))
+            return
+        result = response.get("result")
+        if isinstance(result, list):
+            self.queue.put_nowait(result)
+        elif result is not None:
+            self.queue.put_nowait([result])
+        self.queue.put_nowait(None)
+
+
+class MessageType:
+    error = 1
+    warning = 2
+    info = 3
+    log = 4
 
 
 class LanguageServerHandler:
@@ -148,112 +279,182 @@ class LanguageServerHandler:
     It provides methods for sending requests, responses, and notifications to the server
     and for registering handlers for requests and notifications from the server.
 
-    Uses JSON-RPC 2.0 for communication with the server over stdin/stdout.
+    Uses JSON-RPC 2.0 for communication with the server over stdin/stdout, or over a TCP or
+    Unix domain socket as selected by ProcessLaunchInfo.transport.
 
     Attributes:
         send: A LspRequest object that can be used to send requests to the server and
             await for the responses.
         notify: A LspNotification object that can be used to send notifications to the server.
         cmd: A string that represents the command to launch the language server process.
-        process: A subprocess.Popen object that represents the language server process.
+        transport: A Transport object that provides the streams connected to the language server.
+        recorder: A TraceRecorder object recording the exchanged messages if
+            process_launch_info.record_trace_path is set.
+        process: An asyncio.subprocess.Process object that represents the language server process,
+            or None if the transport connected to an already running server.
         _received_shutdown: A boolean flag that indicates whether the client has received
             a shutdown request from the server.
         request_id: An integer that represents the next available request id for the client.
-        _response_handlers: A dictionary that maps request ids to Request objects that
-            store the results or errors of the requests.
+        _response_handlers: A dictionary that maps request ids to the asyncio.Future objects
+            that are resolved with the results or errors of the pending requests.
+        _response_streams: A dictionary that maps request ids to the ResponseStream objects receiving the
+            results of the pending requests sent with send_request_stream.
         on_request_handlers: A dictionary that maps method names to callback functions
             that handle requests from the server.
         on_notification_handlers: A dictionary that maps method names to callback functions
             that handle notifications from the server.
         logger: An optional function that takes two strings (source and destination) and
             a payload dictionary, and logs the communication between the client and the server.
-        tasks: A dictionary that maps task ids to asyncio.Task objects that represent
-            the asynchronous tasks created by the handler.
-        task_counter: An integer that represents the next available task id for the handler.
+        codec: A JsonCodec object used to encode outbound messages and decode inbound message bodies.
+        request_timeout: The default timeout in seconds for requests sent to the server, None to wait forever.
+        request_stats: A RequestStats object counting the timed out and cancelled requests.
+        writer: A MessageWriter object that coalesces the messages written to the server, and applies
+            backpressure once write_high_water_mark bytes are buffered.
+        tasks: A set of the asyncio.Task objects created by the handler that have not finished yet.
+            Tasks remove themselves from the set on completion.
+        discarded_methods: A set of the methods of the notifications that are dropped without being decoded.
+        discarded_notifications: A Counter of the notifications dropped without being decoded, by method.
+        notification_watchers: The callbacks observing the notifications of a method, with the pattern the
+            bodies of the discarded notifications must match to be decoded for them, see watch_notification.
+        stderr_lines: A ring buffer of the most recent lines written by the server to stderr, as bytes.
+        forward_stderr: Whether every stderr line is also passed to the logger.
         loop: An asyncio.AbstractEventLoop object that represents the event loop used by the handler.
     """
 
-    def __init__(self, process_launch_info: ProcessLaunchInfo, logger=None) -> None:
+    def __init__(
+        self,
+        process_launch_info: ProcessLaunchInfo,
+        logger=None,
+        codec: Optional[JsonCodec] = None,
+        request_timeout: Optional[float] = None,
+        write_high_water_mark: int = DEFAULT_WRITE_HIGH_WATER_MARK,
+        stderr_buffer_lines: int = DEFAULT_STDERR_BUFFER_LINES,
+        forward_stderr: bool = False,
+    ) -> None:
         """
         Params:
             cmd: A string that represents the command to launch the language server process.
             logger: An optional function that takes two strings (source and destination) and
                 a payload dictionary, and logs the communication between the client and the server.
+            codec: An optional JsonCodec to use for (de)serializing messages. Defaults to the fastest
+                installed codec (orjson, msgspec, or the standard library json module).
+            request_timeout: An optional default timeout in seconds for requests sent to the server.
+            write_high_water_mark: The number of buffered outbound bytes above which requests and responses
+                wait for the buffer to drain before completing.
+            stderr_buffer_lines: The number of recent stderr lines of the server kept in memory.
+            forward_stderr: Whether to pass every stderr line of the server to the logger. stderr lines are
+                only decoded when they are forwarded or retrieved with get_stderr_tail.
         """
         self.send = LspRequest(self.send_request)
         self.notify = LspNotification(self.send_notification)
 
         self.process_launch_info = process_launch_info
+        self.transport: Optional[Transport] = None
+        self.recorder: Optional[TraceRecorder] = None
         self.process = None
         self._received_shutdown = False
 
         self.request_id = 1
-        self._response_handlers: Dict[Any, Request] = {}
+        self._response_handlers: Dict[Any, asyncio.Future] = {}
+        self._response_streams: Dict[Any, ResponseStream] = {}
         self.on_request_handlers = {}
         self.on_notification_handlers = {}
+        self.discarded_methods: Set[str] = set()
+        self.discarded_notifications: Counter = Counter()
+        self.notification_watchers: Dict[str, Tuple[Optional[Pattern[bytes]], Callable[[Any], None]]] = {}
         self.logger = logger
-        self.tasks = {}
-        self.task_counter = 0
+        self.codec = codec or DEFAULT_JSON_CODEC
+        self.request_timeout = request_timeout
+        self.request_stats = RequestStats()
+        self.write_high_water_mark = write_high_water_mark
+        self.writer: Optional[MessageWriter] = None
+        self.tasks: Set[asyncio.Task] = set()
+        self.stderr_lines: Deque[bytes] = deque(maxlen=stderr_buffer_lines)
+        self.forward_stderr = forward_stderr
         self.loop = None
 
     async def start(self) -> None:
         """
-        Starts the language server process and creates a task to continuously read from its stdout to handle communications
-        from the server to the client
-        """
-        child_proc_env = os.environ.copy()
-        child_proc_env.update(self.process_launch_info.env)
-        self.process = await asyncio.create_subprocess_shell(
-            self.process_launch_info.cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stdin=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-            env=child_proc_env,
-            cwd=self.process_launch_info.cwd,
-        )
+        Starts the language server process and/or connects to it, and creates a task to continuously read from
+        the transport to handle communications from the server to the client
+        """
+        transport = create_transport(self.process_launch_info)
+        await transport.open()
+        self.transport = transport
+        self.process = transport.process
+        if self.process_launch_info.record_trace_path:
+            self.recorder = TraceRecorder(self.process_launch_info.record_trace_path)
 
         self.loop = asyncio.get_event_loop()
-        self.tasks[self.task_counter] = self.loop.create_task(self.run_forever())
-        self.task_counter += 1
-        self.tasks[self.task_counter] = self.loop.create_task(self.run_forever_stderr())
-        self.task_counter += 1
+        self.writer = MessageWriter(transport.writer, self.loop, self.write_high_water_mark)
+        self._create_task(self.run_forever())
+        self._create_task(self.run_forever_stderr())
 
     async def stop(self) -> None:
         """
         Sends the terminate signal to the language server process and waits for it to exit, with a timeout, killing it if necessary
         """
-        for task in self.tasks.values():
+        for task in list(self.tasks):
             task.cancel()
 
-        self.tasks = {}
+        self.tasks = set()
 
-        process = self.process
+        if self.writer:
+            self.writer.flush()
+
+        transport = self.transport
+        self.transport = None
         self.process = None
 
-        if process:
-            # TODO: Ideally, we should terminate the process here,
-            # However, there's an issue with asyncio terminating processes documented at
-            # https://bugs.python.org/issue35539 and https://bugs.python.org/issue41320
-            # process.terminate()
-            wait_for_end = process.wait()
-            try:
-                await asyncio.wait_for(wait_for_end, timeout=60)
-            except asyncio.TimeoutError:
-                process.kill()
+        if transport:
+            await transport.close()
+
+        if self.recorder:
+            self.recorder.close()
+            self.recorder = None
 
     async def shutdown(self) -> None:
         """
-        Perform the shutdown sequence for the client, including sending the shutdown request to the server and notifying it of exit
+        Perform the shutdown sequence for the client, including sending the shutdown request to the server and notifying it of exit,
+        unless the launch info says to leave the server running
         """
-        await self.send.shutdown()
-        self._received_shutdown = True
-        self.notify.exit()
-        if self.process and self.process.stdout:
-            self.process.stdout.set_exception(StopLoopException())
+        if self.process_launch_info.shutdown_server:
+            await self.send.shutdown()
+            self._received_shutdown = True
+            self.notify.exit()
+        else:
+            # The server stays running, the connection closing is expected
+            self._received_shutdown = True
+        if self.transport and self.transport.reader:
+            self.transport.reader.set_exception(StopLoopException())
             # This yields the control to the event loop to allow the exception to be handled
             # in the run_forever and run_forever_stderr methods
             await asyncio.sleep(0)
 
+    def get_in_flight_task_count(self) -> int:
+        """
+        Returns the number of tasks created by the handler that are still running
+        """
+        return len(self.tasks)
+
+    def get_stderr_tail(self, num_lines: Optional[int] = None) -> List[str]:
+        """
+        Returns the most recent lines written by the language server to stderr, at most num_lines if given
+        """
+        lines = list(self.stderr_lines)
+        if num_lines is not None:
+            lines = lines[-num_lines:] if num_lines > 0 else []
+        return [line.decode(ENCODING, errors="replace").rstrip("\r") for line in lines]
+
+    def _create_task(self, coro: Coroutine) -> asyncio.Task:
+        """
+        Create a task for the given coroutine and track it until it finishes
+        """
+        task = asyncio.get_event_loop().create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
     def _log(self, message: str) -> None:
         """
         Create a log message
@@ -263,77 +464,110 @@ class LanguageServerHandler:
 
     async def run_forever(self) -> bool:
         """
-        Continuously read from the language server process stdout and handle the messages
+        Continuously read from the transport connected to the language server and handle the messages
         invoking the registered response and notification handlers
         """
         try:
-            while self.process and self.process.stdout and not self.process.stdout.at_eof():
-                line = await self.process.stdout.readline()
-                if not line:
-                    continue
-                try:
-                    num_bytes = content_length(line)
-                except ValueError:
-                    continue
-                if num_bytes is None:
-                    continue
-                while line and line.strip():
-                    line = await self.process.stdout.readline()
-                if not line:
-                    continue
-                body = await self.process.stdout.readexactly(num_bytes)
-
-                self.tasks[self.task_counter] = asyncio.get_event_loop().create_task(self._handle_body(body))
-                self.task_counter += 1
+            stream = self.transport.reader
+            reader = FrameReader(stream, sink_factory=self._open_response_stream)
+            while self.transport and not stream.at_eof():
+                for body in await reader.read_frames():
+                    if self.recorder:
+                        self.recorder.record(SERVER_TO_CLIENT, body)
+                    self._handle_body(body)
         except (BrokenPipeError, ConnectionResetError, StopLoopException):
             pass
+        if not self._received_shutdown and self.transport is not None:
+            stderr_tail = "\n".join(self.get_stderr_tail())
+            self._log(f"Language server closed the connection unexpectedly. Recent stderr:\n{stderr_tail}")
         return self._received_shutdown
 
     async def run_forever_stderr(self) -> None:
         """
-        Continuously read from the language server process stderr and log the messages
+        Continuously read from the language server process stderr into the stderr_lines ring buffer,
+        and log the lines if forward_stderr is set
         """
+        partial_line = b""
         try:
-            while self.process and self.process.stderr and not self.process.stderr.at_eof():
-                line = await self.process.stderr.readline()
-                if not line:
+            stderr = self.transport.stderr
+            while self.transport and stderr and not stderr.at_eof():
+                data = await stderr.read(DEFAULT_CHUNK_SIZE)
+                if not data:
                     continue
-                self._log("LSP stderr: " + line.decode(ENCODING))
+                lines = (partial_line + data).split(b"\n")
+                partial_line = lines.pop()
+                self.stderr_lines.extend(lines)
+                if self.forward_stderr:
+                    for line in lines:
+                        self._log("LSP stderr: " + line.decode(ENCODING, errors="replace"))
         except (BrokenPipeError, ConnectionResetError, StopLoopException):
             pass
+        if partial_line:
+            self.stderr_lines.append(partial_line)
 
-    async def _handle_body(self, body: bytes) -> None:
+    def _handle_body(self, body: memoryview) -> None:
         """
-        Parse the body text received from the language server process and invoke the appropriate handler
+        Parse the body text received from the language server process and invoke the appropriate handler.
+
+        Responses resolve the pending request directly from the read loop, while requests and notifications
+        from the server are dispatched to their handlers in a new task. Notifications that would not be handled
+        are dropped before decoding the body, see _should_discard.
         """
+        method = peek_method(body)
+        discarded = method is not None and self._should_discard(method, body)
+        if discarded:
+            pattern = self.notification_watchers.get(method, (None, None))[0]
+            if pattern is None or pattern.search(body) is None:
+                self.discarded_notifications[method] += 1
+                return
+
         try:
-            await self._receive_payload(json.loads(body))
+            payload = self.codec.decode(body)
         except IOError as ex:
             self._log(f"malformed {ENCODING}: {ex}")
+            return
         except UnicodeDecodeError as ex:
             self._log(f"malformed {ENCODING}: {ex}")
-        except json.JSONDecodeError as ex:
+            return
+        except self.codec.decode_errors as ex:
             self._log(f"malformed JSON: {ex}")
+            return
 
-    async def _receive_payload(self, payload: StringDict) -> None:
-        """
-        Determine if the payload received from server is for a request, response, or notification and invoke the appropriate handler
-        """
-        if self.logger:
-            self.logger("server", "client", payload)
+        # An error in the handling of one message must not stop the read loop, which all the pending requests
+        # wait on
         try:
+            if self.logger:
+                self.logger("server", "client", payload)
             if "method" in payload:
-                if "id" in payload:
-                    await self._request_handler(payload)
-                else:
-                    await self._notification_handler(payload)
+                if method is None and "id" not in payload and self._should_discard_decoded(payload["method"]):
+                    # The method could not be read before decoding, e.g. "params" was serialized first
+                    discarded = True
+                    if payload["method"] not in self.notification_watchers:
+                        self.discarded_notifications[payload["method"]] += 1
+                if not discarded:
+                    self._create_task(self._receive_payload(payload))
+                watcher = self.notification_watchers.get(payload["method"])
+                if watcher is not None and "id" not in payload:
+                    watcher[1](payload.get("params"))
             elif "id" in payload:
-                await self._response_handler(payload)
+                self._response_handler(payload)
             else:
                 self._log(f"Unknown payload type: {payload}")
         except Exception as err:
             self._log(f"Error handling server payload: {err}")
 
+    async def _receive_payload(self, payload: StringDict) -> None:
+        """
+        Determine if the payload received from server is for a request or notification and invoke the appropriate handler
+        """
+        try:
+            if "id" in payload:
+                await self._request_handler(payload)
+            else:
+                await self._notification_handler(payload)
+        except Exception as err:
+            self._log(f"Error handling server payload: {err}")
+
     def send_notification(self, method: str, params: Optional[dict] = None) -> None:
         """
         Send notification pertaining to the given method to the server with the given parameters
@@ -344,57 +578,171 @@ class LanguageServerHandler:
         """
         Send response to the given request id to the server with the given parameters
         """
-        self.tasks[self.task_counter] = asyncio.get_event_loop().create_task(
-            self._send_payload(make_response(request_id, params))
-        )
-        self.task_counter += 1
+        self._create_task(self._send_payload(make_response(request_id, params)))
 
     def send_error_response(self, request_id: Any, err: Error) -> None:
         """
         Send error response to the given request id to the server with the given error
         """
-        self.tasks[self.task_counter] = asyncio.get_event_loop().create_task(
-            self._send_payload(make_error_response(request_id, err))
-        )
-        self.task_counter += 1
+        self._create_task(self._send_payload(make_error_response(request_id, err)))
 
-    async def send_request(self, method: str, params: Optional[dict] = None) -> None:
+    async def send_request(
+        self, method: str, params: Optional[dict] = None, timeout: Optional[float] = DEFAULT_TIMEOUT
+    ) -> None:
         """
-        Send request to the server, register the request id, and wait for the response
+        Send request to the server, register the request id, and wait for the response.
+
+        If the response does not arrive within the timeout (defaulting to request_timeout, None to wait forever),
+        asyncio.TimeoutError is raised. If the timeout expires or the awaiting task is cancelled, $/cancelRequest
+        is sent to the server so that it can drop the work.
         """
-        request = Request()
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.request_timeout
+        future = asyncio.get_running_loop().create_future()
         request_id = self.request_id
         self.request_id += 1
-        self._response_handlers[request_id] = request
-        async with request.cv:
+        # The future is registered before the request is written, so that a response can never arrive unobserved
+        self._response_handlers[request_id] = future
+        try:
             await self._send_payload(make_request(method, request_id, params))
-            await request.cv.wait()
-        if isinstance(request.error, Error):
-            raise request.error
-        return request.result
+            if timeout is None:
+                return await future
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self.request_stats.timed_out += 1
+            self._cancel_request(request_id)
+            raise
+        except asyncio.CancelledError:
+            self.request_stats.cancelled += 1
+            self._cancel_request(request_id)
+            raise
+        except Error as err:
+            self._count_error(err)
+            raise
+        finally:
+            self._response_handlers.pop(request_id, None)
+
+    async def send_request_stream(
+        self, method: str, params: Optional[dict] = None, timeout: Optional[float] = DEFAULT_TIMEOUT
+    ) -> AsyncIterator[Any]:
+        """
+        Send request to the server and yield the elements of the result array as they are decoded.
+
+        Large responses are decoded incrementally while they are read, so that the whole body is never held in
+        memory and the first elements are yielded before the body is complete. A null result yields nothing,
+        and a result that is not an array is yielded as a single element.
+
+        The timeout (defaulting to request_timeout, None to wait forever) applies to the whole response. If it
+        expires, or the iterator is closed with aclose() before the end, $/cancelRequest is sent to the server.
+        """
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.request_timeout
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        stream = ResponseStream()
+        request_id = self.request_id
+        self.request_id += 1
+        self._response_streams[request_id] = stream
+        completed = False
+        try:
+            await self._send_payload(make_request(method, request_id, params))
+            while True:
+                if deadline is None:
+                    batch = await stream.queue.get()
+                else:
+                    batch = await asyncio.wait_for(stream.queue.get(), max(deadline - loop.time(), 0))
+                if batch is None:
+                    completed = True
+                    return
+                if isinstance(batch, Error):
+                    completed = True
+                    self._count_error(batch)
+                    raise batch
+                for item in batch:
+                    yield item
+        except asyncio.TimeoutError:
+            self.request_stats.timed_out += 1
+            raise
+        except asyncio.CancelledError:
+            self.request_stats.cancelled += 1
+            raise
+        finally:
+            if not completed:
+                self._cancel_request(request_id)
+            self._response_streams.pop(request_id, None)
+
+    def _count_error(self, err: Error) -> None:
+        """
+        Update request_stats for the given error received in response to a request
+        """
+        if err.code in (LSPErrorCodes.RequestCancelled, LSPErrorCodes.ServerCancelled):
+            self.request_stats.server_cancelled += 1
+        elif err.code == LSPErrorCodes.ContentModified:
+            self.request_stats.content_modified += 1
+
+    def _open_response_stream(self, prefix: bytes) -> Optional[ResponseStream]:
+        """
+        Returns the ResponseStream to feed the body starting with the given prefix to, if the body is the
+        response with an array result to a request sent with send_request_stream
+        """
+        if not self._response_streams or self.recorder:
+            return None
+        match = RESULT_ARRAY_PREFIX_PATTERN.match(prefix)
+        if match is None:
+            return None
+        stream = self._response_streams.get(int(match.group(1)))
+        if stream is None:
+            return None
+        if self.logger:
+            self.logger("server", "client", {"id": int(match.group(1)), "result": "<streamed>"})
+        stream.start(match.end())
+        return stream
+
+    def send_with_timeout(self, timeout: Optional[float]) -> LspRequest:
+        """
+        Returns a LspRequest object that sends requests with the given timeout instead of request_timeout, or
+        with request_timeout if the timeout is DEFAULT_TIMEOUT
+        """
+        if timeout is DEFAULT_TIMEOUT:
+            return self.send
+        return LspRequest(functools.partial(self.send_request, timeout=timeout))
+
+    def _cancel_request(self, request_id: Any) -> None:
+        """
+        Notify the server that the client is no longer interested in the response to the given request
+        """
+        if request_id in self._response_handlers or request_id in self._response_streams:
+            self.notify.cancel_request({"id": request_id})
 
     def _send_payload_sync(self, payload: StringDict) -> None:
         """
-        Send the payload to the server by writing to its stdin synchronously
+        Send the payload to the server by queueing it on the writer synchronously. The queued messages
+        are written to the server at the end of the current event loop tick. Once they reach the
+        high-water mark, the next request or response sent waits for the outbound buffer to drain.
         """
-        if not self.process or not self.process.stdin:
+        if not self.transport or not self.writer:
             return
-        msg = create_message(payload)
+        msg = create_message(payload, self.codec)
         if self.logger:
             self.logger("client", "server", payload)
-        self.process.stdin.writelines(msg)
+        if self.recorder:
+            self.recorder.record(CLIENT_TO_SERVER, msg[-1])
+        self.writer.write(msg)
 
     async def _send_payload(self, payload: StringDict) -> None:
         """
-        Send the payload to the server by writing to its stdin asynchronously.
+        Send the payload to the server by queueing it on the writer, waiting for the outbound buffer
+        to drain if it is above the high-water mark.
         """
-        if not self.process or not self.process.stdin:
+        if not self.transport or not self.writer:
             return
-        msg = create_message(payload)
+        msg = create_message(payload, self.codec)
         if self.logger:
             self.logger("client", "server", payload)
-        self.process.stdin.writelines(msg)
-        await self.process.stdin.drain()
+        if self.recorder:
+            self.recorder.record(CLIENT_TO_SERVER, msg[-1])
+        self.writer.write(msg)
+        await self.writer.drain()
 
     def on_request(self, method: str, cb) -> None:
         """
@@ -407,18 +755,73 @@ class LanguageServerHandler:
         Register the callback function to handle notifications from the server to the client for the given method
         """
         self.on_notification_handlers[method] = cb
+        self.discarded_methods.discard(method)
+
+    def discard_notification(self, method: str) -> None:
+        """
+        Register the notifications from the server to the client for the given method as not handled, so that
+        they are dropped without being decoded
+        """
+        self.on_notification_handlers.pop(method, None)
+        self.discarded_methods.add(method)
 
-    async def _response_handler(self, response: StringDict) -> None:
+    def watch_notification(
+        self, method: str, cb: Callable[[Any], None], pattern: Optional[Pattern[bytes]] = None
+    ) -> None:
+        """
+        Register a function called synchronously with the params of every notification from the server for the
+        given method, in addition to its handler, without changing whether the notifications are discarded. If
+        they are, only the bodies matching the given pattern are decoded for the function, so that the others are
+        still dropped without being decoded.
+        """
+        self.notification_watchers[method] = (pattern, cb)
+
+    def _should_discard(self, method: str, body: memoryview) -> bool:
+        """
+        Returns whether the message with the given method and body is a notification that would not be handled,
+        either because its method is registered with discard_notification or because it has no handler
+        """
+        if method not in self.discarded_methods and (
+            method in self.on_notification_handlers or method in self.on_request_handlers
+        ):
+            return False
+        # A request, even one without a handler, must be answered. Unless the method is only ever used
+        # for notifications, make sure the message has no id, at the cost of a scan of the body.
+        return method in SERVER_NOTIFICATION_METHODS or ID_KEY_PATTERN.search(body) is None
+
+    def _should_discard_decoded(self, method: str) -> bool:
+        """
+        Returns whether a decoded notification with the given method would not be handled, see _should_discard
+        """
+        return method in self.discarded_methods or (
+            method not in self.on_notification_handlers and method not in self.on_request_handlers
+        )
+
+    def _response_handler(self, response: StringDict) -> None:
         """
         Handle the response received from the server for a request, using the id to determine the request
         """
-        request = self._response_handlers.pop(response["id"])
+        stream = self._response_streams.get(response["id"])
+        if stream is not None:
+            stream.set_response(response)
+            return
+        future = self._response_handlers.pop(response["id"], None)
+        if future is None:
+            self._log(f"Received response for unknown request id: {response['id']}")
+            return
+        if future.done():
+            # The caller is no longer waiting for the result
+            return
         if "result" in response and "error" not in response:
-            await request.on_result(response["result"])
+            future.set_result(response["result"])
         elif "result" not in response and "error" in response:
-            await request.on_error(Error.from_lsp(response["error"]))
+            try:
+                error = Error.from_lsp(response["error"])
+            except (KeyError, TypeError):
+                error = Error(ErrorCodes.InvalidRequest, f"malformed error response: {response['error']}")
+            future.set_exception(error)
         else:
-            await request.on_error(Error(ErrorCodes.InvalidRequest, ""))
+            future.set_exception(Error(ErrorCodes.InvalidRequest, ""))
 
     async def _request_handler(self, response: StringDict) -> None:
         """
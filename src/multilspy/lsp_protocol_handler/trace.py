@@ -0,0 +1,164 @@
+"""
+This file provides recording of the messages exchanged with a language server to a compact on-disk
+trace, and a transport that replays such a trace as a stand-in for the language server.
+
+Replaying a trace exercises the whole client stack (from LanguageServer.request_* down to the JSON-RPC
+handler) deterministically and offline, which makes it suitable both for performance benchmarks and for
+reproducing latency problems observed in production.
+
+Trace format: the TRACE_MAGIC bytes, followed by one record per message. Each record is a header packed
+as RECORD_HEADER (direction, seconds since the start of the recording, body length) followed by the JSON
+body of the message.
+"""
+
+import asyncio
+import dataclasses
+import struct
+import time
+from typing import TYPE_CHECKING, BinaryIO, Iterator, List, Sequence
+
+from .transport import FrameReader, Transport
+
+if TYPE_CHECKING:
+    from .server import ProcessLaunchInfo
+
+TRACE_MAGIC = b"MLSPTRC1"
+RECORD_HEADER = struct.Struct("<BdI")
+
+# Directions of the recorded messages
+CLIENT_TO_SERVER = 0
+SERVER_TO_CLIENT = 1
+
+# Shortest delay in seconds reproduced by the replay
+REPLAY_MIN_DELAY = 0.001
+
+
+@dataclasses.dataclass
+class TraceRecord:
+    """
+    A message recorded in a trace.
+    """
+
+    # CLIENT_TO_SERVER or SERVER_TO_CLIENT
+    direction: int
+
+    # Seconds elapsed since the start of the recording when the message was sent or received
+    timestamp: float
+
+    # The JSON body of the message, without the Content-Length framing
+    body: bytes
+
+
+class TraceRecorder:
+    """
+    Writes the messages exchanged with the language server to a trace file.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._file: BinaryIO = open(path, "wb", buffering=1024 * 1024)
+        self._file.write(TRACE_MAGIC)
+        self._start = time.monotonic()
+
+    def record(self, direction: int, body: bytes) -> None:
+        """
+        Appends a message sent in the given direction to the trace
+        """
+        self._file.write(RECORD_HEADER.pack(direction, time.monotonic() - self._start, len(body)))
+        self._file.write(body)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def read_trace(path: str) -> Iterator[TraceRecord]:
+    """
+    Yields the records of the trace file at the given path
+    """
+    with open(path, "rb") as f:
+        if f.read(len(TRACE_MAGIC)) != TRACE_MAGIC:
+            raise ValueError(f"Not a multilspy trace file: {path}")
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            direction, timestamp, length = RECORD_HEADER.unpack(header)
+            yield TraceRecord(direction, timestamp, f.read(length))
+
+
+class ReplayStreamWriter:
+    """
+    Receives the bytes written by the client during a replay, in place of the server's stdin or socket.
+    The framed messages are parsed and queued for the replay to consume.
+    """
+
+    transport = None
+
+    def __init__(self) -> None:
+        self.frames: "asyncio.Queue[memoryview]" = asyncio.Queue()
+        self._frame_reader = FrameReader(None)
+        self._closing = False
+
+    def writelines(self, data: Sequence[bytes]) -> None:
+        for frame in self._frame_reader.feed(b"".join(data)):
+            self.frames.put_nowait(frame)
+
+    def is_closing(self) -> bool:
+        return self._closing
+
+    def close(self) -> None:
+        self._closing = True
+
+    async def drain(self) -> None:
+        return
+
+
+class ReplayTransport(Transport):
+    """
+    Replays a recorded trace as a stand-in for the language server.
+
+    The records are played back in order: for every recorded client message the replay waits until the
+    client sends its next message, and every recorded server message is delivered to the client after
+    the delay observed in the recording, divided by launch_info.replay_speed. A replay_speed of 0 delivers
+    the server messages as soon as the client messages preceding them have been sent.
+
+    The client is expected to send the same sequence of messages as during the recording, which holds
+    for a deterministic client driven by the same calls.
+    """
+
+    def __init__(self, launch_info: "ProcessLaunchInfo") -> None:
+        super().__init__(launch_info)
+        self.records: List[TraceRecord] = list(read_trace(launch_info.replay_trace_path))
+        self._replay_task = None
+
+    async def open(self) -> None:
+        self.reader = asyncio.StreamReader()
+        self.writer = ReplayStreamWriter()
+        self._replay_task = asyncio.get_running_loop().create_task(self._replay())
+
+    async def close(self) -> None:
+        if self._replay_task is not None:
+            self._replay_task.cancel()
+            self._replay_task = None
+        self.writer.close()
+
+    async def _replay(self) -> None:
+        loop = asyncio.get_running_loop()
+        speed = self.launch_info.replay_speed
+        # Loop time corresponding to the start of the recording, re-anchored on every client message so
+        # that server messages are delayed relative to the client message they answer
+        origin = loop.time()
+        for record in self.records:
+            if record.direction == CLIENT_TO_SERVER:
+                await self.writer.frames.get()
+                if speed > 0:
+                    origin = loop.time() - record.timestamp / speed
+            else:
+                if speed > 0:
+                    delay = origin + record.timestamp / speed - loop.time()
+                    # Selectors wait with millisecond granularity, shorter delays are not reproduced
+                    if delay >= REPLAY_MIN_DELAY:
+                        await asyncio.sleep(delay)
+                self.reader.feed_data(b"Content-Length: %d\r\n\r\n" % len(record.body) + record.body)
+        # The recording ends with the client's exit notification, after which the server closes the stream
+        self.reader.feed_eof()
@@ -0,0 +1,488 @@
+"""
+This file provides the transport level primitives used by the JSON-RPC client to exchange
+Content-Length framed messages with the language server, and the transports that connect the
+client to the server over stdio, TCP or Unix domain sockets.
+"""
+
+import asyncio
+import dataclasses
+import os
+from typing import TYPE_CHECKING, Callable, List, Optional, Sequence
+
+if TYPE_CHECKING:
+    from .server import ProcessLaunchInfo
+
+# Number of bytes requested from the stream on every read. Large reads let a single await
+# pick up many small messages (e.g. a burst of publishDiagnostics notifications) at once.
+DEFAULT_CHUNK_SIZE = 256 * 1024
+
+# Minimum body size of the frames that FrameReader offers to its body sink factory
+DEFAULT_STREAM_MIN_SIZE = 256 * 1024
+
+# Number of bytes at the start of a body passed to the body sink factory
+STREAM_PREFIX_SIZE = 256
+
+# Number of outbound bytes buffered (queued plus not yet accepted by the OS) above which senders that
+# can wait are paused until the buffer drains
+DEFAULT_WRITE_HIGH_WATER_MARK = 1024 * 1024
+
+# Time in seconds to wait for the language server to accept connections on a socket transport
+DEFAULT_CONNECT_TIMEOUT = 30.0
+
+# Time in seconds to wait for the language server process to exit before killing it
+PROCESS_EXIT_TIMEOUT = 60
+
+HEADER_TERMINATOR = b"\r\n\r\n"
+CONTENT_LENGTH_HEADER = b"content-length:"
+
+
+def parse_content_length(header_block: bytes) -> Optional[int]:
+    """
+    Returns the value of the Content-Length header in the given header block, or None if the block
+    does not contain a valid Content-Length header. Lines of the block that are not headers, such as
+    stray log lines written to stdout by the server before the header, are skipped, and the last valid
+    Content-Length header wins.
+    """
+    content_length = None
+    for line in header_block.split(b"\n"):
+        line = line.strip()
+        if line[: len(CONTENT_LENGTH_HEADER)].lower() == CONTENT_LENGTH_HEADER:
+            try:
+                content_length = int(line[len(CONTENT_LENGTH_HEADER) :].strip())
+            except ValueError:
+                continue
+    return content_length
+
+
+class BodySink:
+    """
+    Receives the body of a frame incrementally, instead of the body being buffered and returned whole.
+    """
+
+    def feed(self, data: bytes) -> None:
+        """
+        Called with every chunk of the body, in order
+        """
+        raise NotImplementedError()
+
+    def close(self) -> None:
+        """
+        Called once the whole body has been fed
+        """
+        raise NotImplementedError()
+
+
+class FrameReader:
+    """
+    Reads Content-Length framed messages from an asyncio.StreamReader.
+
+    Instead of awaiting a readline() for every header line and a readexactly() for every body,
+    the reader pulls large chunks from the stream into one growable buffer and parses every complete
+    frame present in it. Message bodies are returned as memoryview slices over a single immutable
+    bytes object per batch, so no per-message copy of the body is made.
+
+    Lines that are not headers (e.g. stray log lines written to stdout by the server) are skipped,
+    whether they precede a header in the same block or form a block of their own, as the line based
+    reader did.
+
+    If a sink_factory is given, it is offered every body of at least stream_min_size bytes that is not
+    complete yet, by calling it with the first STREAM_PREFIX_SIZE bytes of the body. If it returns a
+    BodySink, the body is fed to the sink as it is read instead of being buffered, and the frame is not
+    returned by feed.
+    """
+
+    def __init__(
+        self,
+        stream: asyncio.StreamReader,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        sink_factory: Optional[Callable[[bytes], Optional[BodySink]]] = None,
+        stream_min_size: int = DEFAULT_STREAM_MIN_SIZE,
+    ) -> None:
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.sink_factory = sink_factory
+        self.stream_min_size = stream_min_size
+        self._buffer = bytearray()
+        # Length of the body whose header has already been consumed from the buffer
+        self._body_length: Optional[int] = None
+        # Whether the sink factory declined the body whose header has already been consumed
+        self._sink_declined = False
+        # The sink the body being read is fed to, and the number of bytes of the body not fed yet
+        self._sink: Optional[BodySink] = None
+        self._sink_remaining = 0
+
+    async def read_frames(self) -> List[memoryview]:
+        """
+        Waits until at least one complete frame is available and returns the bodies of all the
+        complete frames read so far. Returns an empty list once the stream reaches EOF.
+        """
+        while True:
+            data = await self.stream.read(self.chunk_size)
+            if not data:
+                return []
+            frames = self.feed(data)
+            if frames:
+                return frames
+
+    def feed(self, data: bytes) -> List[memoryview]:
+        """
+        Appends the given bytes to the internal buffer and returns the bodies of all the frames
+        that are complete after doing so.
+        """
+        if self._sink is not None:
+            data = self._feed_sink(data)
+            if not data:
+                return []
+
+        if self._buffer:
+            self._buffer += data
+            buf = self._buffer
+        else:
+            # Fast path: nothing is pending, so parse the freshly read chunk in place without copying it
+            buf = data
+
+        spans = []
+        pos = 0
+        buf_len = len(buf)
+        while True:
+            if self._body_length is None:
+                end = buf.find(HEADER_TERMINATOR, pos)
+                if end == -1:
+                    break
+                length = parse_content_length(bytes(buf[pos:end]))
+                pos = end + len(HEADER_TERMINATOR)
+                if length is None:
+                    continue
+                self._body_length = length
+                self._sink_declined = False
+            if buf_len - pos < self._body_length:
+                if self._offer_to_sink(buf, pos):
+                    pos = buf_len
+                break
+            spans.append((pos, pos + self._body_length))
+            pos += self._body_length
+            self._body_length = None
+
+        if buf is data:
+            if pos < buf_len:
+                self._buffer += memoryview(data)[pos:]
+            consumed = data
+        elif spans:
+            consumed = bytes(memoryview(buf)[:pos])
+            del buf[:pos]
+        else:
+            if pos:
+                del buf[:pos]
+            return []
+
+        view = memoryview(consumed)
+        return [view[start:end] for start, end in spans]
+
+    def _offer_to_sink(self, buf, pos: int) -> bool:
+        """
+        Offers the incomplete body starting at pos in buf to the sink factory. If a sink accepts it, feeds
+        it the available part of the body and returns True.
+        """
+        if self.sink_factory is None or self._sink_declined or self._body_length < self.stream_min_size:
+            return False
+        if len(buf) - pos < STREAM_PREFIX_SIZE:
+            return False
+        sink = self.sink_factory(bytes(buf[pos : pos + STREAM_PREFIX_SIZE]))
+        if sink is None:
+            self._sink_declined = True
+            return False
+        sink.feed(bytes(buf[pos:]))
+        self._sink = sink
+        self._sink_remaining = self._body_length - (len(buf) - pos)
+        self._body_length = None
+        return True
+
+    def _feed_sink(self, data: bytes) -> bytes:
+        """
+        Feeds the sink the part of data that belongs to the body being streamed, and returns the rest
+        """
+        length = min(len(data), self._sink_remaining)
+        self._sink.feed(data[:length])
+        self._sink_remaining -= length
+        if self._sink_remaining:
+            return b""
+        sink = self._sink
+        self._sink = None
+        sink.close()
+        return data[length:]
+
+
+@dataclasses.dataclass
+class WriterStats:
+    """
+    Counters describing the outbound traffic of a MessageWriter.
+    """
+
+    # Number of messages accepted by the writer
+    messages_queued: int = 0
+
+    # Number of messages handed over to the stream
+    messages_written: int = 0
+
+    # Number of bytes handed over to the stream
+    bytes_written: int = 0
+
+    # Number of writelines() calls made on the stream, i.e. the number of coalesced writes
+    write_calls: int = 0
+
+    # Number of times a sender had to wait for the buffered bytes to drain below the high-water mark
+    backpressure_waits: int = 0
+
+
+class MessageWriter:
+    """
+    Writes framed messages to an asyncio.StreamWriter, coalescing all the messages queued during one
+    event loop tick into a single writelines() call.
+
+    Messages are queued synchronously with write(), so notifications can be sent from synchronous code.
+    Senders that can wait call drain() after queueing their message: once the bytes buffered in the
+    writer and in the transport reach the high-water mark, drain() flushes the queue and waits until
+    the transport has written enough of it to the server. Messages queued without drain(), such as
+    notifications, that reach the high-water mark make the next drain() wait as well, even if the
+    queue was flushed in between.
+
+    write() may also be called from a thread other than the one running the event loop, in which case
+    the message is handed over to the loop thread, preserving the order of the messages.
+    """
+
+    def __init__(
+        self,
+        stream: asyncio.StreamWriter,
+        loop: asyncio.AbstractEventLoop,
+        high_water_mark: int = DEFAULT_WRITE_HIGH_WATER_MARK,
+    ) -> None:
+        self.stream = stream
+        self.loop = loop
+        self.high_water_mark = high_water_mark
+        self.stats = WriterStats()
+        self._pending: List[bytes] = []
+        self._pending_messages = 0
+        self._pending_bytes = 0
+        self._flush_scheduled = False
+        # Whether the queue reached the high-water mark since the last drain()
+        self._drain_needed = False
+        if stream.transport is not None:
+            stream.transport.set_write_buffer_limits(high=high_water_mark)
+
+    def write(self, message: Sequence[bytes]) -> None:
+        """
+        Queues the parts of a framed message (as returned by create_message) to be written at the end
+        of the current event loop tick
+        """
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is not self.loop:
+            self.loop.call_soon_threadsafe(self.write, message)
+            return
+
+        self._pending.extend(message)
+        self._pending_messages += 1
+        self._pending_bytes += sum(len(part) for part in message)
+        self.stats.messages_queued += 1
+        if self._pending_bytes >= self.high_water_mark:
+            self._drain_needed = True
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            self.loop.call_soon(self.flush)
+
+    def flush(self) -> None:
+        """
+        Writes all the queued messages to the stream with a single writelines() call. The messages are
+        dropped without being counted as written if the stream is closing.
+        """
+        self._flush_scheduled = False
+        if not self._pending:
+            return
+        pending, messages, size = self._pending, self._pending_messages, self._pending_bytes
+        self._pending = []
+        self._pending_messages = 0
+        self._pending_bytes = 0
+        if self.stream.is_closing():
+            return
+        self.stream.writelines(pending)
+        self.stats.messages_written += messages
+        self.stats.bytes_written += size
+        self.stats.write_calls += 1
+
+    def get_queue_depth(self) -> int:
+        """
+        Returns the number of messages queued but not yet handed over to the stream
+        """
+        return self._pending_messages
+
+    def get_buffered_bytes(self) -> int:
+        """
+        Returns the number of bytes queued in the writer plus those not yet written by the transport
+        """
+        transport = self.stream.transport
+        transport_bytes = transport.get_write_buffer_size() if transport is not None else 0
+        return self._pending_bytes + transport_bytes
+
+    async def drain(self) -> None:
+        """
+        Applies backpressure: if the buffered bytes reached the high-water mark, now or since the last
+        call, flushes the queue and waits until the transport drains
+        """
+        if not self._drain_needed and self.get_buffered_bytes() < self.high_water_mark:
+            return
+        self._drain_needed = False
+        self.stats.backpressure_waits += 1
+        self.flush()
+        await self.stream.drain()
+
+
+class Transport:
+    """
+    Base class for the transports connecting the JSON-RPC client to the language server.
+
+    A transport optionally launches the language server process, and provides the streams that
+    the framing and handler code read messages from and write messages to.
+
+    Attributes:
+        launch_info: The ProcessLaunchInfo describing the language server.
+        process: The language server process launched by the transport, or None if the transport
+            connected to an already running server.
+        reader: The stream messages from the server are read from.
+        writer: The stream messages to the server are written to.
+        stderr: The stream of the server's stderr, or None if it is not available.
+    """
+
+    def __init__(self, launch_info: "ProcessLaunchInfo") -> None:
+        self.launch_info = launch_info
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.stderr: Optional[asyncio.StreamReader] = None
+
+    async def open(self) -> None:
+        """
+        Launches the language server if required and connects to it
+        """
+        raise NotImplementedError()
+
+    async def close(self) -> None:
+        """
+        Closes the connection and waits for the launched language server process to exit, with a
+        timeout, killing it if necessary
+        """
+        process = self.process
+        self.process = None
+        if process:
+            # TODO: Ideally, we should terminate the process here,
+            # However, there's an issue with asyncio terminating processes documented at
+            # https://bugs.python.org/issue35539 and https://bugs.python.org/issue41320
+            # process.terminate()
+            try:
+                await asyncio.wait_for(process.wait(), timeout=PROCESS_EXIT_TIMEOUT)
+            except asyncio.TimeoutError:
+                process.kill()
+
+    async def _launch(self, stdio: bool) -> None:
+        """
+        Launches the language server process. For socket transports the server's stdin and stdout
+        are not used for messages, and only its stderr is captured.
+        """
+        child_proc_env = os.environ.copy()
+        child_proc_env.update(self.launch_info.env)
+        self.process = await asyncio.create_subprocess_shell(
+            self.launch_info.cmd,
+            stdout=asyncio.subprocess.PIPE if stdio else asyncio.subprocess.DEVNULL,
+            stdin=asyncio.subprocess.PIPE if stdio else asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE,
+            env=child_proc_env,
+            cwd=self.launch_info.cwd,
+        )
+        self.stderr = self.process.stderr
+
+
+class StdioTransport(Transport):
+    """
+    Launches the language server process and communicates with it over its stdin and stdout.
+    """
+
+    async def open(self) -> None:
+        await self._launch(stdio=True)
+        self.reader = self.process.stdout
+        self.writer = self.process.stdin
+
+
+class SocketTransport(Transport):
+    """
+    Base class for the transports that communicate with the language server over a socket. If the
+    launch info has a command, the server is launched first and the transport retries connecting
+    until the server listens on the socket. Otherwise the transport connects to an already running
+    server, e.g. a shared daemon serving many clients.
+    """
+
+    async def open(self) -> None:
+        if self.launch_info.cmd:
+            await self._launch(stdio=False)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.launch_info.connect_timeout
+        while True:
+            try:
+                self.reader, self.writer = await self._connect()
+                return
+            except OSError:
+                if self.process is not None and self.process.returncode is not None:
+                    raise
+                if loop.time() >= deadline:
+                    raise
+                await asyncio.sleep(0.05)
+
+    async def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+        await super().close()
+
+    async def _connect(self):
+        raise NotImplementedError()
+
+
+class TcpTransport(SocketTransport):
+    """
+    Communicates with the language server over a TCP connection to launch_info.host:launch_info.port.
+    """
+
+    async def _connect(self):
+        return await asyncio.open_connection(self.launch_info.host, self.launch_info.port, limit=DEFAULT_CHUNK_SIZE)
+
+
+class UnixSocketTransport(SocketTransport):
+    """
+    Communicates with the language server over the Unix domain socket at launch_info.socket_path.
+    """
+
+    async def _connect(self):
+        return await asyncio.open_unix_connection(self.launch_info.socket_path, limit=DEFAULT_CHUNK_SIZE)
+
+
+TRANSPORTS = {
+    "stdio": StdioTransport,
+    "tcp": TcpTransport,
+    "unix": UnixSocketTransport,
+}
+
+
+def create_transport(launch_info: "ProcessLaunchInfo") -> Transport:
+    """
+    Returns the transport selected by launch_info.transport ("stdio", "tcp", "unix" or "replay")
+    """
+    if launch_info.transport == "replay":
+        from .trace import ReplayTransport
+
+        return ReplayTransport(launch_info)
+    if launch_info.transport not in TRANSPORTS:
+        raise ValueError(f"Unknown transport: {launch_info.transport}")
+    if launch_info.transport == "tcp" and not launch_info.port:
+        raise ValueError("The tcp transport requires the port of the language server")
+    if launch_info.transport == "unix" and not launch_info.socket_path:
+        raise ValueError("The unix transport requires the socket_path of the language server")
+    return TRANSPORTS[launch_info.transport](launch_info)
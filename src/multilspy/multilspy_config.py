@@ -4,6 +4,7 @@ Configuration parameters for Multilspy.
 
 from enum import Enum
 from dataclasses import dataclass
+from typing import Optional, Tuple
 
 class Language(str, Enum):
     """
@@ -21,6 +22,20 @@ class Language(str, Enum):
     def __str__(self) -> str:
         return self.value
 
+class ServerLogLevel(str, Enum):
+    """
+    Verbosity of the logs written by the language server, for the servers that support configuring it.
+    """
+
+    TRACE = "trace"
+    DEBUG = "debug"
+    INFO = "info"
+    WARNING = "warning"
+    ERROR = "error"
+
+    def __str__(self) -> str:
+        return self.value
+
 @dataclass
 class MultilspyConfig:
     """
@@ -28,6 +43,89 @@ class MultilspyConfig:
     """
     code_language: Language
     trace_lsp_communication: bool = False
+    # Default timeout in seconds for every request sent to the language server, None to wait forever
+    request_timeout: Optional[float] = None
+    # Transport to the language server: "stdio" to launch it and communicate over its standard streams, "tcp" or
+    # "unix" to communicate over a socket, e.g. with a language server running as a daemon shared by many clients
+    transport: str = "stdio"
+    # Address of the language server for the "tcp" transport, which requires a port
+    host: str = "127.0.0.1"
+    port: int = 0
+    # Path of the socket of the language server for the "unix" transport, which requires it
+    socket_path: Optional[str] = None
+    # With the "tcp" or "unix" transport, launch the language server listening on the socket instead of connecting
+    # to an already running one. Only supported by the language servers that can listen on a socket (gopls).
+    launch_server: bool = False
+    # Send shutdown and exit to the language server when it is stopped. None to send them unless connected to an
+    # already running language server, which other clients may be using.
+    shutdown_server: Optional[bool] = None
+    # Record every message exchanged with the language server to a trace file at this path
+    record_trace_path: Optional[str] = None
+    # Play back the trace file at this path instead of launching the language server
+    replay_trace_path: Optional[str] = None
+    # Speed factor of the replay relative to the recording, 0 to replay without delays
+    replay_speed: float = 1.0
+    # Verbosity of the logs written by the language server to stderr
+    server_log_level: ServerLogLevel = ServerLogLevel.WARNING
+    # Number of recent stderr lines of the language server kept in memory, see get_stderr_tail
+    stderr_buffer_lines: int = 1000
+    # Pass every stderr line of the language server to the logger
+    forward_stderr: bool = False
+    # Maximum number of definition, implementation, references and hover responses kept in memory to answer
+    # repeated queries at the same position of an unchanged file, 0 to disable the cache
+    response_cache_size: int = 0
+    # Maximum total size in bytes of the JSON encoded responses in the cache, None for no bound
+    response_cache_max_bytes: Optional[int] = None
+    # Position encodings offered to the language server, in order of preference. The columns of positions passed to
+    # and returned by LanguageServer are in the encoding chosen by the server, utf-16 if it does not choose one.
+    # utf-32 columns are Python string indexes. The default offers only utf-16, so that the columns do not depend on
+    # the language server. With the persistent cache, the columns are in the first encoding offered, and the language
+    # server must choose it.
+    position_encodings: Tuple[str, ...] = ("utf-16",)
+    # Maximum number of files kept open in the language server after their last use, so that querying them again
+    # does not send their whole text again with didOpen, 0 to close files as soon as they are no longer used
+    keep_open_files: int = 0
+    # Maximum total size in bytes of the files kept open after their last use, None for no bound
+    keep_open_max_bytes: Optional[int] = None
+    # Keep the same responses in an SQLite database shared across runs, keyed by language, server version, file
+    # contents and position, and launch the language server only once a request misses the cache
+    persistent_cache: bool = False
+    # Path of the database of the persistent cache, by default in MultilspySettings.get_global_cache_directory()
+    persistent_cache_path: Optional[str] = None
+    # Maximum total size in bytes of the JSON encoded responses in the persistent cache
+    persistent_cache_max_bytes: int = 512 * 1024 * 1024
+    # Included in the keys of the persistent cache, e.g. a commit id, as responses can depend on files other than
+    # the queried one
+    persistent_cache_namespace: str = ""
+    # Maximum number of completion requests sent by request_completions while the language server returns incomplete
+    # results
+    completion_max_round_trips: int = 30
+    # Time in seconds after which request_completions stops resending completion requests and returns the last
+    # result, None to retry until the request timeout
+    completion_deadline: Optional[float] = 30.0
+    # Time in seconds request_completions waits before resending a completion request while the language server is
+    # idle, multiplied by completion_retry_backoff after every retry up to completion_retry_max_delay. While the server
+    # reports work in progress, request_completions waits for the end of the work instead.
+    completion_retry_delay: float = 0.05
+    completion_retry_backoff: float = 2.0
+    completion_retry_max_delay: float = 1.0
+    # Maximum time in seconds request_completions waits for the end of the work the language server reports in
+    # progress before resending a completion request, in case the server never reports the end, None for no bound
+    completion_max_busy_wait: Optional[float] = 5.0
+    # Decode the $/progress notifications of the language server beginning or ending work to know when it is busy,
+    # even for the servers that otherwise discard them. The progress reports in between are still dropped undecoded.
+    track_server_progress: bool = True
+    # Answer the completion requests that follow the typing of an identifier in an open file by filtering the previous
+    # result of the language server for the same identifier with the text typed since, instead of a new request
+    completion_filtering: bool = False
+    # Maximum number of completionItem/resolve requests sent by resolve_completions waiting for a response at the same
+    # time
+    completion_resolve_max_in_flight: int = 16
+    # Maximum number of resolved completion items kept in memory
+    completion_resolve_cache_size: int = 4096
+    # Maximum number of documents forked with fork_file open in the language server at the same time, as the server
+    # keeps an analysis of each of them in memory
+    max_forked_files: int = 8
 
     @classmethod
     def from_dict(cls, env: dict):
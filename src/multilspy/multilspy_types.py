@@ -131,6 +131,10 @@ class CompletionItem(TypedDict):
     """ A human-readable string with additional information
     about this item, like type or symbol information. """
 
+    documentation: NotRequired[str]
+    """ A human-readable string that represents a doc-comment,
+    only set on the items resolved with completionItem/resolve. """
+
 class SymbolKind(IntEnum):
     """A symbol kind."""
 
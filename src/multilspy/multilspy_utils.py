@@ -27,18 +27,8 @@ class TextUtils:
         """
         Returns the zero-indexed line and column number of the given index in the given text
         """
-        l = 0
-        c = 0
-        idx = 0
-        while idx < index:
-            if text[idx] == '\n':
-                l += 1
-                c = 0
-            else:
-                c += 1
-            idx += 1
-
-        return l, c
+        line_start = text.rfind("\n", 0, index) + 1
+        return text.count("\n", 0, index), index - line_start
     
     @staticmethod
     def get_index_from_line_col(text: str, line: int, col: int) -> int:
@@ -47,10 +37,10 @@ class TextUtils:
         """
         idx = 0
         while line > 0:
-            assert idx < len(text), (idx, len(text), text)
-            if text[idx] == "\n":
-                line -= 1
-            idx += 1
+            newline_idx = text.find("\n", idx)
+            assert newline_idx != -1, (idx, len(text), text)
+            idx = newline_idx + 1
+            line -= 1
         idx += col
         return idx
     
@@ -0,0 +1,286 @@
+"""
+This file contains the caches of Language Server responses used by LanguageServer to answer repeated queries
+at the same position of an unchanged file without a round trip to the server: an in-memory cache for the
+lifetime of a LanguageServer, and a persistent cache in an SQLite database shared across runs.
+"""
+
+import dataclasses
+import hashlib
+import os
+import sqlite3
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from .lsp_protocol_handler.json_codec import get_json_codec
+
+# Returned by ResponseCache.get for keys without an entry, as None is a valid response
+MISSING = object()
+
+
+def hash_text(text: str) -> str:
+    """
+    Returns the digest of the given text used to identify a version of a document in cache keys
+    """
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).hexdigest()
+
+
+@dataclasses.dataclass
+class CacheStats:
+    """
+    Counters of the lookups in the response cache, and its current size.
+    """
+
+    # Lookups answered from the cache
+    hits: int = 0
+
+    # Lookups that had to be sent to the Language Server
+    misses: int = 0
+
+    # Entries removed to stay within the size bounds of the cache
+    evictions: int = 0
+
+    # Database operations of the persistent cache that failed, e.g. on a lock held by another process. A lookup
+    # that fails is counted as a miss.
+    errors: int = 0
+
+    # Number of entries in the cache
+    entries: int = 0
+
+    # Total size in bytes of the JSON encoded responses in the cache
+    size: int = 0
+
+
+class FileDigests:
+    """
+    Digests of the contents of files on disk, recomputed only when their modification time or size change.
+    """
+
+    def __init__(self) -> None:
+        self._digests: Dict[str, Tuple[int, int, str]] = {}
+
+    def get(self, absolute_file_path: str) -> str:
+        """
+        Returns the digest of the contents of the given file
+        """
+        stat = os.stat(absolute_file_path)
+        cached = self._digests.get(absolute_file_path)
+        if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+        with open(absolute_file_path, "rb") as f:
+            digest = hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+        self._digests[absolute_file_path] = (stat.st_mtime_ns, stat.st_size, digest)
+        return digest
+
+
+class ResponseCache:
+    """
+    A least recently used cache of responses, bounded by the number of entries and optionally by the total size
+    of the responses.
+
+    Responses are stored JSON encoded, so that the callers of get receive a fresh copy they are free to modify,
+    and so that the size bound is exact. Keys include a digest of the contents of the queried document, and of the
+    other documents with unsaved edits, so that the entries of a changed document are never returned.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: Optional[int] = None) -> None:
+        """
+        :param max_entries: The maximum number of responses kept in the cache
+        :param max_bytes: The maximum total size in bytes of the JSON encoded responses, unbounded if None
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self._codec = get_json_codec()
+        self._entries: "OrderedDict[Hashable, bytes]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Any:
+        """
+        Returns a copy of the response cached for the given key, or MISSING
+        """
+        data = self._entries.get(key)
+        if data is None:
+            self.stats.misses += 1
+            return MISSING
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return self._codec.decode(data)
+
+    def put(self, key: Hashable, response: Any) -> None:
+        """
+        Caches the given response for the given key, evicting the least recently used entries beyond the bounds
+        """
+        data = self._codec.encode(response)
+        if self.max_bytes is not None and len(data) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.stats.size -= len(previous)
+        self._entries[key] = data
+        self.stats.size += len(data)
+        while len(self._entries) > self.max_entries or (self.max_bytes is not None and self.stats.size > self.max_bytes):
+            _, evicted = self._entries.popitem(last=False)
+            self.stats.size -= len(evicted)
+            self.stats.evictions += 1
+        self.stats.entries = len(self._entries)
+
+
+class PersistentResponseCache:
+    """
+    A cache of responses in an SQLite database, shared by every run using the same database file and bounded by
+    the total size of the responses, evicting the least recently used entries.
+
+    The database is opened on first use, in WAL mode so that concurrent runs read while another one writes. Each
+    put is committed at once. Lookups answered from the cache only record the last use of the entry in memory, and
+    these are written in batches of commit_interval, in their own short transaction, and on close. A failing
+    database operation is counted in CacheStats.errors, and lookups that fail are misses: the cache never fails
+    the request it was consulted for.
+    """
+
+    # Number of recorded uses of entries after which they are written to the database
+    commit_interval = 100
+
+    # Time in seconds to wait for a lock held by another run before the database operation fails
+    timeout = 5.0
+
+    def __init__(self, path: str, max_bytes: int) -> None:
+        """
+        :param path: The path of the SQLite database, created if it does not exist
+        :param max_bytes: The maximum total size in bytes of the JSON encoded responses in the database
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self._codec = get_json_codec()
+        self._connection: Optional[sqlite3.Connection] = None
+        # Last use of the entries answered from the cache, not yet written to the database
+        self._pending_uses: Dict[str, int] = {}
+        # Increasing counter ordering the entries by last use
+        self._clock = 0
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """
+        Returns the database key of the entry identified by the given JSON serializable parts
+        """
+        return hashlib.blake2b(repr(parts).encode("utf-8", "surrogatepass"), digest_size=20).hexdigest()
+
+    def _open(self) -> sqlite3.Connection:
+        if self._connection is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=self.timeout)
+            try:
+                connection.execute("PRAGMA journal_mode=WAL")
+                with connection:
+                    connection.execute(
+                        "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response BLOB NOT NULL, "
+                        "size INTEGER NOT NULL, last_used INTEGER NOT NULL)"
+                    )
+                    connection.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+                self._load_stats(connection)
+            except sqlite3.Error:
+                connection.close()
+                raise
+            self._connection = connection
+        return self._connection
+
+    def _load_stats(self, connection: sqlite3.Connection) -> None:
+        count, size, clock = connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(MAX(last_used), 0) FROM responses"
+        ).fetchone()
+        self.stats.entries, self.stats.size, self._clock = count, size, max(clock, self._clock)
+
+    def get(self, key: str) -> Any:
+        """
+        Returns the response cached for the given key, or MISSING
+        """
+        try:
+            row = self._open().execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error:
+            self.stats.errors += 1
+            row = None
+        if row is None:
+            self.stats.misses += 1
+            return MISSING
+        self.stats.hits += 1
+        self._clock += 1
+        self._pending_uses[key] = self._clock
+        if len(self._pending_uses) >= self.commit_interval:
+            self._write_uses()
+        return self._codec.decode(row[0])
+
+    def put(self, key: str, response: Any) -> None:
+        """
+        Caches the given response for the given key, evicting the least recently used entries beyond max_bytes
+        """
+        data = self._codec.encode(response)
+        if len(data) > self.max_bytes:
+            return
+        try:
+            connection = self._open()
+            with connection:
+                row = connection.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    self.stats.size -= row[0]
+                    self.stats.entries -= 1
+                self._clock += 1
+                connection.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, size, last_used) VALUES (?, ?, ?, ?)",
+                    (key, data, len(data), self._clock),
+                )
+                self.stats.size += len(data)
+                self.stats.entries += 1
+                if self.stats.size > self.max_bytes:
+                    self._evict()
+        except sqlite3.Error:
+            self.stats.errors += 1
+            # The transaction was rolled back, the counters are read again from the database
+            if self._connection is not None:
+                try:
+                    self._load_stats(self._connection)
+                except sqlite3.Error:
+                    pass
+
+    def _evict(self) -> None:
+        """
+        Removes the least recently used entries until the size of the cache is down to 3/4 of max_bytes, so that
+        eviction does not run again on every put
+        """
+        target = self.max_bytes * 3 // 4
+        evicted = []
+        cursor = self._connection.execute("SELECT key, size FROM responses ORDER BY last_used")
+        for key, size in cursor:
+            if self.stats.size <= target:
+                break
+            evicted.append((key,))
+            self.stats.size -= size
+        cursor.close()
+        self._connection.executemany("DELETE FROM responses WHERE key = ?", evicted)
+        self.stats.entries -= len(evicted)
+        self.stats.evictions += len(evicted)
+
+    def _write_uses(self) -> None:
+        """
+        Writes the last use of the entries answered from the cache in one short transaction
+        """
+        uses, self._pending_uses = self._pending_uses, {}
+        if not uses or self._connection is None:
+            return
+        try:
+            with self._connection:
+                self._connection.executemany(
+                    "UPDATE responses SET last_used = ? WHERE key = ?", [(clock, key) for key, clock in uses.items()]
+                )
+        except sqlite3.Error:
+            self.stats.errors += 1
+
+    def close(self) -> None:
+        """
+        Writes the pending uses of entries and closes the database
+        """
+        if self._connection is not None:
+            self._write_uses()
+            self._connection.close()
+            self._connection = None
@@ -0,0 +1,403 @@
+"""
+This file contains TextBuffer, the line indexed text of the documents open in the Language Server, which converts
+between (line, column) positions and offsets and applies edits without copying the whole text.
+"""
+
+import os
+import re
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Number of lines per block of a TextBuffer. Blocks holding twice as many lines after an edit are split.
+BLOCK_LINES = 256
+
+# Position encodings of the Language Server Protocol: the unit counted by the columns of positions
+UTF8 = "utf-8"
+UTF16 = "utf-16"
+UTF32 = "utf-32"
+
+# Minimum number of positions or offsets converted at once with NumPy, when it is installed, below which the
+# pure Python conversion is faster
+NUMPY_MIN_CONVERSIONS = 64
+
+# Maximum number of unit tables kept by a TextBuffer, see make_unit_table
+MAX_UNIT_TABLES = 4096
+
+
+# Characters taking more than one code unit in each encoding
+MULTI_UNIT_CHARS = {UTF8: re.compile(r"[^\x00-\x7f]"), UTF16: re.compile(r"[\U00010000-\U0010ffff]")}
+
+
+def count_units(text: str, encoding: str) -> int:
+    """
+    Returns the length of the given text in code units of the given position encoding
+    """
+    if encoding == UTF32 or text.isascii():
+        return len(text)
+    if encoding == UTF16:
+        return len(text) + len(MULTI_UNIT_CHARS[UTF16].findall(text))
+    return len(text.encode("utf-8", "surrogatepass"))
+
+
+def make_unit_table(line: str, encoding: str) -> Optional[Tuple[List[int], List[int], List[int]]]:
+    """
+    Returns the columns of the characters of the given line taking more than one code unit of the given encoding,
+    the number of code units in excess of the columns before each of them and after the last one, and the offsets
+    in code units of each of them. Returns None if every character takes one code unit.
+    """
+    columns = []
+    excess = [0]
+    for match in MULTI_UNIT_CHARS[encoding].finditer(line):
+        columns.append(match.start())
+        code_point = ord(match.group())
+        if encoding == UTF16:
+            excess.append(excess[-1] + 1)
+        else:
+            excess.append(excess[-1] + (1 if code_point < 0x800 else 2 if code_point < 0x10000 else 3))
+    if not columns:
+        return None
+    return columns, excess, [column + excess[i] for i, column in enumerate(columns)]
+
+
+def split_lines(text: str) -> List[str]:
+    """
+    Splits the given text after each newline. The last line has no newline, and is empty if the text ends with one.
+    Only "\\n" separates lines, as in TextUtils.
+    """
+    lines = text.split("\n")
+    for i in range(len(lines) - 1):
+        lines[i] += "\n"
+    return lines
+
+
+class TextSnapshot:
+    """
+    The text of a TextBuffer at the time of TextBuffer.snapshot. The snapshot shares its blocks of lines with the
+    buffer, which copies a block before editing it, so a snapshot costs memory only for the blocks edited since.
+    """
+
+    __slots__ = ("blocks", "block_sizes", "text")
+
+    def __init__(self, blocks: List[List[str]], block_sizes: List[int], text: Optional[str]) -> None:
+        self.blocks = blocks
+        self.block_sizes = block_sizes
+        # The text as a single string, if the buffer had built it
+        self.text = text
+
+    def __len__(self) -> int:
+        return sum(self.block_sizes)
+
+
+class TextBuffer:
+    """
+    A text stored as a list of blocks of at most 2 * BLOCK_LINES lines, with the number of characters of each block.
+
+    Converting between positions and offsets finds the block by binary search on the first line and offset of
+    each block, then walks the lines of the block, and an edit replaces the affected lines in their blocks, so
+    neither takes time proportional to the size of the text. The text as a single string is built on demand and kept
+    until the next edit.
+
+    Lines and columns are zero-indexed, and columns count characters, as in TextUtils. get_column and get_units
+    convert columns from and to the code units of the position encodings of the Language Server Protocol.
+    """
+
+    def __init__(self, text: str = "") -> None:
+        self._blocks: List[List[str]] = []
+        self._block_sizes: List[int] = []
+        # Index of the first line and offset of the first character of each block, rebuilt after edits
+        self._block_lines: Optional[List[int]] = None
+        self._block_offsets: Optional[List[int]] = None
+        self._line_count = 0
+        # Offset of the start of every line, and the same as a NumPy array, built for bulk conversions until the
+        # next edit
+        self._line_starts: Optional[List[int]] = None
+        self._line_starts_array = None
+        self._text: Optional[str] = text
+        # Unit tables of the lines with multi unit characters, see make_unit_table, by encoding and line text, so
+        # that a line keeps its table until it is edited
+        self._unit_tables: Dict[Tuple[str, str], Optional[Tuple[List[int], List[int], List[int]]]] = {}
+        # Identities of the blocks shared with snapshots, copied before they are edited
+        self._shared_blocks: Set[int] = set()
+        lines = split_lines(text)
+        for start in range(0, len(lines), BLOCK_LINES):
+            self._blocks.append(lines[start : start + BLOCK_LINES])
+            self._block_sizes.append(sum(map(len, self._blocks[-1])))
+
+    def _build_index(self) -> None:
+        block_lines = list(accumulate(map(len, self._blocks)))
+        self._line_count = block_lines[-1]
+        self._block_lines = [0] + block_lines[:-1]
+        self._block_offsets = [0] + list(accumulate(self._block_sizes))[:-1]
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = "".join(line for block in self._blocks for line in block)
+        return self._text
+
+    def __len__(self) -> int:
+        return sum(self._block_sizes)
+
+    @property
+    def line_count(self) -> int:
+        if self._block_lines is None:
+            self._build_index()
+        return self._line_count
+
+    def get_line(self, line: int) -> str:
+        """
+        Returns the given line, with its newline if it has one
+        """
+        block_index, line_index, _ = self._locate_line(line)
+        return self._blocks[block_index][line_index]
+
+    def _locate_line(self, line: int) -> Tuple[int, int, int]:
+        """
+        Returns the index of the block holding the given line, the index of the line in the block, and the offset
+        of the start of the block
+        """
+        if self._block_lines is None:
+            self._build_index()
+        if not 0 <= line < self._line_count:
+            raise IndexError(f"Line {line} is out of the text")
+        block_index = bisect_right(self._block_lines, line) - 1
+        return block_index, line - self._block_lines[block_index], self._block_offsets[block_index]
+
+    def _get_unit_table(self, line: int, encoding: str) -> Optional[Tuple[List[int], List[int], List[int]]]:
+        """
+        Returns the unit table of the given line, see make_unit_table
+        """
+        if encoding == UTF32:
+            return None
+        text_line = self.get_line(line)
+        if text_line.isascii():
+            return None
+        key = (encoding, text_line)
+        if key not in self._unit_tables:
+            if len(self._unit_tables) >= MAX_UNIT_TABLES:
+                self._unit_tables.clear()
+            self._unit_tables[key] = make_unit_table(text_line, encoding)
+        return self._unit_tables[key]
+
+    def get_units(self, line: int, column: int, encoding: str) -> int:
+        """
+        Returns the column of the given position in code units of the given encoding
+        """
+        table = self._get_unit_table(line, encoding)
+        if table is None:
+            return column
+        columns, excess, _ = table
+        return column + excess[bisect_left(columns, column)]
+
+    def get_column(self, line: int, units: int, encoding: str) -> int:
+        """
+        Returns the column in characters of the given position, with its column in code units of the given encoding.
+        A position in the middle of a character is moved to the start of the character.
+        """
+        table = self._get_unit_table(line, encoding)
+        if table is None:
+            return units
+        columns, excess, starts = table
+        # Number of multi unit characters starting at or before the position
+        count = bisect_right(starts, units)
+        if count and units <= columns[count - 1] + excess[count]:
+            return columns[count - 1]
+        return units - excess[count]
+
+    def get_offset(self, line: int, column: int) -> int:
+        """
+        Returns the offset in the text of the given position
+        """
+        block_index, line_index, offset = self._locate_line(line)
+        block = self._blocks[block_index]
+        for i in range(line_index):
+            offset += len(block[i])
+        return offset + column
+
+    def get_position(self, offset: int) -> Tuple[int, int]:
+        """
+        Returns the (line, column) position of the given offset in the text
+        """
+        if offset < 0 or offset > len(self):
+            raise IndexError(f"Offset {offset} is out of the text")
+        if self._block_offsets is None:
+            self._build_index()
+        block_index = bisect_right(self._block_offsets, offset) - 1
+        line = self._block_lines[block_index]
+        offset -= self._block_offsets[block_index]
+        for text_line in self._blocks[block_index]:
+            # Only the last line of the text has no newline
+            if offset < len(text_line) or not text_line.endswith("\n"):
+                return line, offset
+            offset -= len(text_line)
+            line += 1
+        raise AssertionError("unreachable")
+
+    def _get_line_starts(self) -> List[int]:
+        """
+        Returns the offset of the start of every line, followed by the length of the text
+        """
+        if self._line_starts is None:
+            self._line_starts = [0] + list(accumulate(len(line) for block in self._blocks for line in block))
+        return self._line_starts
+
+    def get_offsets(self, positions: Sequence[Tuple[int, int]], encoding: str = UTF32) -> List[int]:
+        """
+        Returns the offsets in the text of the given (line, column) positions, converted in one pass over the
+        positions using the start offsets of the lines, which are computed once until the next edit.
+
+        :param positions: The positions to convert
+        :param encoding: The position encoding of the columns
+        """
+        if encoding != UTF32 and not self.text.isascii():
+            positions = [(line, self.get_column(line, column, encoding)) for line, column in positions]
+        line_starts = self._get_line_starts()
+        line_count = len(line_starts) - 1
+        if numpy is not None and len(positions) >= NUMPY_MIN_CONVERSIONS:
+            if self._line_starts_array is None:
+                self._line_starts_array = numpy.array(line_starts[:-1], dtype=numpy.int64)
+            lines, columns = numpy.array(positions, dtype=numpy.int64).reshape(-1, 2).T
+            if lines.min() < 0 or lines.max() >= line_count:
+                raise IndexError("Line out of the text")
+            return (self._line_starts_array[lines] + columns).tolist()
+        offsets = []
+        for line, column in positions:
+            if not 0 <= line < line_count:
+                raise IndexError(f"Line {line} is out of the text")
+            offsets.append(line_starts[line] + column)
+        return offsets
+
+    def get_positions(self, offsets: Sequence[int], encoding: str = UTF32) -> List[Tuple[int, int]]:
+        """
+        Returns the (line, column) positions of the given offsets in the text, converted in one pass over the
+        offsets using the start offsets of the lines, which are computed once until the next edit.
+
+        :param offsets: The offsets to convert
+        :param encoding: The position encoding of the columns returned
+        """
+        line_starts = self._get_line_starts()
+        length = line_starts[-1]
+        if numpy is not None and len(offsets) >= NUMPY_MIN_CONVERSIONS:
+            if self._line_starts_array is None:
+                self._line_starts_array = numpy.array(line_starts[:-1], dtype=numpy.int64)
+            offset_array = numpy.array(offsets, dtype=numpy.int64)
+            if len(offset_array) and (offset_array.min() < 0 or offset_array.max() > length):
+                raise IndexError("Offset out of the text")
+            lines = numpy.searchsorted(self._line_starts_array, offset_array, side="right") - 1
+            positions = list(zip(lines.tolist(), (offset_array - self._line_starts_array[lines]).tolist()))
+        else:
+            positions = []
+            for offset in offsets:
+                if not 0 <= offset <= length:
+                    raise IndexError(f"Offset {offset} is out of the text")
+                line = bisect_right(line_starts, offset, 0, len(line_starts) - 1) - 1
+                positions.append((line, offset - line_starts[line]))
+        if encoding != UTF32 and not self.text.isascii():
+            positions = [(line, self.get_units(line, column, encoding)) for line, column in positions]
+        return positions
+
+    def replace(self, start_line: int, start_column: int, end_line: int, end_column: int, new_text: str) -> str:
+        """
+        Replaces the text between the given positions with new_text and returns the replaced text. As in the Language
+        Server Protocol, columns past the end of their line stand for the end of the line.
+        """
+        first_block, first_line, _ = self._locate_line(start_line)
+        last_block, last_line, _ = self._locate_line(end_line)
+        if first_block != last_block:
+            # Merge the blocks spanned by the edit, to splice the lines in a single block
+            last_line += sum(map(len, self._blocks[first_block:last_block]))
+            merged: List[str] = []
+            for block in self._blocks[first_block : last_block + 1]:
+                merged.extend(block)
+            self._blocks[first_block : last_block + 1] = [merged]
+            self._block_sizes[first_block : last_block + 1] = [sum(self._block_sizes[first_block : last_block + 1])]
+
+        block = self._blocks[first_block]
+        if id(block) in self._shared_blocks:
+            block = self._blocks[first_block] = list(block)
+        old_lines = block[first_line : last_line + 1]
+        old_text = "".join(old_lines)
+        start = min(start_column, len(old_lines[0].rstrip("\n")))
+        end = len(old_text) - len(old_lines[-1]) + min(end_column, len(old_lines[-1].rstrip("\n")))
+        replaced = old_text[start:end]
+        new_lines = split_lines(old_text[:start] + new_text + old_text[end:])
+        if old_lines[-1].endswith("\n"):
+            # The text still ends with the newline of the last replaced line, the next line starts after it
+            new_lines.pop()
+        block[first_line : last_line + 1] = new_lines
+        self._block_sizes[first_block] += len(new_text) - len(replaced)
+        self._text = None
+        self._block_lines = self._block_offsets = None
+        self._line_starts = self._line_starts_array = None
+
+        if len(block) > 2 * BLOCK_LINES:
+            chunks = [block[i : i + BLOCK_LINES] for i in range(0, len(block), BLOCK_LINES)]
+            self._blocks[first_block : first_block + 1] = chunks
+            self._block_sizes[first_block : first_block + 1] = [sum(map(len, chunk)) for chunk in chunks]
+        return replaced
+
+    def snapshot(self) -> TextSnapshot:
+        """
+        Returns a snapshot of the text, to restore it later or diff it with the text at that time. Taking a snapshot
+        takes time proportional to the number of blocks, not to the size of the text.
+        """
+        # The blocks of earlier snapshots that are not among the current blocks can no longer be edited
+        self._shared_blocks = set(map(id, self._blocks))
+        return TextSnapshot(list(self._blocks), list(self._block_sizes), self._text)
+
+    def restore(self, snapshot: TextSnapshot) -> None:
+        """
+        Restores the text of the given snapshot, which stays valid
+        """
+        self._blocks = list(snapshot.blocks)
+        self._block_sizes = list(snapshot.block_sizes)
+        self._shared_blocks = set(map(id, self._blocks))
+        self._text = snapshot.text
+        self._block_lines = self._block_offsets = None
+        self._line_starts = self._line_starts_array = None
+
+    def diff(self, snapshot: TextSnapshot) -> Tuple[int, int, int, int, str]:
+        """
+        Returns the single edit turning the text back into the text of the given snapshot, as the start line and
+        column and end line and column of the replaced text, and the new text. The edit replaces the text between
+        the longest common prefix and suffix of the two texts. Blocks shared with the snapshot are skipped without
+        comparing their lines.
+        """
+        ours, theirs = self._blocks, snapshot.blocks
+        head = 0
+        while head < len(ours) and head < len(theirs) and ours[head] is theirs[head]:
+            head += 1
+        if head == len(ours) == len(theirs):
+            return 0, 0, 0, 0, ""
+        tail = 0
+        while tail < len(ours) - head and tail < len(theirs) - head and ours[-1 - tail] is theirs[-1 - tail]:
+            tail += 1
+        our_lines = [line for block in ours[head : len(ours) - tail] for line in block]
+        their_lines = [line for block in theirs[head : len(theirs) - tail] for line in block]
+
+        prefix_lines = 0
+        limit = min(len(our_lines), len(their_lines))
+        while prefix_lines < limit and our_lines[prefix_lines] == their_lines[prefix_lines]:
+            prefix_lines += 1
+        suffix_lines = 0
+        limit -= prefix_lines
+        while suffix_lines < limit and our_lines[-1 - suffix_lines] == their_lines[-1 - suffix_lines]:
+            suffix_lines += 1
+        our_text = "".join(our_lines[prefix_lines : len(our_lines) - suffix_lines])
+        their_text = "".join(their_lines[prefix_lines : len(their_lines) - suffix_lines])
+
+        start = len(os.path.commonprefix([our_text, their_text]))
+        suffix = len(os.path.commonprefix([our_text[start:][::-1], their_text[start:][::-1]]))
+        end = len(our_text) - suffix
+        first_line = sum(map(len, ours[:head])) + prefix_lines
+        start_line = first_line + our_text.count("\n", 0, start)
+        start_column = start - (our_text.rfind("\n", 0, start) + 1)
+        end_line = first_line + our_text.count("\n", 0, end)
+        end_column = end - (our_text.rfind("\n", 0, end) + 1)
+        return start_line, start_column, end_line, end_column, their_text[start : len(their_text) - suffix]
@@ -0,0 +1,26 @@
+"""
+Fixtures of the tests run against the fake language server in benchmarks/fake_language_server.py
+"""
+
+import os
+
+import pytest
+from fake_language_server import FakeLanguageServer, in_process_transport
+
+
+@pytest.fixture
+def fake_language_server():
+    """
+    Provides the FakeLanguageServer class, with the transport running the fake server in-process registered for the
+    duration of the test
+    """
+    with in_process_transport():
+        yield FakeLanguageServer
+
+
+@pytest.fixture
+def fake_server_script() -> str:
+    """
+    Provides the path of the script of the fake language server, to launch it as a subprocess
+    """
+    return os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "benchmarks", "fake_language_server.py"))
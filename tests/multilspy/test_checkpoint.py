@@ -0,0 +1,73 @@
+"""
+This file contains tests for restoring open files to a checkpoint, run against the loopback server in
+benchmarks/fake_language_server.py
+"""
+
+import os
+import tempfile
+
+import pytest
+from multilspy.multilspy_config import Language, MultilspyConfig
+from multilspy.multilspy_exceptions import MultilspyException
+from multilspy.multilspy_logger import MultilspyLogger
+from multilspy.multilspy_utils import TextUtils
+
+pytest_plugins = ("pytest_asyncio",)
+
+
+def apply_change(text: str, change: dict) -> str:
+    if "range" not in change:
+        return change["text"]
+    start, end = change["range"]["start"], change["range"]["end"]
+    start_index = TextUtils.get_index_from_line_col(text, start["line"], start["character"])
+    end_index = TextUtils.get_index_from_line_col(text, end["line"], end["character"])
+    return text[:start_index] + change["text"] + text[end_index:]
+
+
+@pytest.mark.asyncio
+async def test_rollback_sends_a_single_inverse_change(fake_language_server):
+    """
+    Test that rolling back speculative edits sends one didChange restoring the text at the checkpoint, and restores
+    the completion session of the checkpoint
+    """
+    contents = "".join(f"def function_{i}():\n    return {i}\n" for i in range(100))
+    with tempfile.TemporaryDirectory() as root:
+        with open(os.path.join(root, "main.py"), "w") as f:
+            f.write(contents)
+        config = MultilspyConfig(code_language=Language.PYTHON, completion_filtering=True)
+        lsp = fake_language_server(config, MultilspyLogger(), root, "--position-encodings utf-32", True)
+        async with lsp.start_server():
+            changes = []
+            notify_change = lsp.server.notify.did_change_text_document
+            lsp.server.notify.did_change_text_document = lambda params: (changes.append(params), notify_change(params))
+
+            with lsp.open_file("main.py"):
+                await lsp.request_completions("main.py", 3, 11)
+                checkpoint = lsp.checkpoint("main.py")
+                for token in ["item", "_", "1"]:
+                    position = lsp.insert_text_at_position("main.py", 3, 11, token)
+                lsp.delete_text_between_positions("main.py", {"line": 50, "character": 0}, {"line": 52, "character": 0})
+                text = lsp.get_open_file_text("main.py")
+                del changes[:]
+
+                lsp.rollback(checkpoint)
+                assert lsp.get_open_file_text("main.py") == contents
+                assert len(changes) == 1 and changes[0]["textDocument"]["version"] == 5
+                assert apply_change(text, changes[0]["contentChanges"][0]) == contents
+                assert len(changes[0]["contentChanges"][0]["text"]) < len(contents) // 2
+
+                await lsp.request_completions("main.py", 3, 11)
+                assert lsp.get_completion_report().filtered
+
+                lsp.rollback(checkpoint)
+                assert len(changes) == 1
+
+                lsp.delete_text_between_positions("main.py", {"line": 0, "character": 0}, {"line": 150, "character": 0})
+                lsp.insert_text_at_position("main.py", 0, 0, "x = 1\n")
+                del changes[:]
+                lsp.rollback(checkpoint)
+                assert changes[0]["contentChanges"] == [{"text": contents}]
+
+            with lsp.open_file("main.py"):
+                with pytest.raises(MultilspyException):
+                    lsp.rollback(checkpoint)
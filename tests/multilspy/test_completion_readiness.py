@@ -0,0 +1,128 @@
+"""
+This file contains tests for waiting on the readiness of the Language Server before resending completion requests,
+run against the loopback server in benchmarks/fake_language_server.py
+"""
+
+import asyncio
+import os
+import tempfile
+
+import pytest
+from multilspy.completion_readiness import REASON_DEADLINE, REASON_MAX_ROUND_TRIPS, ServerReadiness
+from multilspy.multilspy_config import Language, MultilspyConfig
+from multilspy.multilspy_logger import MultilspyLogger
+
+pytest_plugins = ("pytest_asyncio",)
+
+
+@pytest.mark.asyncio
+async def test_server_readiness_signals():
+    """
+    Test that the server is busy between the begin and end of its work done progress and while it is not quiescent,
+    and that waiting returns as soon as it becomes ready
+    """
+    readiness = ServerReadiness()
+    assert await readiness.wait_until_ready(0.01, None) >= 0.01
+
+    readiness.on_progress({"token": 1, "value": {"kind": "begin", "title": "Indexing"}})
+    readiness.on_progress({"token": 1, "value": {"kind": "report", "percentage": 50}})
+    readiness.on_server_status({"health": "ok", "quiescent": False, "message": "Loading workspace"})
+    assert readiness.busy and readiness.pending_work() == ["Indexing", "Loading workspace"]
+    assert await readiness.wait_until_ready(0.01, 0.05) >= 0.05
+
+    async def finish():
+        await asyncio.sleep(0.01)
+        readiness.on_progress({"token": 1, "value": {"kind": "end"}})
+        await asyncio.sleep(0.01)
+        readiness.on_server_status({"health": "ok", "quiescent": True})
+
+    task = asyncio.create_task(finish())
+    assert await readiness.wait_until_ready(10, None) < 1
+    assert not readiness.busy
+    await task
+
+    readiness.on_register_capability({"registrations": [{"id": "1", "method": "textDocument/completion"}]})
+    assert readiness.registrations == {"textDocument/completion"}
+
+
+@pytest.mark.asyncio
+async def test_completions_wait_for_the_end_of_indexing(fake_language_server):
+    """
+    Test that incomplete completion results are requested again once the server reports the end of its work, and
+    that the report says why a result is incomplete
+    """
+    with tempfile.TemporaryDirectory() as root:
+        with open(os.path.join(root, "main.py"), "w") as f:
+            f.write("x = 1\n")
+
+        config = MultilspyConfig(code_language=Language.PYTHON, completion_retry_delay=0.01)
+        lsp = fake_language_server(config, MultilspyLogger(), root, "--indexing 300", True)
+        async with lsp.start_server():
+            completions = await lsp.request_completions("main.py", 0, 0)
+            report = lsp.get_completion_report()
+            assert len(completions) == 10
+            assert not report.incomplete and report.reason == "" and report.pending_work == []
+            # One request during indexing, possibly one more before the server reported it, and one after
+            assert 2 <= report.round_trips <= 3
+            assert report.wait_time > 0.2
+
+        config = MultilspyConfig(code_language=Language.PYTHON, completion_deadline=0.1, completion_retry_delay=0.01)
+        lsp = fake_language_server(config, MultilspyLogger(), root, "--indexing 5000", True)
+        async with lsp.start_server():
+            assert await lsp.request_completions("main.py", 0, 0) == []
+            assert len(await lsp.request_completions("main.py", 0, 0, allow_incomplete=True)) == 10
+            report = lsp.get_completion_report()
+            assert report.incomplete and report.reason == REASON_DEADLINE and report.pending_work == ["Indexing"]
+
+        # Without its progress, the server looks idle, so requests are resent after the retry delay
+        config = MultilspyConfig(
+            code_language=Language.PYTHON,
+            completion_max_round_trips=3,
+            completion_retry_delay=0.01,
+            track_server_progress=False,
+        )
+        lsp = fake_language_server(config, MultilspyLogger(), root, "--indexing 5000", True)
+        async with lsp.start_server():
+            assert await lsp.request_completions("main.py", 0, 0) == []
+            report = lsp.get_completion_report()
+            assert report.round_trips == 3 and report.reason == REASON_MAX_ROUND_TRIPS and report.pending_work == []
+            assert 0.03 <= report.wait_time < 1
+
+
+@pytest.mark.asyncio
+async def test_completions_stop_waiting_for_work_that_never_ends(fake_language_server):
+    """
+    Test that request_completions resends its request after completion_max_busy_wait when the server never reports
+    the end of its work, and that only the progress notifications beginning or ending work are decoded once
+    $/progress is discarded
+    """
+    with tempfile.TemporaryDirectory() as root:
+        with open(os.path.join(root, "main.py"), "w") as f:
+            f.write("x = 1\n")
+
+        config = MultilspyConfig(
+            code_language=Language.PYTHON,
+            completion_max_round_trips=3,
+            completion_retry_delay=0.01,
+            completion_max_busy_wait=0.1,
+        )
+        assert MultilspyConfig(code_language=Language.PYTHON).completion_max_busy_wait is not None
+        lsp = fake_language_server(config, MultilspyLogger(), root, "--indexing 100000", True)
+        async with lsp.start_server():
+            assert len(await lsp.request_completions("main.py", 0, 0, allow_incomplete=True)) == 10
+            report = lsp.get_completion_report()
+            assert report.round_trips == 3 and report.reason == REASON_MAX_ROUND_TRIPS
+            assert report.pending_work == ["Indexing"]
+            assert 0.2 <= report.wait_time < 1
+
+            lsp.server.discard_notification("$/progress")
+            for kind in ["report", "end"]:
+                lsp.server._handle_body(
+                    memoryview(
+                        b'{"jsonrpc": "2.0", "method": "$/progress", "params": {"token": "indexing", "value": {"kind": "%s"}}}'
+                        % kind.encode()
+                    )
+                )
+            assert lsp.server.discarded_notifications["$/progress"] == 1
+            assert not lsp.server_readiness.busy
+            assert "$/progress" in lsp.server.discarded_methods
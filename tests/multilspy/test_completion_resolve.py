@@ -0,0 +1,77 @@
+"""
+This file contains tests for resolving the details of completion items on demand, run against the loopback server
+in benchmarks/fake_language_server.py
+"""
+
+import asyncio
+import os
+import tempfile
+
+import pytest
+from multilspy.multilspy_config import Language, MultilspyConfig
+from multilspy.multilspy_logger import MultilspyLogger
+
+pytest_plugins = ("pytest_asyncio",)
+
+
+@pytest.mark.asyncio
+async def test_completion_details_are_resolved_on_demand(fake_language_server):
+    """
+    Test that completion handles are returned without resolve requests, and that resolving them sends one request
+    per distinct item under the concurrency limit, sharing concurrent requests and caching the results
+    """
+    with tempfile.TemporaryDirectory() as root:
+        with open(os.path.join(root, "main.py"), "w") as f:
+            f.write("x = \n")
+        config = MultilspyConfig(code_language=Language.PYTHON, completion_resolve_max_in_flight=2)
+        lsp = fake_language_server(config, MultilspyLogger(), root, "--latency 5", True)
+        async with lsp.start_server():
+            handles = await lsp.request_completion_handles("main.py", 0, 4)
+            stats = lsp.get_completion_resolve_stats()
+            assert sorted(handle.completion_text for handle in handles) == [f"item_{i}" for i in range(10)]
+            assert [dict(handle.item) for handle in handles] == await lsp.request_completions("main.py", 0, 4)
+            assert stats.requests == 0
+
+            resolved, again = await asyncio.gather(lsp.resolve_completions(handles), handles[0].resolve())
+            assert [item["completionText"] for item in resolved] == [handle.completion_text for handle in handles]
+            assert resolved[0] == again
+            assert resolved[0]["documentation"] == f"Documentation of {handles[0].completion_text}"
+            assert (stats.requests, stats.joined, stats.cache_hits) == (10, 1, 0)
+
+            handles = await lsp.request_completion_handles("main.py", 0, 4)
+            assert await lsp.resolve_completions(handles[:3]) == [
+                item for item in resolved if item["completionText"] in [handle.completion_text for handle in handles[:3]]
+            ]
+            assert (stats.requests, stats.cache_hits) == (10, 3)
+
+
+@pytest.mark.asyncio
+async def test_cancelling_a_resolution_does_not_cancel_the_ones_joining_it(fake_language_server):
+    """
+    Test that the request shared by concurrent resolutions of an item keeps running when the first one is cancelled,
+    and is cancelled once no resolution waits for it
+    """
+    with tempfile.TemporaryDirectory() as root:
+        with open(os.path.join(root, "main.py"), "w") as f:
+            f.write("x = \n")
+        config = MultilspyConfig(code_language=Language.PYTHON)
+        lsp = fake_language_server(config, MultilspyLogger(), root, "--method-latency completionItem/resolve=100", True)
+        async with lsp.start_server():
+            handles = await lsp.request_completion_handles("main.py", 0, 4)
+            first = asyncio.ensure_future(handles[0].resolve())
+            await asyncio.sleep(0.01)
+            second = asyncio.ensure_future(handles[0].resolve())
+            await asyncio.sleep(0.01)
+            first.cancel()
+            resolved = await second
+            assert resolved["documentation"] == f"Documentation of {handles[0].completion_text}"
+            assert first.cancelled()
+
+            only = asyncio.ensure_future(handles[1].resolve())
+            await asyncio.sleep(0.01)
+            only.cancel()
+            await asyncio.sleep(0.01)
+            stats = lsp.get_completion_resolve_stats()
+            assert (stats.requests, stats.joined) == (2, 1)
+            assert lsp.completion_resolver._in_flight == {} and lsp.completion_resolver._waiters == {}
+            assert lsp.server.request_stats.cancelled == 1
@@ -0,0 +1,85 @@
+"""
+This file contains tests for answering completion requests within an identifier by filtering the previous result,
+run against the loopback server in benchmarks/fake_language_server.py
+"""
+
+import os
+import tempfile
+
+import pytest
+from multilspy.completion_resolve import CompletionHandle
+from multilspy.completion_session import CompletionSession
+from multilspy.multilspy_config import Language, MultilspyConfig
+from multilspy.multilspy_logger import MultilspyLogger
+
+pytest_plugins = ("pytest_asyncio",)
+
+
+def test_anchor_is_the_start_of_the_identifier():
+    """
+    Test that the anchor of a session is the start of the identifier ending at the cursor
+    """
+    assert CompletionSession.find_anchor("x = foo.bar_1", 13) == 8
+    assert CompletionSession.find_anchor("x = foo.bar_1", 8) == 8
+    assert CompletionSession.find_anchor("x = foo.bar_1", 6) == 4
+    assert CompletionSession.find_anchor("été", 3) == 0
+
+
+def test_items_are_filtered_ignoring_case_by_filter_text():
+    """
+    Test that the items of a session are matched against the typed text ignoring case, with their filterText if they
+    have one
+    """
+    items = [
+        CompletionHandle({"completionText": text, "kind": 6}, lsp_item, None)
+        for text, lsp_item in [
+            ("getValue", {"label": "getValue"}),
+            ("GetValue", {"label": "GetValue"}),
+            ("getter", {"label": "getter"}),
+            ("self.value", {"label": "value", "filterText": "value"}),
+        ]
+    ]
+    session = CompletionSession(0, 4, 0, items)
+    assert [item.completion_text for item in session.filter("x = getv", 0, 8, 0)] == ["getValue", "GetValue"]
+    assert [item.completion_text for item in session.filter("x = GET", 0, 7, 0)] == ["getValue", "GetValue", "getter"]
+    assert [item.completion_text for item in session.filter("x = Val", 0, 7, 0)] == ["self.value"]
+
+
+@pytest.mark.asyncio
+async def test_completions_within_an_identifier_are_filtered_locally(fake_language_server):
+    """
+    Test that the requests following the typing of an identifier are answered from the previous result, and that
+    trigger characters and edits elsewhere go back to the server
+    """
+    with tempfile.TemporaryDirectory() as root:
+        with open(os.path.join(root, "main.py"), "w") as f:
+            f.write("x = \ny = 1\n")
+        config = MultilspyConfig(code_language=Language.PYTHON, completion_filtering=True)
+        lsp = fake_language_server(config, MultilspyLogger(), root, "--payload-size 12", True)
+        async with lsp.start_server():
+            # Files that are not open are always sent to the server
+            await lsp.request_completions("main.py", 0, 4)
+            await lsp.request_completions("main.py", 0, 4)
+            assert lsp.get_completion_report().round_trips == 1
+
+            with lsp.open_file("main.py"):
+                assert len(await lsp.request_completions("main.py", 0, 4)) == 12
+                assert lsp.get_completion_report().round_trips == 1
+
+                lsp.insert_text_at_position("main.py", 0, 4, "item_")
+                assert len(await lsp.request_completions("main.py", 0, 9)) == 12
+                lsp.insert_text_at_position("main.py", 0, 9, "1")
+                completions = await lsp.request_completions("main.py", 0, 10)
+                assert sorted(item["completionText"] for item in completions) == ["item_1", "item_10", "item_11"]
+                report = lsp.get_completion_report()
+                assert report.filtered and report.round_trips == 0
+
+                lsp.insert_text_at_position("main.py", 0, 10, ".")
+                assert len(await lsp.request_completions("main.py", 0, 11)) == 12
+                assert lsp.get_completion_report().round_trips == 1
+                assert len(await lsp.request_completions("main.py", 0, 11)) == 12
+                assert lsp.get_completion_report().filtered
+
+                lsp.insert_text_at_position("main.py", 1, 0, "z")
+                await lsp.request_completions("main.py", 0, 11)
+                assert lsp.get_completion_report().round_trips == 1
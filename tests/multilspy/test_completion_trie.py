@@ -0,0 +1,65 @@
+"""
+This file contains tests for the masks of the tokens of a vocabulary allowed by a completion result
+"""
+
+import os
+import random
+import re
+import tempfile
+
+import pytest
+from multilspy.completion_trie import CompletionTrie, TokenVocabulary
+from multilspy.multilspy_config import Language, MultilspyConfig
+from multilspy.multilspy_logger import MultilspyLogger
+
+pytest_plugins = ("pytest_asyncio",)
+
+
+def is_allowed(texts, prefix: str, token: str) -> bool:
+    """
+    The definition of the allowed tokens, checked against every completion
+    """
+    if not token:
+        return False
+    typed = prefix + token
+    return any(
+        text.startswith(typed) or (typed.startswith(text) and re.match(r"\w", typed[len(text)]) is None)
+        for text in texts
+    )
+
+
+def test_masks_match_the_definition():
+    """
+    Test that the masks of random completions and vocabularies agree with checking every token against every
+    completion, and that masks are cached
+    """
+    rng = random.Random(0)
+    alphabet = ["a", "b", "_", "1", "(", ".", " ", "é"]
+    for _ in range(20):
+        texts = ["".join(rng.choice("ab_1é") for _ in range(rng.randrange(1, 6))) for _ in range(rng.randrange(1, 30))]
+        tokens = ["".join(rng.choice(alphabet) for _ in range(rng.randrange(0, 4))) for _ in range(300)]
+        vocabulary = TokenVocabulary(tokens)
+        trie = CompletionTrie(texts)
+        for prefix in ["", "a", "ab", "b_", "zz"]:
+            mask = trie.allowed_tokens(vocabulary, prefix)
+            assert list(mask) == [int(is_allowed(texts, prefix, token)) for token in tokens]
+            assert trie.allowed_tokens(vocabulary, prefix) is mask
+        assert trie.completions("a") == sorted({text for text in texts if text.startswith("a")})
+
+
+@pytest.mark.asyncio
+async def test_allowed_tokens_after_the_typed_identifier(fake_language_server):
+    """
+    Test that the mask of a position continues the identifier typed before it, and that tries are cached per result
+    """
+    with tempfile.TemporaryDirectory() as root:
+        with open(os.path.join(root, "main.py"), "w") as f:
+            f.write("x = item_1\n")
+        config = MultilspyConfig(code_language=Language.PYTHON)
+        lsp = fake_language_server(config, MultilspyLogger(), root, "--payload-size 12", True)
+        tokens = ["0", "1", "_1", "(", "0(", "2", "x", ""]
+        async with lsp.start_server():
+            mask = await lsp.request_allowed_tokens("main.py", 0, 10, TokenVocabulary(tokens))
+            assert [token for token, allowed in zip(tokens, mask) if allowed] == ["0", "1", "(", "0("]
+            completions = await lsp.request_completions("main.py", 0, 10)
+            assert lsp.get_completion_trie(completions) is lsp.get_completion_trie(list(reversed(completions)))
@@ -0,0 +1,69 @@
+"""
+This file contains tests for forking open files into independent documents, run against the loopback server in
+benchmarks/fake_language_server.py
+"""
+
+import asyncio
+import os
+import pathlib
+import tempfile
+
+import pytest
+from multilspy.multilspy_config import Language, MultilspyConfig
+from multilspy.multilspy_exceptions import MultilspyException
+from multilspy.multilspy_logger import MultilspyLogger
+
+pytest_plugins = ("pytest_asyncio",)
+
+
+@pytest.mark.asyncio
+async def test_forked_documents_are_edited_and_queried_independently(fake_language_server):
+    """
+    Test that forked documents are opened next to the file with its text, are edited and queried concurrently without
+    changing the file or each other, and are closed on discard, within the limit of forked documents
+    """
+    contents = "".join(f"value_{i} = {i}\n" for i in range(100))
+    with tempfile.TemporaryDirectory() as root:
+        with open(os.path.join(root, "main.py"), "w") as f:
+            f.write(contents)
+        with open(os.path.join(root, "main.fork2.py"), "w") as f:
+            f.write("\n")
+        config = MultilspyConfig(code_language=Language.PYTHON, max_forked_files=3)
+        lsp = fake_language_server(config, MultilspyLogger(), root, "--latency 50", True)
+        async with lsp.start_server():
+            opened = []
+            notify_open = lsp.server.notify.did_open_text_document
+            lsp.server.notify.did_open_text_document = lambda params: (opened.append(params), notify_open(params))
+
+            with lsp.open_file("main.py"):
+                forks = lsp.fork_file("main.py", 2)
+                assert forks == ["main.fork1.py", "main.fork3.py"]
+                assert [(params["textDocument"]["uri"], params["textDocument"]["text"]) for params in opened[1:]] == [
+                    (pathlib.Path(root, fork).as_uri(), contents) for fork in forks
+                ]
+                assert lsp.fork_file(forks[0]) == ["main.fork4.py"]
+                with pytest.raises(MultilspyException):
+                    lsp.fork_file("main.py")
+
+                for i, fork in enumerate(forks):
+                    lsp.insert_text_at_position(fork, 50, 0, f"fork_{i} = {i}\n")
+                assert lsp.get_open_file_text("main.py") == contents
+                for i, fork in enumerate(forks):
+                    assert lsp.get_open_file_text(fork).splitlines()[50] == f"fork_{i} = {i}"
+                    assert lsp.get_open_file_text(fork).splitlines()[51] == "value_50 = 50"
+
+                results = await asyncio.gather(*[lsp.request_definition(fork, 50, 0) for fork in forks])
+                assert (await lsp.server.send_request("test/stats"))["maxInFlight"] == len(forks)
+                assert [result[0]["relativePath"] for result in results] == forks
+
+                with lsp.open_file(forks[1]):
+                    with pytest.raises(MultilspyException):
+                        lsp.discard_fork(forks[1])
+                for fork in forks + ["main.fork4.py"]:
+                    lsp.discard_fork(fork)
+                with pytest.raises(MultilspyException):
+                    lsp.discard_fork(forks[0])
+                assert lsp.fork_file("main.py", 3) == ["main.fork1.py", "main.fork3.py", "main.fork4.py"]
+            stats = lsp.get_open_file_stats()
+            assert (stats.did_open, stats.did_close) == (7, 4)
+        assert lsp.open_file_buffers == {}
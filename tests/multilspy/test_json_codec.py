@@ -0,0 +1,40 @@
+"""
+This file contains tests for the JSON codecs used by the JSON-RPC client
+"""
+
+import pytest
+from multilspy.lsp_protocol_handler.json_codec import JSON_CODECS, StdlibJsonCodec, get_json_codec
+
+
+def available_codecs():
+    codecs = []
+    for name in JSON_CODECS:
+        try:
+            codecs.append(get_json_codec(name))
+        except ImportError:
+            continue
+    return codecs
+
+
+@pytest.mark.parametrize("codec", available_codecs(), ids=lambda codec: codec.name)
+def test_json_codec_round_trip(codec):
+    """
+    Test that every installed codec produces output that decodes to the same payload with the stdlib codec
+    """
+    payload = {
+        "jsonrpc": "2.0",
+        "id": 12,
+        "result": [{"uri": "file:///tmp/ü.py", "range": {"start": {"line": 1, "character": 2}}, "ok": True, "x": None}],
+        "big": 2**70,
+    }
+    encoded = codec.encode(payload)
+    assert isinstance(encoded, bytes)
+    assert StdlibJsonCodec().decode(encoded) == payload
+    assert codec.decode(memoryview(encoded)) == payload
+    with pytest.raises(codec.decode_errors):
+        codec.decode(memoryview(b'{"id": '))
+
+
+def test_get_json_codec_rejects_unknown_names():
+    with pytest.raises(ValueError):
+        get_json_codec("yaml")
@@ -0,0 +1,48 @@
+"""
+This file contains tests for keeping files open in the Language Server after their last use, run against the
+loopback server in benchmarks/fake_language_server.py
+"""
+
+import os
+import tempfile
+
+import pytest
+from multilspy.multilspy_config import Language, MultilspyConfig
+from multilspy.multilspy_logger import MultilspyLogger
+
+pytest_plugins = ("pytest_asyncio",)
+
+
+@pytest.mark.asyncio
+async def test_recently_used_files_are_kept_open(fake_language_server):
+    """
+    Test that files stay open after their last use up to the configured count, and are reopened when they
+    changed on disk or were edited
+    """
+    config = MultilspyConfig(code_language=Language.PYTHON, keep_open_files=2)
+    with tempfile.TemporaryDirectory() as root:
+        for name in ["a.py", "b.py", "c.py"]:
+            with open(os.path.join(root, name), "w") as f:
+                f.write(f"# {name}\n")
+        lsp = fake_language_server(config, MultilspyLogger(), root, in_process=True)
+        async with lsp.start_server():
+            stats = lsp.get_open_file_stats()
+            for _ in range(5):
+                await lsp.request_definition("a.py", 0, 0)
+                await lsp.request_hover("b.py", 0, 0)
+            assert (stats.did_open, stats.did_close, stats.reused) == (2, 0, 8)
+            assert len(lsp.idle_files) == 2
+
+            await lsp.request_references("c.py", 0, 0)
+            assert (stats.did_open, stats.did_close, stats.evictions) == (3, 1, 1)
+            assert len(lsp.open_file_buffers) == 2
+
+            with open(os.path.join(root, "c.py"), "w") as f:
+                f.write("# changed on disk\n")
+            with lsp.open_file("c.py"):
+                assert lsp.get_open_file_text("c.py") == "# changed on disk\n"
+                lsp.insert_text_at_position("c.py", 0, 0, "x = 1\n")
+            assert (stats.did_open, stats.did_close) == (4, 3)
+            with lsp.open_file("c.py"):
+                assert lsp.get_open_file_text("c.py") == "# changed on disk\n"
+        assert lsp.open_file_buffers == {}
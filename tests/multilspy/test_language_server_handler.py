@@ -0,0 +1,331 @@
+"""
+This file contains tests for the JSON-RPC client LanguageServerHandler, run against the loopback
+server in benchmarks/fake_language_server.py
+"""
+
+import asyncio
+import gc
+import os
+import socket
+import sys
+import tempfile
+import tracemalloc
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+import pytest
+from multilspy.lsp_protocol_handler.lsp_types import ErrorCodes, LSPErrorCodes
+from multilspy.lsp_protocol_handler.server import Error, LanguageServerHandler, ProcessLaunchInfo
+
+pytest_plugins = ("pytest_asyncio",)
+
+FAKE_SERVER = str(os.path.join(os.path.dirname(__file__), "..", "..", "benchmarks", "fake_language_server.py"))
+
+
+@asynccontextmanager
+async def start_fake_server(server_args: str = "", launch_kwargs: dict = None, **kwargs) -> AsyncIterator[LanguageServerHandler]:
+    """
+    Starts the fake language server and yields a LanguageServerHandler connected to it
+    """
+    launch_info = ProcessLaunchInfo(
+        cmd=f'"{sys.executable}" "{FAKE_SERVER}" {server_args}',
+        env={"PYTHONPATH": os.pathsep.join(sys.path)},
+        **(launch_kwargs or {}),
+    )
+    handler = LanguageServerHandler(launch_info, **kwargs)
+    await handler.start()
+    try:
+        yield handler
+    finally:
+        await handler.shutdown()
+        await handler.stop()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_are_correlated():
+    """
+    Test that concurrent requests are each resolved with their own response
+    """
+    async with start_fake_server() as handler:
+        results = await asyncio.gather(*[handler.send_request("test/echo", {"n": i}) for i in range(200)])
+        assert results == [{"n": i} for i in range(200)]
+        assert handler._response_handlers == {}
+
+
+@pytest.mark.asyncio
+async def test_socket_transports():
+    """
+    Test that the handler communicates with servers listening on TCP and Unix domain sockets
+    """
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    async with start_fake_server(f"--tcp {port}", {"transport": "tcp", "port": port}) as handler:
+        assert handler.transport.stderr is not None
+        assert await handler.send_request("test/echo", {"over": "tcp"}) == {"over": "tcp"}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        socket_path = os.path.join(tmp_dir, "lsp.sock")
+        async with start_fake_server(f'--unix "{socket_path}"', {"transport": "unix", "socket_path": socket_path}) as handler:
+            assert await handler.send_request("test/echo", {"over": "unix"}) == {"over": "unix"}
+
+
+@pytest.mark.asyncio
+async def test_request_timeout_sends_cancel_request():
+    """
+    Test that a request timing out is reported to the server with $/cancelRequest and counted
+    """
+    sent_methods = []
+
+    def logger(source, target, payload):
+        if source == "client" and target == "server":
+            sent_methods.append(payload.get("method"))
+
+    async with start_fake_server(logger=logger, request_timeout=0.2) as handler:
+        with pytest.raises(asyncio.TimeoutError):
+            await handler.send_request("test/hang", {"hang": True})
+        with pytest.raises(asyncio.TimeoutError):
+            await handler.send_with_timeout(0.05).definition({"hang": True})
+
+        task = asyncio.ensure_future(handler.send_request("test/hang", {"hang": True}, timeout=10))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        # The server answers the cancelled requests with RequestCancelled, which must be ignored
+        assert await handler.send_request("test/echo", {"ok": True}) == {"ok": True}
+        assert sent_methods.count("$/cancelRequest") == 3
+        assert handler.request_stats.timed_out == 2
+        assert handler.request_stats.cancelled == 1
+
+
+@pytest.mark.asyncio
+async def test_server_cancellation_errors_are_counted():
+    """
+    Test that RequestCancelled and ContentModified errors from the server are raised and counted
+    """
+    async with start_fake_server() as handler:
+        for code in [LSPErrorCodes.RequestCancelled, LSPErrorCodes.ContentModified]:
+            with pytest.raises(Error) as exc_info:
+                await handler.send_request("test/error", {"error": {"code": code, "message": "busy"}})
+            assert exc_info.value.code == code
+        assert handler.request_stats.server_cancelled == 1
+        assert handler.request_stats.content_modified == 1
+
+
+@pytest.mark.asyncio
+async def test_malformed_responses_do_not_stop_the_read_loop():
+    """
+    Test that responses that cannot be handled are logged, and that the requests sent before and after them are
+    still answered
+    """
+    logged = []
+
+    def logger(source, target, payload):
+        if source == "client" and target == "logger":
+            logged.append(payload)
+
+    async with start_fake_server(logger=logger, request_timeout=5) as handler:
+        pending = asyncio.ensure_future(handler.send_request("test/echo", {"before": True}))
+        handler._handle_body(memoryview(b'{"jsonrpc": "2.0", "id": [1], "result": null}'))
+        handler._handle_body(memoryview(b"1"))
+        with pytest.raises(Error) as exc_info:
+            await handler.send_request("test/error", {"error": {"code": -32603}})
+        assert exc_info.value.code == ErrorCodes.InvalidRequest
+        assert await pending == {"before": True}
+        assert await handler.send_request("test/echo", {"after": True}) == {"after": True}
+        assert len([message for message in logged if message.startswith("Error handling server payload")]) == 2
+
+
+@pytest.mark.asyncio
+async def test_task_registry_memory_stays_flat_under_sustained_load():
+    """
+    Soak test: dispatching many notifications and responses must not grow the task registry or memory
+    """
+    handler = LanguageServerHandler(ProcessLaunchInfo(cmd=""))
+    handled = 0
+
+    async def on_notification(params):
+        nonlocal handled
+        handled += 1
+
+    handler.on_notification("test/notification", on_notification)
+    body = memoryview(handler.codec.encode({"jsonrpc": "2.0", "method": "test/notification", "params": {"x": 1}}))
+
+    async def run_round() -> None:
+        for i in range(2000):
+            handler._handle_body(body)
+            handler.send_response(i, None)
+        while handler.get_in_flight_task_count():
+            await asyncio.sleep(0)
+
+    # asyncio's global WeakSet of tasks grows its hash table in one step once it has held enough
+    # tasks, which is unrelated to the handler
+    filters = [tracemalloc.Filter(False, "*/_weakrefset.py")]
+    tracemalloc.start()
+    try:
+        # Warm up rounds let the event loop and allocator reach their steady state before measuring
+        for _ in range(3):
+            await run_round()
+        gc.collect()
+        baseline = tracemalloc.take_snapshot().filter_traces(filters)
+        for _ in range(10):
+            await run_round()
+        gc.collect()
+        snapshot = tracemalloc.take_snapshot().filter_traces(filters)
+        growth = sum(stat.size_diff for stat in snapshot.compare_to(baseline, "filename"))
+    finally:
+        tracemalloc.stop()
+
+    assert handled == 13 * 2000
+    assert handler.get_in_flight_task_count() == 0
+    assert growth < 256 * 1024, growth
+
+
+@pytest.mark.asyncio
+async def test_recorded_session_replays_without_server():
+    """
+    Test that a session recorded against the server replays to the same results without launching it
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        trace_path = os.path.join(tmp_dir, "session.trace")
+        async with start_fake_server(launch_kwargs={"record_trace_path": trace_path}) as handler:
+            recorded = [await handler.send_request("test/echo", {"n": i}) for i in range(20)]
+            handler.notify.initialized({})
+
+        launch_info = ProcessLaunchInfo(cmd="", transport="replay", replay_trace_path=trace_path, replay_speed=0)
+        handler = LanguageServerHandler(launch_info)
+        await handler.start()
+        try:
+            assert handler.process is None
+            replayed = [await handler.send_request("test/echo", {"n": i}) for i in range(20)]
+        finally:
+            await handler.stop()
+        assert replayed == recorded == [{"n": i} for i in range(20)]
+
+
+@pytest.mark.asyncio
+async def test_stderr_is_kept_in_a_bounded_buffer():
+    """
+    Test that only the most recent stderr lines are kept, and only passed to the logger when forwarding is enabled
+    """
+    for forward_stderr in [False, True]:
+        logged = []
+        logger = lambda source, target, payload: logged.append(payload) if target == "logger" else None
+        async with start_fake_server("--stderr-lines 50", logger=logger, stderr_buffer_lines=5, forward_stderr=forward_stderr) as handler:
+            for _ in range(100):
+                if handler.get_stderr_tail() and handler.get_stderr_tail()[-1] == "log line 49":
+                    break
+                await asyncio.sleep(0.05)
+            assert handler.get_stderr_tail() == [f"log line {i}" for i in range(45, 50)]
+            assert handler.get_stderr_tail(2) == ["log line 48", "log line 49"]
+        stderr_logs = [message for message in logged if message.startswith("LSP stderr: ")]
+        assert len(stderr_logs) == (50 if forward_stderr else 0)
+
+
+@pytest.mark.asyncio
+async def test_unhandled_notifications_are_dropped_without_decoding():
+    """
+    Test that notifications that are discarded or have no handler are dropped before decoding, while requests
+    without a handler are still answered
+    """
+    decoded = []
+    handler = LanguageServerHandler(ProcessLaunchInfo(cmd=""), logger=lambda source, target, payload: decoded.append(payload))
+    handled = []
+
+    async def on_log_message(params):
+        handled.append(params)
+
+    handler.on_notification("window/logMessage", on_log_message)
+    handler.discard_notification("textDocument/publishDiagnostics")
+    messages = [
+        {"jsonrpc": "2.0", "method": "textDocument/publishDiagnostics", "params": {"uri": "file:///a", "diagnostics": []}},
+        {"method": "$/progress", "jsonrpc": "2.0", "params": {"token": 1, "value": {"kind": "report"}}},
+        {"jsonrpc": "2.0", "method": "custom/notification", "params": {"nested": {"method": "x"}}},
+        {"jsonrpc": "2.0", "method": "window/logMessage", "params": {"type": 3, "message": "hello"}},
+        {"jsonrpc": "2.0", "method": "workspace/configuration", "id": 7, "params": {"items": []}},
+        {"jsonrpc": "2.0", "id": 8, "method": "custom/request", "params": {}},
+    ]
+    for message in messages:
+        handler._handle_body(memoryview(handler.codec.encode(message)))
+    while handler.get_in_flight_task_count():
+        await asyncio.sleep(0)
+
+    assert handler.discarded_notifications == {
+        "textDocument/publishDiagnostics": 1,
+        "$/progress": 1,
+        "custom/notification": 1,
+    }
+    assert [payload.get("method") for payload in decoded if isinstance(payload, dict)] == [
+        "window/logMessage",
+        "workspace/configuration",
+        "custom/request",
+    ]
+    assert handled == [{"type": 3, "message": "hello"}]
+
+    handler.on_notification("textDocument/publishDiagnostics", on_log_message)
+    handler._handle_body(memoryview(handler.codec.encode(messages[0])))
+    while handler.get_in_flight_task_count():
+        await asyncio.sleep(0)
+    assert handled[-1] == messages[0]["params"]
+
+
+@pytest.mark.asyncio
+async def test_notifications_with_the_method_after_the_params_are_discarded():
+    """
+    Test that notifications whose method cannot be read before decoding, as "params" is serialized first, are still
+    discarded once decoded, and still reach the watchers of their method
+    """
+    handler = LanguageServerHandler(ProcessLaunchInfo(cmd=""))
+    handled, watched = [], []
+
+    async def on_notification(params):
+        handled.append(params)
+
+    handler.on_notification("textDocument/publishDiagnostics", on_notification)
+    handler.discard_notification("textDocument/publishDiagnostics")
+    handler.on_notification("window/logMessage", on_notification)
+    handler.watch_notification("$/progress", watched.append)
+    diagnostics = [{"message": "x" * 100, "range": {}} for _ in range(1000)]
+    messages = [
+        {"params": {"uri": "file:///a", "diagnostics": diagnostics}, "method": "textDocument/publishDiagnostics"},
+        {"params": {"nested": {"method": "x"}}, "jsonrpc": "2.0", "method": "custom/notification"},
+        {"params": {"token": 1, "value": {"kind": "end"}}, "method": "$/progress", "jsonrpc": "2.0"},
+        {"params": {"type": 3, "message": "hello"}, "method": "window/logMessage"},
+    ]
+    for message in messages:
+        handler._handle_body(memoryview(handler.codec.encode(message)))
+    while handler.get_in_flight_task_count():
+        await asyncio.sleep(0)
+
+    assert handler.discarded_notifications == {"textDocument/publishDiagnostics": 1, "custom/notification": 1}
+    assert handled == [{"type": 3, "message": "hello"}]
+    assert watched == [{"token": 1, "value": {"kind": "end"}}]
+
+
+@pytest.mark.asyncio
+async def test_large_array_results_are_streamed():
+    """
+    Test that send_request_stream yields the elements of large results decoded while the body is read, and of
+    small results read whole
+    """
+    logged = []
+    params = {"textDocument": {"uri": "file:///repo/main.py"}, "position": {"line": 0, "character": 0}}
+    async with start_fake_server("--payload-size 20000", logger=lambda source, target, payload: logged.append(payload)) as handler:
+        items = [item async for item in handler.send_request_stream("textDocument/references", params)]
+        assert items == [
+            {"uri": "file:///repo/main.py", "range": {"start": {"line": i, "character": 0}, "end": {"line": i, "character": 8}}}
+            for i in range(20000)
+        ]
+        assert {"id": 1, "result": "<streamed>"} in logged
+
+        # Stopping the iteration early cancels the request
+        stream = handler.send_request_stream("textDocument/references", params)
+        async for item in stream:
+            break
+        await stream.aclose()
+        assert handler._response_streams == {}
+
+        assert [item async for item in handler.send_request_stream("test/echo", [1, 2, 3])] == [1, 2, 3]
+        assert [item async for item in handler.send_request_stream("shutdown")] == []
@@ -0,0 +1,238 @@
+"""
+This file contains tests for the transport primitives used by the JSON-RPC client
+"""
+
+import asyncio
+import json
+import threading
+
+import pytest
+from multilspy.lsp_protocol_handler.server import create_message
+from multilspy.lsp_protocol_handler.transport import BodySink, FrameReader, MessageWriter
+
+pytest_plugins = ("pytest_asyncio",)
+
+
+def frame(payload: dict) -> bytes:
+    return b"".join(create_message(payload))
+
+
+@pytest.mark.asyncio
+async def test_frame_reader_parses_frames_split_across_chunks():
+    """
+    Test that frames split at arbitrary byte boundaries, including inside the header, are reassembled
+    """
+    payloads = [{"jsonrpc": "2.0", "id": i, "result": {"text": "é" * i}} for i in range(20)]
+    data = b"".join(frame(p) for p in payloads)
+
+    for chunk_size in [1, 7, 64, len(data)]:
+        reader = FrameReader(asyncio.StreamReader())
+        bodies = []
+        for start in range(0, len(data), chunk_size):
+            bodies.extend(bytes(body) for body in reader.feed(data[start : start + chunk_size]))
+        assert [json.loads(body) for body in bodies] == payloads
+
+
+@pytest.mark.asyncio
+async def test_frame_reader_skips_header_blocks_without_content_length():
+    """
+    Test that stray output without a Content-Length header is ignored
+    """
+    reader = FrameReader(asyncio.StreamReader())
+    data = b"server started\r\n\r\n" + b"some log line\r\n" + frame({"id": 1}) + b"Content-Length: abc\r\n\r\n" + frame({"id": 2})
+    bodies = reader.feed(data)
+    assert [json.loads(bytes(body)) for body in bodies] == [{"id": 1}, {"id": 2}]
+
+
+@pytest.mark.asyncio
+async def test_frame_reader_skips_junk_before_a_header():
+    """
+    Test that stray output directly before a header, in the same header block, does not hide the frame
+    """
+    assert FrameReader(asyncio.StreamReader()).feed(b"some log line\nContent-Length: 2\r\n\r\n{}") == [b"{}"]
+
+    data = b"\x00\xffjunk\nContent-Length: abc\r\nsome log line\r\n" + frame({"id": 1}) + frame({"id": 2})
+    for chunk_size in [1, 5, len(data)]:
+        reader = FrameReader(asyncio.StreamReader())
+        bodies = []
+        for start in range(0, len(data), chunk_size):
+            bodies.extend(bytes(body) for body in reader.feed(data[start : start + chunk_size]))
+        assert [json.loads(body) for body in bodies] == [{"id": 1}, {"id": 2}]
+
+
+@pytest.mark.asyncio
+async def test_frame_reader_reads_until_eof():
+    """
+    Test that read_frames returns batches of frames and an empty list at EOF
+    """
+    stream = asyncio.StreamReader()
+    stream.feed_data(frame({"id": 1}) + frame({"id": 2}) + frame({"id": 3})[:10])
+    stream.feed_eof()
+    reader = FrameReader(stream)
+    bodies = await reader.read_frames()
+    assert [json.loads(bytes(body)) for body in bodies] == [{"id": 1}, {"id": 2}]
+    assert await reader.read_frames() == []
+
+
+class RecordingSink(BodySink):
+    def __init__(self) -> None:
+        self.data = b""
+        self.closed = False
+
+    def feed(self, data: bytes) -> None:
+        self.data += data
+
+    def close(self) -> None:
+        self.closed = True
+
+
+@pytest.mark.asyncio
+async def test_frame_reader_feeds_large_bodies_to_sink():
+    """
+    Test that large bodies accepted by the sink factory are fed to the sink instead of being returned,
+    while the frames around them are returned as usual
+    """
+    large = frame({"id": 2, "result": ["x" * 100] * 100})
+    data = frame({"id": 1}) + large + frame({"id": 3})
+    prefixes = []
+    sinks = []
+
+    def sink_factory(prefix: bytes):
+        prefixes.append(prefix)
+        sinks.append(RecordingSink())
+        return sinks[-1]
+
+    for chunk_size in [1, 7, 64, 1000]:
+        prefixes.clear()
+        sinks.clear()
+        reader = FrameReader(asyncio.StreamReader(), sink_factory=sink_factory, stream_min_size=1000)
+        bodies = []
+        for start in range(0, len(data), chunk_size):
+            bodies.extend(bytes(body) for body in reader.feed(data[start : start + chunk_size]))
+        assert [json.loads(body) for body in bodies] == [{"id": 1}, {"id": 3}]
+        assert len(sinks) == 1 and sinks[0].closed
+        assert json.loads(sinks[0].data) == {"id": 2, "result": ["x" * 100] * 100}
+        assert sinks[0].data.startswith(prefixes[0])
+
+    # Bodies declined by the factory are returned whole
+    reader = FrameReader(asyncio.StreamReader(), sink_factory=lambda prefix: None, stream_min_size=1000)
+    bodies = []
+    for start in range(0, len(data), 100):
+        bodies.extend(bytes(body) for body in reader.feed(data[start : start + 100]))
+    assert [json.loads(body)["id"] for body in bodies] == [1, 2, 3]
+
+
+class RecordingStreamWriter:
+    """
+    Stands in for the asyncio.StreamWriter of the server's stdin, recording the writelines() calls
+    """
+
+    transport = None
+
+    def __init__(self) -> None:
+        self.writes = []
+        self.drains = 0
+        self.closing = False
+
+    def writelines(self, data) -> None:
+        self.writes.append(b"".join(data))
+
+    def is_closing(self) -> bool:
+        return self.closing
+
+    async def drain(self) -> None:
+        self.drains += 1
+
+
+@pytest.mark.asyncio
+async def test_message_writer_coalesces_messages_written_in_one_tick():
+    """
+    Test that all the messages queued during one event loop tick are written with a single call
+    """
+    stream = RecordingStreamWriter()
+    writer = MessageWriter(stream, asyncio.get_running_loop())
+    messages = [create_message({"method": "textDocument/didChange", "params": {"n": i}}) for i in range(100)]
+    for message in messages:
+        writer.write(message)
+    assert writer.get_queue_depth() == 100
+    assert stream.writes == []
+
+    await asyncio.sleep(0)
+    assert stream.writes == [b"".join(b"".join(message) for message in messages)]
+    assert writer.get_queue_depth() == 0
+    assert writer.stats.write_calls == 1
+    assert writer.stats.messages_written == 100
+    assert writer.stats.bytes_written == len(stream.writes[0])
+
+
+@pytest.mark.asyncio
+async def test_message_writer_applies_backpressure_above_high_water_mark():
+    """
+    Test that drain() only waits once the buffered bytes reach the high-water mark
+    """
+    stream = RecordingStreamWriter()
+    writer = MessageWriter(stream, asyncio.get_running_loop(), high_water_mark=1000)
+    writer.write(create_message({"n": 1}))
+    await writer.drain()
+    assert stream.drains == 0 and stream.writes == []
+
+    writer.write(create_message({"text": "x" * 1000}))
+    await writer.drain()
+    assert stream.drains == 1 and len(stream.writes) == 1
+    assert writer.stats.backpressure_waits == 1
+
+
+@pytest.mark.asyncio
+async def test_message_writer_applies_backpressure_to_notifications():
+    """
+    Test that notifications reaching the high-water mark make the next sender wait, even once they were flushed
+    """
+    stream = RecordingStreamWriter()
+    writer = MessageWriter(stream, asyncio.get_running_loop(), high_water_mark=1000)
+    for i in range(10):
+        writer.write(create_message({"method": "textDocument/didChange", "params": {"text": "x" * 200}}))
+    await asyncio.sleep(0)
+    assert len(stream.writes) == 1 and writer.get_queue_depth() == 0
+
+    writer.write(create_message({"n": 1}))
+    await writer.drain()
+    assert stream.drains == 1 and len(stream.writes) == 2
+    assert writer.stats.backpressure_waits == 1
+    writer.write(create_message({"n": 2}))
+    await writer.drain()
+    assert stream.drains == 1
+
+
+@pytest.mark.asyncio
+async def test_message_writer_does_not_count_messages_dropped_on_close():
+    """
+    Test that the messages flushed once the stream is closing are not counted as written
+    """
+    stream = RecordingStreamWriter()
+    writer = MessageWriter(stream, asyncio.get_running_loop())
+    writer.write(create_message({"n": 1}))
+    stream.closing = True
+    await asyncio.sleep(0)
+    assert stream.writes == []
+    assert writer.get_queue_depth() == 0
+    assert (writer.stats.messages_queued, writer.stats.messages_written, writer.stats.write_calls) == (1, 0, 0)
+
+
+@pytest.mark.asyncio
+async def test_message_writer_accepts_writes_from_other_threads_in_order():
+    """
+    Test that messages written from a thread other than the event loop's are written in order
+    """
+    stream = RecordingStreamWriter()
+    writer = MessageWriter(stream, asyncio.get_running_loop())
+
+    def write_from_thread() -> None:
+        for i in range(50):
+            writer.write([str(i).encode(), b","])
+
+    thread = threading.Thread(target=write_from_thread)
+    thread.start()
+    thread.join()
+    while writer.stats.messages_written < 50:
+        await asyncio.sleep(0)
+    assert b"".join(stream.writes) == b"".join(f"{i},".encode() for i in range(50))
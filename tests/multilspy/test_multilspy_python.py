@@ -105,4 +105,34 @@ async def test_multilspy_python_black():
                         "end": {"line": 44, "character": 27},
                     },
                 },
-            ]
\ No newline at end of file
+            ]
+
+
+@pytest.mark.asyncio
+async def test_multilspy_python_black_batch():
+    """
+    Test the working of request_batch with python repository - black
+    """
+    code_language = Language.PYTHON
+    params = {
+        "code_language": code_language,
+        "repo_url": "https://github.com/psf/black/",
+        "repo_commit": "f3b50e466969f9142393ec32a4b2a383ffbe5f23"
+    }
+    with create_test_context(params) as context:
+        lsp = LanguageServer.create(context.config, context.logger, context.source_directory)
+
+        async with lsp.start_server():
+            mode_path = str(PurePath("src/black/mode.py"))
+            queries = [
+                ("references", mode_path, 163, 4),
+                ("definition", mode_path, 163, 4),
+                ("definition", str(PurePath("src/black/parsing.py")), 37, 11),
+            ]
+            results = await lsp.request_batch(queries, max_in_flight=2)
+
+            assert len(results) == 3
+            assert results[0] == await lsp.request_references(mode_path, 163, 4)
+            assert results[1] == await lsp.request_definition(mode_path, 163, 4)
+            assert [item["relativePath"] for item in results[2]] == [mode_path]
+            assert lsp.open_file_buffers == {}
@@ -0,0 +1,35 @@
+"""
+This file contains tests for request_batch, run against the loopback server in benchmarks/fake_language_server.py
+"""
+
+import os
+import tempfile
+
+import pytest
+from multilspy.multilspy_config import Language, MultilspyConfig
+from multilspy.multilspy_exceptions import MultilspyException
+from multilspy.multilspy_logger import MultilspyLogger
+
+pytest_plugins = ("pytest_asyncio",)
+
+
+@pytest.mark.asyncio
+async def test_failing_batch_releases_open_files(fake_language_server):
+    """
+    Test that the files opened by a batch are closed when a query fails and the other queries are cancelled
+    """
+    with tempfile.TemporaryDirectory() as root:
+        for name in ["a.py", "b.py", "c.py"]:
+            with open(os.path.join(root, name), "w") as f:
+                f.write(f"# {name}\n")
+        config = MultilspyConfig(code_language=Language.PYTHON)
+        lsp = fake_language_server(config, MultilspyLogger(), root, "--latency 500", True)
+        async with lsp.start_server():
+            queries = [("definition", name, 0, 0) for name in ["a.py", "b.py", "c.py"]] + [("hover", "d.py", 0, 0)]
+            with pytest.raises(MultilspyException):
+                await lsp.request_batch(queries)
+            # The queries of the other files were cancelled instead of waiting for their responses
+            assert lsp.server.request_stats.cancelled == 3
+            assert lsp.open_file_buffers == {}
+            stats = lsp.get_open_file_stats()
+            assert stats.did_open == stats.did_close == 3
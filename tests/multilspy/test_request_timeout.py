@@ -0,0 +1,39 @@
+"""
+This file contains tests for the timeouts of the LanguageServer requests, run against the loopback server in
+benchmarks/fake_language_server.py
+"""
+
+import asyncio
+import os
+import tempfile
+
+import pytest
+from multilspy.multilspy_config import Language, MultilspyConfig
+from multilspy.multilspy_logger import MultilspyLogger
+
+pytest_plugins = ("pytest_asyncio",)
+
+
+@pytest.mark.asyncio
+async def test_request_timeout_can_be_turned_off_per_call(fake_language_server):
+    """
+    Test that requests time out after the configured request_timeout without leaking their open file, and that an
+    explicit None timeout waits for the response
+    """
+    with tempfile.TemporaryDirectory() as root:
+        with open(os.path.join(root, "main.py"), "w") as f:
+            f.write("x = 1\n")
+        config = MultilspyConfig(code_language=Language.PYTHON, request_timeout=0.1)
+        server_args = " ".join(
+            f"--method-latency textDocument/{method}=300" for method in ["definition", "hover", "completion"]
+        )
+        lsp = fake_language_server(config, MultilspyLogger(), root, server_args, True)
+        async with lsp.start_server():
+            with pytest.raises(asyncio.TimeoutError):
+                await lsp.request_definition("main.py", 0, 0)
+            assert lsp.open_file_buffers == {}
+
+            assert len(await lsp.request_definition("main.py", 0, 0, timeout=None)) > 0
+            assert len(await lsp.request_hover("main.py", 0, 0, timeout=None)) > 0
+            assert len(await lsp.request_completions("main.py", 0, 0, timeout=None)) > 0
+            assert lsp.get_request_stats().timed_out == 1
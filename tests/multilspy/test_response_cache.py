@@ -0,0 +1,192 @@
+"""
+This file contains tests for the response cache of LanguageServer, run against the loopback server in
+benchmarks/fake_language_server.py
+"""
+
+import os
+import sqlite3
+import tempfile
+
+import pytest
+from multilspy.multilspy_config import Language, MultilspyConfig
+from multilspy.multilspy_exceptions import MultilspyException
+from multilspy.multilspy_logger import MultilspyLogger
+from multilspy.response_cache import MISSING, PersistentResponseCache, ResponseCache
+
+pytest_plugins = ("pytest_asyncio",)
+
+
+def test_least_recently_used_entries_are_evicted():
+    """
+    Test that the cache evicts the least recently used entries beyond its entry count and size bounds
+    """
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", [1])
+    cache.put("b", [2])
+    assert cache.get("a") == [1]
+    cache.put("c", [3])
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == [1] and cache.get("c") == [3]
+    assert (cache.stats.hits, cache.stats.misses, cache.stats.evictions, cache.stats.entries) == (3, 1, 1, 2)
+
+    cache = ResponseCache(max_entries=100, max_bytes=20)
+    cache.put("a", "x" * 9)
+    cache.put("b", "y" * 9)
+    assert cache.get("a") is MISSING and cache.get("b") == "y" * 9
+    assert cache.stats.size == 11
+    cache.put("c", "z" * 100)
+    assert len(cache) == 1
+
+
+@pytest.mark.asyncio
+async def test_repeated_queries_are_answered_from_the_cache(fake_language_server):
+    """
+    Test that repeated queries of an unchanged file are answered from the cache, and that editing an open file only
+    misses the responses that can depend on its edited contents, which are answered again once it is rolled back
+    """
+    config = MultilspyConfig(code_language=Language.PYTHON, response_cache_size=16)
+    with tempfile.TemporaryDirectory() as root:
+        for name in ["main.py", "other.py"]:
+            with open(os.path.join(root, name), "w") as f:
+                f.write("def f():\n    return 1\n")
+        lsp = fake_language_server(config, MultilspyLogger(), root, "--payload-size 3", in_process=True)
+        async with lsp.start_server():
+            first = await lsp.request_definition("main.py", 0, 4)
+            first[0]["uri"] = "modified by the caller"
+            second = await lsp.request_definition("main.py", 0, 4)
+            assert second[0]["uri"] != "modified by the caller"
+            assert await lsp.request_hover("main.py", 0, 4) == await lsp.request_hover("main.py", 0, 4)
+            stats = lsp.get_response_cache_stats()
+            assert (stats.hits, stats.misses, stats.entries) == (2, 2, 2)
+
+            with lsp.open_file("main.py"):
+                await lsp.request_references("main.py", 0, 4)
+                await lsp.request_references("other.py", 0, 4)
+                checkpoint = lsp.checkpoint("main.py")
+                lsp.insert_text_at_position("main.py", 0, 0, "# comment\n")
+                assert stats.entries == 4
+                await lsp.request_references("main.py", 0, 4)
+                await lsp.request_references("main.py", 0, 4)
+                await lsp.request_references("other.py", 0, 4)
+                assert (stats.hits, stats.misses) == (3, 6)
+
+                lsp.rollback(checkpoint)
+                await lsp.request_references("main.py", 0, 4)
+                await lsp.request_references("other.py", 0, 4)
+            assert (stats.hits, stats.misses, stats.entries) == (5, 6, 6)
+
+
+@pytest.mark.asyncio
+async def test_cached_requests_report_errors_like_uncached_ones(fake_language_server):
+    """
+    Test that with the cache enabled, requests made before the server is started or on a missing file raise
+    MultilspyException
+    """
+    config = MultilspyConfig(code_language=Language.PYTHON, response_cache_size=16)
+    with tempfile.TemporaryDirectory() as root:
+        with open(os.path.join(root, "main.py"), "w") as f:
+            f.write("def f():\n    return 1\n")
+        lsp = fake_language_server(config, MultilspyLogger(), root, in_process=True)
+        with pytest.raises(MultilspyException):
+            await lsp.request_definition("main.py", 0, 4)
+        async with lsp.start_server():
+            with pytest.raises(MultilspyException):
+                await lsp.request_definition("missing.py", 0, 4)
+            assert lsp.get_response_cache_stats().misses == 0
+
+
+def test_persistent_cache_is_shared_and_database_errors_are_misses():
+    """
+    Test that hits do not hold a write lock on the database shared by another cache, and that failing database
+    operations are counted as errors and misses instead of raising
+    """
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, "responses.sqlite")
+        first, second = PersistentResponseCache(path, 1 << 20), PersistentResponseCache(path, 1 << 20)
+        second.timeout = first.timeout = 0.1
+        first.put("a", [1])
+        assert first.get("a") == [1]
+        second.put("b", [2])
+        assert (first.get("b"), second.get("a")) == ([2], [1])
+        assert first.stats.errors == second.stats.errors == 0
+
+        with sqlite3.connect(path) as connection:
+            connection.execute("BEGIN EXCLUSIVE")
+            first.put("c", [3])
+            assert first.stats.errors == 1 and first.stats.entries == 2
+            connection.rollback()
+            connection.execute("DROP TABLE responses")
+        assert first.get("a") is MISSING
+        assert (first.stats.errors, first.stats.misses) == (2, 1)
+        first.close()
+        second.close()
+
+
+@pytest.mark.asyncio
+async def test_persistent_cache_answers_later_runs_without_starting_the_server(fake_language_server):
+    """
+    Test that responses are kept across runs in the persistent cache, and that the server is only started on a miss
+    """
+    with tempfile.TemporaryDirectory() as root:
+        with open(os.path.join(root, "main.py"), "w") as f:
+            f.write("def f():\n    return 1\n")
+        config = MultilspyConfig(
+            code_language=Language.PYTHON,
+            persistent_cache=True,
+            persistent_cache_path=os.path.join(root, "cache", "responses.sqlite"),
+        )
+
+        lsp = fake_language_server(config, MultilspyLogger(), root, "--payload-size 3", in_process=True)
+        async with lsp.start_server():
+            with lsp.open_file("main.py"):
+                assert lsp.server.transport is None
+                expected = [await lsp.request_references("main.py", 0, i) for i in range(3)]
+                assert lsp.server.transport is not None
+        assert lsp.get_persistent_cache_stats().misses == 3
+
+        lsp = fake_language_server(config, MultilspyLogger(), root, "--payload-size 3", in_process=True)
+        async with lsp.start_server():
+            assert [await lsp.request_references("main.py", 0, i) for i in range(3)] == expected
+            assert lsp.server.transport is None
+            assert lsp.get_persistent_cache_stats().hits == 3
+
+            with open(os.path.join(root, "main.py"), "a") as f:
+                f.write("f()\n")
+            assert await lsp.request_references("main.py", 0, 0) == expected[0]
+            assert lsp.server.transport is not None
+        stats = lsp.get_persistent_cache_stats()
+        assert (stats.hits, stats.misses, stats.entries) == (3, 1, 4)
+
+
+@pytest.mark.asyncio
+async def test_persistent_cache_is_keyed_by_position_encoding(fake_language_server):
+    """
+    Test that the columns answered from the persistent cache before the server is started are in the first offered
+    position encoding, that responses in other encodings are not served, and that a server choosing another encoding
+    is rejected
+    """
+    with tempfile.TemporaryDirectory() as root:
+        with open(os.path.join(root, "main.py"), "w") as f:
+            f.write("def f():\n    return 1\n")
+        cache_path = os.path.join(root, "cache", "responses.sqlite")
+        for position_encodings in [("utf-16",), ("utf-32", "utf-16")]:
+            config = MultilspyConfig(
+                code_language=Language.PYTHON,
+                persistent_cache=True,
+                persistent_cache_path=cache_path,
+                position_encodings=position_encodings,
+            )
+            lsp = fake_language_server(config, MultilspyLogger(), root, "", in_process=True)
+            async with lsp.start_server():
+                assert lsp.position_encoding == position_encodings[0]
+                await lsp.request_references("main.py", 0, 0)
+                assert lsp.position_encoding == position_encodings[0]
+            stats = lsp.get_persistent_cache_stats()
+            assert (stats.hits, stats.misses) == (0, 1)
+
+        lsp = fake_language_server(config, MultilspyLogger(), root, "--position-encodings utf-16", in_process=True)
+        async with lsp.start_server():
+            assert lsp.position_encoding == "utf-32"
+            with pytest.raises(MultilspyException):
+                await lsp.request_references("main.py", 0, 1)
+            assert lsp.position_encoding == "utf-32"
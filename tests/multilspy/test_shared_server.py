@@ -0,0 +1,78 @@
+"""
+This file contains tests for connecting to a language server that is already running, run against the fake language
+server in benchmarks/fake_language_server.py
+"""
+
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+
+import pytest
+from multilspy.multilspy_config import Language, MultilspyConfig
+from multilspy.multilspy_exceptions import MultilspyException
+from multilspy.multilspy_logger import MultilspyLogger
+
+pytest_plugins = ("pytest_asyncio",)
+
+
+@pytest.mark.asyncio
+async def test_running_server_is_not_shut_down(fake_language_server, fake_server_script):
+    """
+    Test that a LanguageServer configured with the "tcp" transport connects to the language server already listening
+    on the port, and leaves it running on stop unless configured to shut it down
+    """
+    with tempfile.TemporaryDirectory() as root:
+        with open(os.path.join(root, "main.py"), "w") as f:
+            f.write("value = 1\n")
+        for shutdown_server, expected in [(None, []), (True, ["shutdown", "exit"])]:
+            with socket.socket() as sock:
+                sock.bind(("127.0.0.1", 0))
+                port = sock.getsockname()[1]
+            process = await asyncio.create_subprocess_exec(
+                sys.executable, fake_server_script, "--tcp", str(port), env={"PYTHONPATH": os.pathsep.join(sys.path)}
+            )
+            try:
+                config = MultilspyConfig(
+                    code_language=Language.PYTHON, transport="tcp", port=port, shutdown_server=shutdown_server
+                )
+                lsp = fake_language_server(config, MultilspyLogger(), root)
+                assert lsp.server.process_launch_info.cmd == ""
+                sent = []
+                async with lsp.start_server():
+                    send_shutdown = lsp.server.send.shutdown
+                    notify_exit = lsp.server.notify.exit
+
+                    async def shutdown():
+                        sent.append("shutdown")
+                        return await send_shutdown()
+
+                    lsp.server.send.shutdown = shutdown
+                    lsp.server.notify.exit = lambda: (sent.append("exit"), notify_exit())
+                    result = await lsp.request_definition("main.py", 0, 0)
+                    assert result[0]["relativePath"] == "main.py"
+                assert sent == expected
+            finally:
+                if process.returncode is None:
+                    process.kill()
+                await process.wait()
+
+
+def test_socket_transports_are_validated(fake_language_server):
+    """
+    Test that launch_server is rejected for language servers that cannot be launched listening on a socket, and that
+    socket transports require the address of the server
+    """
+    for config in [
+        MultilspyConfig(code_language=Language.PYTHON, transport="tcp"),
+        MultilspyConfig(code_language=Language.PYTHON, transport="unix"),
+    ]:
+        with pytest.raises(MultilspyException, match="requires"):
+            fake_language_server(config, MultilspyLogger(), os.getcwd())
+    config = MultilspyConfig(code_language=Language.PYTHON, transport="tcp", port=1, launch_server=True)
+    with pytest.raises(MultilspyException):
+        fake_language_server(config, MultilspyLogger(), os.getcwd())
+    config = MultilspyConfig(code_language=Language.PYTHON, transport="pipe")
+    with pytest.raises(MultilspyException):
+        fake_language_server(config, MultilspyLogger(), os.getcwd())
@@ -0,0 +1,180 @@
+"""
+This file contains tests for TextBuffer, the line indexed text of the files open in the Language Server
+"""
+
+import os
+import random
+import tempfile
+
+import pytest
+from multilspy import text_buffer
+from multilspy.multilspy_config import Language, MultilspyConfig
+from multilspy.multilspy_logger import MultilspyLogger
+from multilspy.multilspy_types import Position
+from multilspy.multilspy_utils import TextUtils
+from multilspy.text_buffer import UTF8, UTF16, UTF32, TextBuffer
+
+pytest_plugins = ("pytest_asyncio",)
+
+
+def test_edits_and_conversions_match_the_string(monkeypatch):
+    """
+    Test that random edits spanning blocks give the same text as string slicing, and that position and offset
+    conversions agree with TextUtils
+    """
+    monkeypatch.setattr(text_buffer, "BLOCK_LINES", 4)
+    rng = random.Random(0)
+    alphabet = ["a", "b", "\n", "é", " "]
+    text = "".join(rng.choice(alphabet) for _ in range(300))
+    buffer = TextBuffer(text)
+
+    for _ in range(500):
+        offsets = sorted(rng.randrange(len(text) + 1) for _ in range(2))
+        start, end = (TextUtils.get_line_col_from_index(text, offset) for offset in offsets)
+        assert buffer.get_position(offsets[0]) == start
+        assert buffer.get_offset(*end) == TextUtils.get_index_from_line_col(text, *end) == offsets[1]
+
+        new_text = "".join(rng.choice(alphabet) for _ in range(rng.randrange(0, 40 if len(text) < 600 else 5)))
+        assert buffer.replace(*start, *end, new_text) == text[offsets[0] : offsets[1]]
+        text = text[: offsets[0]] + new_text + text[offsets[1] :]
+        assert len(buffer) == len(text)
+        assert buffer.line_count == text.count("\n") + 1
+    assert buffer.text == text
+    assert buffer.get_line(buffer.line_count - 1) == text.split("\n")[-1]
+
+
+def test_columns_past_the_end_of_the_line_stand_for_its_end():
+    """
+    Test that edits clamp columns to the length of their line, as in the Language Server Protocol
+    """
+    buffer = TextBuffer("abc\ndef\n")
+    assert buffer.replace(0, 10, 1, 1, "") == "\nd"
+    assert buffer.text == "abcef\n"
+    buffer.replace(1, 5, 1, 5, "x")
+    assert buffer.text == "abcef\nx"
+
+
+def test_columns_are_converted_to_and_from_code_units():
+    """
+    Test that columns are converted to the code units of each position encoding, and back
+    """
+    line = "a\u00e9\u4e2d\U0001f600b\n"
+    buffer = TextBuffer("ascii\n" + line)
+    for encoding, codec in [(UTF8, "utf-8"), (UTF16, "utf-16-le"), (UTF32, "utf-32-le")]:
+        unit_size = {UTF8: 1, UTF16: 2, UTF32: 4}[encoding]
+        for column in range(len(line)):
+            units = len(line[:column].encode(codec)) // unit_size
+            assert buffer.get_units(1, column, encoding) == units
+            assert buffer.get_column(1, units, encoding) == column
+        assert buffer.get_units(0, 3, encoding) == 3
+    # A position in the middle of the surrogate pair moves to the start of the character
+    assert buffer.get_column(1, 4, UTF16) == 3
+
+
+@pytest.mark.asyncio
+async def test_edits_use_the_negotiated_position_encoding(fake_language_server):
+    """
+    Test that the position encoding chosen by the server is used to apply edits to open files, and that only utf-16
+    is offered by default
+    """
+    offered = (UTF32, UTF16, UTF8)
+    with tempfile.TemporaryDirectory() as root:
+        with open(os.path.join(root, "main.py"), "w", encoding="utf-8") as f:
+            f.write("s = '\U0001f600'  # x\n")
+        for position_encodings, server_encodings, expected in [
+            (offered, "utf-8,utf-16,utf-32", UTF32),
+            (offered, "utf-8,utf-16", UTF16),
+            (offered, "", UTF16),
+            (MultilspyConfig.position_encodings, "utf-8,utf-16,utf-32", UTF16),
+        ]:
+            config = MultilspyConfig(code_language=Language.PYTHON, position_encodings=position_encodings)
+            server_args = f"--position-encodings '{server_encodings}'"
+            lsp = fake_language_server(config, MultilspyLogger(), root, server_args, True)
+            async with lsp.start_server():
+                assert lsp.position_encoding == expected
+                with lsp.open_file("main.py"):
+                    # The column of "x" in the encoding chosen by the server
+                    column = 11 if expected == UTF32 else 12
+                    end = lsp.insert_text_at_position("main.py", 0, column, "\U0001f600")
+                    assert end == Position(line=0, character=column + (1 if expected == UTF32 else 2))
+                    lsp.delete_text_between_positions("main.py", Position(line=0, character=0), Position(line=0, character=4))
+                    assert lsp.get_open_file_text("main.py") == "'\U0001f600'  # \U0001f600x\n"
+
+
+def test_bulk_conversions_match_single_conversions(monkeypatch):
+    """
+    Test that converting many positions and offsets at once gives the same results as converting them one by one,
+    with and without NumPy
+    """
+    rng = random.Random(1)
+    text = "".join(rng.choice(["a", "\n", "é", "\U0001f600"]) for _ in range(2000)) + "\n"
+    buffer = TextBuffer(text)
+    offsets = [rng.randrange(len(text) + 1) for _ in range(500)]
+    for numpy in sorted({None, text_buffer.numpy}, key=lambda module: module is not None):
+        monkeypatch.setattr(text_buffer, "numpy", numpy)
+        for encoding in [UTF8, UTF16, UTF32]:
+            positions = buffer.get_positions(offsets, encoding)
+            assert positions == [
+                (line, buffer.get_units(line, column, encoding)) for line, column in map(buffer.get_position, offsets)
+            ]
+            assert buffer.get_offsets(positions, encoding) == offsets
+        with pytest.raises(IndexError):
+            buffer.get_offsets([(buffer.line_count, 0)] * 100)
+        with pytest.raises(IndexError):
+            buffer.get_positions([len(text) + 1])
+    buffer.replace(0, 0, 0, 0, "x\n")
+    assert buffer.get_offsets([(1, 0)]) == [2]
+
+
+@pytest.mark.asyncio
+async def test_bulk_conversions_of_open_and_closed_files(fake_language_server):
+    """
+    Test that LanguageServer converts positions in the negotiated position encoding, using the buffer of open files
+    and the contents on disk of the others
+    """
+    with tempfile.TemporaryDirectory() as root:
+        with open(os.path.join(root, "main.py"), "w", encoding="utf-8") as f:
+            f.write("s = '\U0001f600'\nt = 1\n")
+        config = MultilspyConfig(code_language=Language.PYTHON)
+        lsp = fake_language_server(config, MultilspyLogger(), root, "--position-encodings utf-16", True)
+        async with lsp.start_server():
+            assert lsp.get_offsets("main.py", [(0, 7), (1, 4)]) == [6, 12]
+            assert lsp.get_positions("main.py", [6, 12]) == [(0, 7), (1, 4)]
+            with lsp.open_file("main.py"):
+                lsp.insert_text_at_position("main.py", 0, 0, "\n")
+                assert lsp.get_offsets("main.py", [(1, 7)]) == [7]
+            with open(os.path.join(root, "main.py"), "w", encoding="utf-8") as f:
+                f.write("t = 1\n")
+            assert lsp.get_positions("main.py", [4]) == [(0, 4)]
+
+
+def test_snapshots_share_blocks_and_diff_to_a_single_edit(monkeypatch):
+    """
+    Test that snapshots are unaffected by later edits while sharing the unedited blocks, and that the edit returned
+    by diff turns the text back into the text of the snapshot
+    """
+    monkeypatch.setattr(text_buffer, "BLOCK_LINES", 4)
+    rng = random.Random(2)
+    alphabet = ["a", "b", "\n", "é"]
+    text = "".join(rng.choice(alphabet) for _ in range(400))
+    buffer = TextBuffer(text)
+    for _ in range(200):
+        snapshot = buffer.snapshot()
+        snapshot_text = buffer.text
+        for _ in range(rng.randrange(0, 4)):
+            offsets = sorted(rng.randrange(len(buffer) + 1) for _ in range(2))
+            start, end = buffer.get_position(offsets[0]), buffer.get_position(offsets[1])
+            buffer.replace(*start, *end, "".join(rng.choice(alphabet) for _ in range(rng.randrange(0, 10))))
+        assert "".join(line for block in snapshot.blocks for line in block) == snapshot_text
+        assert sum(block is not shared for block, shared in zip(buffer._blocks, snapshot.blocks)) <= 3 * 3
+
+        start_line, start_column, end_line, end_column, new_text = buffer.diff(snapshot)
+        current = buffer.text
+        start = TextUtils.get_index_from_line_col(current, start_line, start_column)
+        end = TextUtils.get_index_from_line_col(current, end_line, end_column)
+        assert current[:start] + new_text + current[end:] == snapshot_text
+        assert len(new_text) <= len(snapshot_text) - len(os.path.commonprefix([current, snapshot_text]))
+        if rng.random() < 0.5:
+            buffer.restore(snapshot)
+            assert buffer.text == snapshot_text and buffer.line_count == snapshot_text.count("\n") + 1
+    assert buffer.diff(buffer.snapshot())[4] == ""